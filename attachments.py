@@ -0,0 +1,211 @@
+# attachments.py
+
+import os
+import time
+import hashlib
+import threading
+from collections import namedtuple
+
+from selenium.webdriver.common.by import By
+
+from config import ATTACHMENT_CACHE_DIR
+from readiness import wait_for_any, count_outgoing, outgoing_status, SEND_BUTTON
+from retry import SENT, ATTACHMENT_FAILED, classify_exception
+
+
+# ------------------------------
+# Preparation
+# ------------------------------
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".3gp", ".mov")
+DOCUMENT_EXTENSIONS = (
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".txt", ".csv", ".zip", ".rar",
+)
+# WhatsApp's own limits
+MAX_MEDIA_BYTES = 16 * 1024 * 1024
+MAX_DOCUMENT_BYTES = 100 * 1024 * 1024
+# Images larger than this (bytes or pixels on the long side) are re-encoded once
+COMPRESS_ABOVE_BYTES = 1024 * 1024
+MAX_IMAGE_SIDE = 1600
+JPEG_QUALITY = 85
+
+# kind: "media" (photo / video, sent from the gallery input) or "document"
+PreparedAttachment = namedtuple("PreparedAttachment", ["source", "path", "kind", "size"])
+
+
+class AttachmentError(ValueError):
+    pass
+
+
+def _content_key(path):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _compress_image(path, cache_dir):
+    """Re-encode a large image as a smaller JPEG. Returns the new path, or ``path`` if not worth it."""
+    from PIL import Image as PILImage
+
+    size = os.path.getsize(path)
+    with PILImage.open(path) as img:
+        if size <= COMPRESS_ABOVE_BYTES and max(img.size) <= MAX_IMAGE_SIDE:
+            return path
+        # Same content and settings -> same file, so later runs skip the encode too
+        target = os.path.join(cache_dir, f"{_content_key(path)}_{MAX_IMAGE_SIDE}_{JPEG_QUALITY}.jpg")
+        if os.path.exists(target):
+            return target
+        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = PILImage.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = target + ".tmp"
+        img.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp, target)
+    return target if os.path.getsize(target) < size else path
+
+
+def prepare_attachment(path, cache_dir=ATTACHMENT_CACHE_DIR):
+    """Validate ``path`` and compress it if it is a large image. Raises AttachmentError."""
+    if not os.path.isfile(path):
+        raise AttachmentError(f"Attachment not found: {path}")
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS or ext in VIDEO_EXTENSIONS:
+        kind, limit = "media", MAX_MEDIA_BYTES
+    elif ext in DOCUMENT_EXTENSIONS:
+        kind, limit = "document", MAX_DOCUMENT_BYTES
+    else:
+        raise AttachmentError(f"Unsupported attachment type: {os.path.basename(path)}")
+
+    prepared_path = path
+    if ext in IMAGE_EXTENSIONS:
+        try:
+            prepared_path = _compress_image(path, cache_dir)
+        except Exception as e:
+            raise AttachmentError(f"Unreadable image {os.path.basename(path)}: {e}")
+    size = os.path.getsize(prepared_path)
+    if size > limit:
+        raise AttachmentError(f"{os.path.basename(path)} is {size / 1024 / 1024:.1f} MB, "
+                              f"over WhatsApp's {limit // (1024 * 1024)} MB limit")
+    return PreparedAttachment(os.path.abspath(path), os.path.abspath(prepared_path), kind, size)
+
+
+class AttachmentCache:
+    """Prepares each attachment once per campaign and keeps its upload stats.
+
+    Keyed by path, size and modification time, so an edited file is prepared
+    again. Failures are cached too: a missing file is reported once, not per
+    contact. Relative paths are taken from ``base_dir`` (the contacts file's
+    folder). Safe to use from several worker threads.
+    """
+
+    def __init__(self, base_dir=None, cache_dir=ATTACHMENT_CACHE_DIR):
+        self.base_dir = base_dir
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self._prepared = {}
+        # source path -> [uploads, total seconds]
+        self.uploads = {}
+
+    def get(self, path):
+        """Return the PreparedAttachment for ``path``. Raises AttachmentError."""
+        if self.base_dir and not os.path.isabs(path):
+            path = os.path.join(self.base_dir, path)
+        try:
+            stat = os.stat(path)
+            key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        except OSError:
+            key = (os.path.abspath(path), None, None)
+        with self.lock:
+            if key not in self._prepared:
+                try:
+                    self._prepared[key] = prepare_attachment(path, self.cache_dir)
+                except AttachmentError as e:
+                    self._prepared[key] = e
+            prepared = self._prepared[key]
+        if isinstance(prepared, AttachmentError):
+            raise prepared
+        return prepared
+
+    def record_upload(self, attachment, seconds):
+        with self.lock:
+            stats = self.uploads.setdefault(attachment.source, [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+
+    def summary(self):
+        """``{source: (uploads, mean seconds)}``."""
+        with self.lock:
+            return {source: (n, total / n) for source, (n, total) in self.uploads.items() if n}
+
+
+# ------------------------------
+# Sending
+# ------------------------------
+ATTACH_BUTTON = (
+    By.XPATH,
+    '//button[@title="Attach"] | //div[@title="Attach"] | //span[@data-icon="plus"]'
+    ' | //span[@data-icon="plus-rounded"] | //span[@data-icon="attach-menu-plus"]'
+)
+MEDIA_INPUT = (By.XPATH, '//input[@type="file"][contains(@accept, "image")]')
+DOCUMENT_INPUT = (By.XPATH, '//input[@type="file"][@accept="*"]')
+
+ATTACH_TIMEOUT = 10
+UPLOAD_TIMEOUT = 120
+
+
+def _uploaded(before):
+    """Condition matching once a new outgoing message has left the clock icon, i.e. finished uploading."""
+    def condition(driver):
+        if count_outgoing(driver) <= before:
+            return None
+        return outgoing_status(driver) in ("sent", "delivered")
+    return condition
+
+
+def send_attachment(driver, attachment, timer):
+    """Send a prepared attachment in the open chat. Returns SENT or ATTACHMENT_FAILED.
+
+    Runs after the text went out, so a failure here is final: retrying
+    would send the text a second time.
+    """
+    try:
+        before = count_outgoing(driver)
+        state, button, _ = wait_for_any(driver, {"attach": ATTACH_BUTTON}, ATTACH_TIMEOUT)
+        if state is None:
+            print(f"Attach button not found ({timer})")
+            return ATTACHMENT_FAILED
+        button.click()
+
+        file_input_locator = MEDIA_INPUT if attachment.kind == "media" else DOCUMENT_INPUT
+        state, file_input, _ = wait_for_any(driver, {"input": file_input_locator}, ATTACH_TIMEOUT)
+        if state is None:
+            print(f"File input not found ({timer})")
+            return ATTACHMENT_FAILED
+        file_input.send_keys(attachment.path)
+        timer.mark("attach")
+
+        state, send_button, _ = wait_for_any(driver, {"send": SEND_BUTTON}, ATTACH_TIMEOUT)
+        if state is None:
+            print(f"Attachment preview did not open ({timer})")
+            return ATTACHMENT_FAILED
+        send_button.click()
+
+        started = time.monotonic()
+        state, _, _ = wait_for_any(driver, {"uploaded": _uploaded(before)}, UPLOAD_TIMEOUT)
+        timer.mark("upload")
+        if state is None:
+            print(f"Attachment {os.path.basename(attachment.source)} not confirmed after "
+                  f"{time.monotonic() - started:.0f}s ({timer})")
+            return ATTACHMENT_FAILED
+        return SENT
+    except Exception as e:
+        print(f"Attachment error: {classify_exception(e)}: {e} ({timer})")
+        return ATTACHMENT_FAILED
@@ -0,0 +1,180 @@
+# benchmarks/bench_campaign.py
+#
+# End-to-end sending loop against the local WhatsApp Web stand-in
+# (mock_whatsapp.py): file streaming, preflight, Dispatcher, journal,
+# metrics and delivery tracking, with no account and no pacing delay.
+# Reports msgs/min, p50/p99 per-message latency and memory.
+#
+#   python benchmarks/bench_campaign.py --scenario 10k
+#   python benchmarks/bench_campaign.py --scenario 1k --driver chrome --load-latency 0.2
+#
+# --driver sim (default) runs SimDriver in-process, which measures the bot's
+# own overhead at any size; --driver chrome drives headless Chrome against
+# the HTTP stand-in and includes the browser.
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mock_whatsapp  # noqa: E402
+from mock_whatsapp import Behavior, SimDriver  # noqa: E402
+
+SCENARIOS = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+LATENCY_STAGES = ("navigate", "compose_wait", "send_ready", "send", "confirm")
+
+
+def write_contacts(path, count, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["phone", "first name", "last name", "message"])
+        for i in range(count):
+            writer.writerow([f"0912{rng.randrange(10 ** 7):07d}", f"Name{i}", "Family",
+                             f"Hello {i}, this is a benchmark message."])
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def make_sessions(args, behavior, base_url):
+    from browser import Session, create_driver, wait_for_chats
+    from navigation import ChatNavigator
+
+    sessions = []
+    for index in range(args.sessions):
+        if args.driver == "sim":
+            driver = SimDriver(behavior)
+        else:
+            driver, error = create_driver(headless=True)
+            if driver is None:
+                sys.exit(f"Chrome did not start: {error}")
+            driver.get(base_url)
+            wait_for_chats(driver, 10)
+        session = Session(driver, name=f"bench-{index}", recycle_every=0)
+        if args.navigation:
+            session.navigator = ChatNavigator(args.navigation)
+        sessions.append(session)
+    return sessions
+
+
+def run(args):
+    behavior = Behavior.from_args(args)
+    server = None
+    base_url = "http://127.0.0.1"
+    if args.driver == "chrome":
+        server, base_url = mock_whatsapp.serve(behavior)
+    # Must be set before config is imported
+    os.environ["WHATSAPP_URL"] = base_url
+
+    import browser
+    from sessions import Dispatcher
+    from contacts import iter_prepared
+    from preflight import Preflight
+    from journal import SendJournal
+    from metrics import CampaignMetrics
+    from retry import RetryQueue
+
+    # Failed loads would otherwise hold a worker for the full 30 s
+    browser.COMPOSE_TIMEOUT = args.compose_timeout
+
+    count = args.contacts or SCENARIOS[args.scenario]
+    workdir = tempfile.mkdtemp(prefix="wa_bench_")
+    contacts_path = os.path.join(workdir, "contacts.csv")
+    write_contacts(contacts_path, count)
+
+    sessions = make_sessions(args, behavior, base_url)
+    journal = SendJournal(os.path.join(workdir, "journal.db"))
+    metrics = CampaignMetrics(os.path.join(workdir, "metrics.jsonl"), os.path.join(workdir, "metrics.prom"))
+    dispatcher = Dispatcher(sessions, 0, pacing=args.pacing, journal=journal, metrics=metrics,
+                            pipeline=not args.no_pipeline, retry_queue=RetryQueue(base=args.retry_base))
+
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            dispatcher.run(iter_prepared(contacts_path, preflight=Preflight("98"), metrics=metrics))
+    finally:
+        elapsed = time.perf_counter() - start
+        journal.close()
+        metrics.close()
+        for session in sessions:
+            session.quit()
+        if server is not None:
+            server.shutdown()
+
+    latencies = []
+    with open(os.path.join(workdir, "metrics.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["result"] == "sent":
+                latencies.append(sum(record["stages"].get(stage, 0.0) for stage in LATENCY_STAGES))
+
+    return {
+        "contacts": count,
+        "driver": args.driver,
+        "sessions": args.sessions,
+        "sent": dispatcher.sent,
+        "failed": dispatcher.failed,
+        "failures": dict(dispatcher.failures),
+        "delivery": dict(dispatcher.delivery),
+        "elapsed_s": round(elapsed, 2),
+        "msgs_per_min": round(dispatcher.sent / elapsed * 60, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "max_rss_mb": round(max_rss_mb(), 1) if max_rss_mb() is not None else None,
+        "workdir": workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sending loop benchmark against a local WhatsApp Web stand-in")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="1k")
+    parser.add_argument("--contacts", type=int, help="contact count, overrides --scenario")
+    parser.add_argument("--driver", choices=["sim", "chrome"], default="sim")
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--pacing", default="normal")
+    parser.add_argument("--no-pipeline", action="store_true")
+    parser.add_argument("--navigation", choices=["in_app", "reload"],
+                        help="how chats are opened (default: config.NAVIGATION_MODE)")
+    parser.add_argument("--compose-timeout", type=float, default=2.0)
+    parser.add_argument("--retry-base", type=float, default=0.1, help="first retry backoff, seconds")
+    parser.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    mock_whatsapp.add_arguments(parser)
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{result['contacts']} contacts, {result['driver']} x{result['sessions']}: "
+          f"{result['sent']} sent, {result['failed']} failed {result['failures']} in {result['elapsed_s']}s")
+    print(f"  {result['msgs_per_min']} msgs/min, per message p50 {result['p50_ms']} ms, "
+          f"p99 {result['p99_ms']} ms, max RSS {result['max_rss_mb']} MB")
+    print(f"  ticks: {result['delivery']}  (metrics and journal in {result['workdir']})")
+
+
+if __name__ == "__main__":
+    main()
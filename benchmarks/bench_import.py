@@ -0,0 +1,81 @@
+# benchmarks/bench_import.py
+#
+# Measures what `import main` costs before the window can show, using
+# `python -X importtime`, and fails if it goes over budget or if a heavy
+# dependency that should load on first use is imported at startup.
+#
+#   python benchmarks/bench_import.py --budget-ms 1500
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Loaded on demand: pandas/openpyxl when a file is read, selenium when Send is
+# pressed, the Persian shaping libraries on the first Persian string
+DEFERRED = ("pandas", "numpy", "openpyxl", "selenium", "PIL", "arabic_reshaper", "bidi")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time guard for the GUI entry point")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0,
+                        help="maximum cumulative import time of --module")
+    parser.add_argument("--top", type=int, default=15, help="how many top-level imports to list")
+    args = parser.parse_args()
+
+    imports = measure(args.module)
+    end = next((i for i in range(len(imports) - 1, -1, -1) if imports[i][0] == args.module), None)
+    if end is None:
+        raise SystemExit(f"{args.module} not found in -X importtime output")
+    total = imports[end][2]
+
+    # Entries are printed after their children; the module's own imports sit
+    # between it and the previous top-level entry
+    start = end
+    while start > 0 and imports[start - 1][3] > 0:
+        start -= 1
+    imports = imports[start:end + 1]
+    top_level = [i for i in imports if i[3] == 1]
+    print(f"import {args.module}: {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, _, cumulative, _ in sorted(top_level, key=lambda i: -i[2])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    loaded = {name.split(".")[0] for name, _, _, _ in imports}
+    early = sorted(loaded.intersection(DEFERRED))
+    failed = False
+    if early:
+        print(f"FAIL: imported at startup but should load on first use: {', '.join(early)}")
+        failed = True
+    if total / 1000 > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
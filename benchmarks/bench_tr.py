@@ -0,0 +1,66 @@
+# benchmarks/bench_tr.py
+#
+# Per-call cost of translations.tr for Persian, against shaping every string
+# from scratch as tr did before caching.
+#
+#   python benchmarks/bench_tr.py --calls 20000
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import arabic_reshaper  # noqa: E402
+from bidi.algorithm import get_display  # noqa: E402
+
+import translations  # noqa: E402
+from translations import tr, set_lang, _TRANSLATIONS  # noqa: E402
+
+
+def tr_uncached(key, **kwargs):
+    text = _TRANSLATIONS["fa"].get(key, key)
+    if kwargs:
+        text = text.format(**kwargs)
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for args, kwargs in calls:
+        func(*args, **kwargs)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tr() per-call cost, before and after caching")
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    set_lang("fa")
+    rng = random.Random(1)
+    static_keys = [k for k, v in _TRANSLATIONS["fa"].items() if "{" not in v]
+    names = [f"{rng.choice(['علی', 'سارا', 'رضا', 'مریم'])} {rng.choice(['احمدی', 'کریمی', 'رضایی'])}"
+             for _ in range(200)]
+
+    scenarios = {
+        "refresh_ui (static labels)": [((rng.choice(static_keys),), {}) for _ in range(args.calls)],
+        "sending_to (per contact)": [
+            (("sending_to",), {"name": rng.choice(names), "phone": str(989000000000 + i)})
+            for i in range(args.calls)
+        ],
+    }
+    for label, calls in scenarios.items():
+        translations._shape.cache_clear()
+        translations._reshape_field.cache_clear()
+        translations._compile.cache_clear()
+        before = per_call_us(tr_uncached, calls)
+        after = per_call_us(tr, calls)
+        assert all(tr(*a, **k) == tr_uncached(*a, **k) for a, k in calls[:200])
+        print(f"{label:<28} before {before:8.1f} us  after {after:8.1f} us  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
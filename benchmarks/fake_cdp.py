@@ -0,0 +1,114 @@
+# benchmarks/fake_cdp.py
+#
+# In-process stand-in for a Chrome DevTools endpoint logged into WhatsApp Web,
+# so the asyncio engine in cdp.py can be exercised without a browser.
+# Answers just the commands cdp.py sends; page state is a counter of outgoing
+# messages per tab.
+#
+#   python benchmarks/fake_cdp.py --contacts 200 --endpoints 3 --latency 0.02
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import websockets  # noqa: E402
+
+from contacts import Contact  # noqa: E402
+from cdp import AsyncEngine  # noqa: E402
+
+
+class FakeBrowser:
+    """One fake browser. Phones ending in ``invalid_suffix`` get the invalid-number dialog."""
+
+    def __init__(self, latency=0.0, invalid_suffix="0"):
+        self.latency = latency
+        self.invalid_suffix = invalid_suffix
+        self.tabs = {}
+        self.sent = []
+
+    async def handle(self, ws, path=None):
+        async for raw in ws:
+            msg = json.loads(raw)
+            asyncio.create_task(self._reply(ws, msg))
+
+    async def _reply(self, ws, msg):
+        method, params, session = msg["method"], msg.get("params", {}), msg.get("sessionId")
+        result = {}
+        if method == "Target.getTargets":
+            result = {"targetInfos": [{"targetId": target, "type": "page", "url": tab["url"]}
+                                      for target, tab in self.tabs.items()]}
+        elif method == "Target.createTarget":
+            target = f"T{len(self.tabs) + 1}"
+            self.tabs[target] = {"url": params.get("url", ""), "out": 0}
+            result = {"targetId": target}
+        elif method == "Target.attachToTarget":
+            result = {"sessionId": "S" + params["targetId"]}
+        elif method == "Page.navigate":
+            tab = self.tabs[session[1:]]
+            tab["url"] = params["url"]
+            await ws.send(json.dumps({"id": msg["id"], "result": {"frameId": "F"}}))
+            await asyncio.sleep(self.latency)
+            await ws.send(json.dumps({"method": "Page.loadEventFired", "params": {}, "sessionId": session}))
+            return
+        elif method == "Runtime.evaluate":
+            result = {"result": {"value": self._evaluate(self.tabs[session[1:]], params["expression"])}}
+        elif method == "Input.dispatchKeyEvent" and params["type"] == "keyDown":
+            tab = self.tabs[session[1:]]
+            tab["out"] += 1
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(tab["url"]).query)
+            self.sent.append((query["phone"][0], query["text"][0]))
+        if session:
+            await ws.send(json.dumps({"id": msg["id"], "result": result, "sessionId": session}))
+        else:
+            await ws.send(json.dumps({"id": msg["id"], "result": result}))
+
+    def _evaluate(self, tab, expression):
+        if "MutationObserver" in expression:
+            names = json.loads(expression[expression.rindex("))(") + 3:expression.rindex(",")])
+            if "compose" in names:
+                phone = urllib.parse.parse_qs(urllib.parse.urlparse(tab["url"]).query)["phone"][0]
+                return "invalid" if phone.endswith(self.invalid_suffix) else "compose"
+            return next(iter(names))
+        if "count(" in expression:
+            return tab["out"]
+        return None
+
+
+async def run(args):
+    browsers = [FakeBrowser(args.latency) for _ in range(args.endpoints)]
+    servers = [await websockets.serve(b.handle, "127.0.0.1", 0) for b in browsers]
+    endpoints = [f"ws://127.0.0.1:{s.sockets[0].getsockname()[1]}" for s in servers]
+
+    rng = random.Random(1)
+    contacts = [Contact(i, str(989120000000 + rng.randrange(10 ** 8)), f"name {i}", f"hello {i}")
+                for i in range(args.contacts)]
+    engine = AsyncEngine(endpoints, base_delay=0)
+    start = time.perf_counter()
+    sent, failed = await engine.run(contacts)
+    elapsed = time.perf_counter() - start
+
+    for server in servers:
+        server.close()
+    assert sent + failed == args.contacts
+    assert sum(len(b.sent) for b in browsers) == sent
+    print(f"{args.contacts} contacts over {args.endpoints} endpoints: sent {sent}, failed {failed}, "
+          f"{elapsed:.2f}s ({args.contacts / elapsed * 60:.0f} msgs/min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run cdp.AsyncEngine against fake DevTools endpoints")
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--endpoints", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="page load time in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+# benchmarks/mock_whatsapp.py
+#
+# Local stand-in for the parts of web.whatsapp.com the bot touches: the login
+# QR canvas, the chat list, the "New chat" search drawer, the
+# /send?phone=...&text=... route with its contenteditable compose box, and
+# outgoing messages whose status ticks move from clock to one tick to two
+# ticks. Latency and failures are injected per Behavior.
+#
+# Serve it for a real Chrome (point the app at it with WHATSAPP_URL):
+#
+#   python benchmarks/mock_whatsapp.py --port 8000 --load-latency 0.3
+#   WHATSAPP_URL=http://127.0.0.1:8000 python cli.py contacts.xlsx
+#
+# SimDriver implements the same behavior in-process behind the few WebDriver
+# calls the bot makes, for runs far too long for a real browser.
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class Behavior:
+    """Latency (seconds) and failure rates (0..1) of the stand-in.
+
+    Whether a number is invalid, saved under a contact name (the New-chat
+    search then titles it by name, not number) or misrouted (opening it from
+    the search lands in another chat) depends only on the number, so every run
+    and both the server and SimDriver agree on it.
+    """
+
+    def __init__(self, load_latency=0.0, load_jitter=0.5, ack_latency=0.0, delivery_latency=0.0,
+                 invalid_rate=0.0, error_rate=0.0, stuck_rate=0.0, qr_scan_after=None, seed=1,
+                 app_latency=0.0, named_rate=0.0, misroute_rate=0.0):
+        self.load_latency = load_latency
+        self.load_jitter = load_jitter
+        self.ack_latency = ack_latency
+        self.delivery_latency = delivery_latency
+        self.invalid_rate = invalid_rate
+        self.error_rate = error_rate
+        self.stuck_rate = stuck_rate
+        # None: already linked; otherwise seconds after the first QR view
+        self.qr_scan_after = qr_scan_after
+        self.app_latency = app_latency
+        self.named_rate = named_rate
+        self.misroute_rate = misroute_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.load_latency, args.load_jitter, args.ack_latency, args.delivery_latency,
+                   args.invalid_rate, args.error_rate, args.stuck_rate, args.qr_scan_after,
+                   app_latency=args.app_latency, named_rate=args.named_rate, misroute_rate=args.misroute_rate)
+
+    def _random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def page_delay(self):
+        spread = self.load_latency * self.load_jitter
+        return max(0.0, self.load_latency + (self._random() * 2 - 1) * spread)
+
+    def app_delay(self):
+        spread = self.app_latency * self.load_jitter
+        return max(0.0, self.app_latency + (self._random() * 2 - 1) * spread)
+
+    @staticmethod
+    def _hit(phone, rate, salt):
+        return zlib.crc32((salt + phone).encode()) % 10000 < rate * 10000
+
+    def is_invalid(self, phone):
+        return self._hit(phone, self.invalid_rate, "")
+
+    def contact_name(self, phone):
+        """The name a saved contact shows under in the search, or None."""
+        return f"Contact {phone[-4:]}" if self._hit(phone, self.named_rate, "named:") else None
+
+    def opened_chat(self, phone):
+        """The chat that opening ``phone`` from the New-chat search lands in."""
+        if self._hit(phone, self.misroute_rate, "misroute:"):
+            return phone[:-1] + str((int(phone[-1]) + 1) % 10)
+        return phone
+
+    def fails(self):
+        return self._random() < self.error_rate
+
+    def sticks(self):
+        return self._random() < self.stuck_rate
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("stand-in behavior")
+    group.add_argument("--load-latency", type=float, default=0.0, help="mean /send page load, seconds")
+    group.add_argument("--load-jitter", type=float, default=0.5, help="+/- fraction of the load latency")
+    group.add_argument("--ack-latency", type=float, default=0.0, help="ENTER to one tick, seconds")
+    group.add_argument("--delivery-latency", type=float, default=0.0, help="one tick to two ticks, seconds")
+    group.add_argument("--invalid-rate", type=float, default=0.0, help="share of numbers that are invalid")
+    group.add_argument("--error-rate", type=float, default=0.0, help="share of page loads that fail")
+    group.add_argument("--stuck-rate", type=float, default=0.0, help="share of messages stuck on the clock")
+    group.add_argument("--app-latency", type=float, default=0.0,
+                       help="mean in-app chat switch from the New-chat search, seconds")
+    group.add_argument("--named-rate", type=float, default=0.0,
+                       help="share of numbers the search shows by contact name")
+    group.add_argument("--misroute-rate", type=float, default=0.0,
+                       help="share of numbers the search opens the wrong chat for")
+    group.add_argument("--qr-scan-after", type=float, default=None,
+                       help="show the QR and 'scan' it after this many seconds (default: already linked)")
+
+
+# ------------------------------
+# HTTP stand-in
+# ------------------------------
+_CHATS = ('<div id="side"><div id="new-chat" title="New chat" role="button">+</div>'
+          '<div id="pane-side" role="grid"><div role="row"><span title="Chat">Chat</span></div></div></div>')
+
+# Shared by every page, through event delegation so it survives the QR page
+# swapping the app in: the New-chat drawer (search, result rows, in-app chat
+# opening) and the compose box of whichever chat is open
+_APP_SCRIPT = """<script>
+const ACK = %f, DELIVERY = %f;
+
+function formatPhone(digits) {
+  return "+" + digits.slice(0, 2) + " " + digits.slice(2, 5) + " " + digits.slice(5, 8) + " " + digits.slice(8);
+}
+
+function openChat(phone, text, stuck) {
+  let main = document.getElementById("main");
+  if (!main) {
+    main = document.createElement("div");
+    main.id = "main";
+    document.getElementById("app").append(main);
+  }
+  main.dataset.stuck = stuck ? "1" : "";
+  main.innerHTML = '<header><span dir="auto"></span></header><div id="messages"></div>'
+    + '<footer><div contenteditable="true" data-tab="10" role="textbox"></div>'
+    + '<button aria-label="Send"><span data-icon="send"></span></button></footer>';
+  const title = main.querySelector("header span");
+  title.title = formatPhone(phone);
+  title.textContent = title.title;
+  main.querySelector('[data-tab="10"]').innerText = text;
+}
+
+async function search(box) {
+  const query = box.innerText.replace(/\D/g, "");
+  const results = document.getElementById("results");
+  if (!query) { results.innerHTML = ""; return; }
+  const found = await (await fetch("/search?q=" + query)).json();
+  if (box.innerText.replace(/\D/g, "") !== query) return;  // typed on meanwhile
+  results.innerHTML = found.rows.length ? "" : "<div>No results found</div>";
+  for (const row of found.rows) {
+    const item = document.createElement("div");
+    item.setAttribute("role", "listitem");
+    item.dataset.phone = row.phone;
+    const title = document.createElement("span");
+    title.title = row.title;
+    title.textContent = row.title;
+    item.append(title);
+    results.append(item);
+  }
+}
+
+document.addEventListener("click", async e => {
+  if (e.target.closest("#new-chat") && !document.getElementById("drawer")) {
+    const drawer = document.createElement("div");
+    drawer.id = "drawer";
+    drawer.innerHTML = '<div contenteditable="true" data-tab="3" role="textbox"></div><div id="results"></div>';
+    document.getElementById("side").prepend(drawer);
+    drawer.firstChild.addEventListener("input", ev => search(ev.target));
+    drawer.firstChild.focus();
+    return;
+  }
+  const row = e.target.closest("#results [role=listitem]");
+  if (row) {
+    const chat = await (await fetch("/chat?phone=" + row.dataset.phone)).json();
+    document.getElementById("drawer").remove();
+    openChat(chat.phone, "", chat.stuck);
+  }
+});
+
+document.addEventListener("keydown", e => {
+  if (e.target.closest && e.target.closest("#drawer") && e.key === "Escape") {
+    document.getElementById("drawer").remove();
+    return;
+  }
+  const box = e.target.closest && e.target.closest('[data-tab="10"]');
+  if (!box || e.key !== "Enter" || e.shiftKey || !box.innerText.trim()) return;
+  e.preventDefault();
+  const msg = document.createElement("div");
+  msg.className = "message-out focusable-list-item";
+  const icon = document.createElement("span");
+  icon.setAttribute("data-icon", "msg-time");
+  msg.append(document.createTextNode(box.innerText), icon);
+  document.getElementById("messages").append(msg);
+  box.innerText = "";
+  if (document.getElementById("main").dataset.stuck) return;
+  setTimeout(() => {
+    icon.setAttribute("data-icon", "msg-check");
+    setTimeout(() => icon.setAttribute("data-icon", "msg-dblcheck"), DELIVERY * 1000);
+  }, ACK * 1000);
+});
+</script>"""
+
+_QR_PAGE = """<!doctype html><html><body><div id="app">
+<canvas aria-label="Scan this QR code to link a device!" width="264" height="264"></canvas>
+</div>%s<script>
+const c = document.querySelector("canvas").getContext("2d");
+for (let i = 0; i < 33; i++) for (let j = 0; j < 33; j++) if ((i * 7 + j * 13) %% 3 === 0) c.fillRect(i * 8, j * 8, 8, 8);
+setInterval(async () => {
+  if ((await (await fetch("/linked")).json()).linked) document.getElementById("app").innerHTML = %s;
+}, 1000);
+</script></body></html>"""
+
+_HOME_PAGE = '<!doctype html><html><body><div id="app">' + _CHATS + '</div>%s</body></html>'
+
+_INVALID_PAGE = """<!doctype html><html><body><div id="app">""" + _CHATS + """
+<div role="dialog"><div>Phone number shared via url is invalid.</div></div></div>%s</body></html>"""
+
+_CHAT_PAGE = ('<!doctype html><html><body><div id="app">' + _CHATS + '</div>%s'
+              '<script>openChat(%s, %s, %s);</script></body></html>')
+
+
+def format_phone(digits):
+    """How the stand-in titles a number (the same as formatPhone in the page)."""
+    digits = "".join(c for c in digits if c.isdigit())
+    return f"+{digits[:2]} {digits[2:5]} {digits[5:8]} {digits[8:]}"
+
+
+def search_rows(behavior, query):
+    """New-chat results for ``query``: ``[{"phone", "title"}]``, empty for a number not on WhatsApp."""
+    if not query or behavior.is_invalid(query):
+        return []
+    title = behavior.contact_name(query) or format_phone(query)
+    return [{"phone": query, "title": title}]
+
+
+def make_handler(behavior):
+    state = {"qr_shown_at": None}
+
+    def linked():
+        if behavior.qr_scan_after is None:
+            return True
+        shown = state["qr_shown_at"]
+        return shown is not None and time.monotonic() - shown >= behavior.qr_scan_after
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, body, status=200, content_type="text/html; charset=utf-8"):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            script = _APP_SCRIPT % (behavior.ack_latency, behavior.delivery_latency)
+            url = urllib.parse.urlparse(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            if url.path == "/linked":
+                self._send(json.dumps({"linked": linked()}), content_type="application/json")
+            elif url.path == "/":
+                if linked():
+                    self._send(_HOME_PAGE % script)
+                else:
+                    if state["qr_shown_at"] is None:
+                        state["qr_shown_at"] = time.monotonic()
+                    self._send(_QR_PAGE % (script, json.dumps(_CHATS)))
+            elif url.path == "/search":
+                query = query.get("q", [""])[0]
+                self._send(json.dumps({"rows": search_rows(behavior, query)}), content_type="application/json")
+            elif url.path == "/chat":
+                # A chat opened from the New-chat drawer
+                phone = query.get("phone", [""])[0]
+                time.sleep(behavior.app_delay())
+                self._send(json.dumps({"phone": behavior.opened_chat(phone), "stuck": behavior.sticks()}),
+                           content_type="application/json")
+            elif url.path == "/send":
+                phone = query.get("phone", [""])[0]
+                text = query.get("text", [""])[0]
+                time.sleep(behavior.page_delay())
+                if behavior.fails():
+                    # Dropped connection: Chrome shows its own error page
+                    self.close_connection = True
+                    return
+                if behavior.is_invalid(phone):
+                    self._send(_INVALID_PAGE % script)
+                else:
+                    stuck = "true" if behavior.sticks() else "false"
+                    self._send(_CHAT_PAGE % (script, json.dumps(phone), json.dumps(text), stuck))
+            else:
+                self._send("not found", status=404, content_type="text/plain")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(behavior, port=0, host="127.0.0.1"):
+    """Start the stand-in on a daemon thread. Returns ``(server, base_url)``."""
+    server = ThreadingHTTPServer((host, port), make_handler(behavior))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ------------------------------
+# In-process driver
+# ------------------------------
+class SimElement:
+    def __init__(self, driver, kind, status=None, title=None):
+        self.driver = driver
+        self.kind = kind
+        self.status = status
+        self.title = title
+        self.text = title or ""
+        self.id = f"{kind}-{driver.page_id}"
+
+    def send_keys(self, *keys):
+        self.driver._keys(keys, self.kind)
+
+    def click(self):
+        self.driver._click(self)
+
+    def get_attribute(self, name):
+        if name == "data-icon":
+            return self.status
+        return self.title if name == "title" else None
+
+    def find_elements(self, by, value):
+        # Only the relative lookups navigation.py makes: the search box's
+        # result rows, and a row's title
+        if self.kind == "search" and value == self.driver.drawer_results:
+            return [SimElement(self.driver, "row", title=row["title"]) for row in self.driver.rows]
+        if self.kind == "row" and value == self.driver.result_title:
+            return [SimElement(self.driver, "title", title=self.title)]
+        return []
+
+
+class SimDriver:
+    """Answers the locators in readiness.py the way the HTTP stand-in's pages would."""
+
+    def __init__(self, behavior, clock=time.monotonic, sleep=time.sleep):
+        from readiness import (
+            CHAT_LIST, COMPOSE_BOX, INVALID_PHONE_DIALOG, SEND_BUTTON, OUTGOING_MESSAGE,
+            MESSAGE_TICK, LAST_OUTGOING_STATUS,
+        )
+        from navigation import (
+            NEW_CHAT_BUTTON, NEW_CHAT_SEARCH, DRAWER_RESULTS, RESULT_TITLE, CHAT_HEADER_TITLE, NO_RESULTS,
+        )
+        from selenium.webdriver.common.keys import Keys
+
+        self.behavior = behavior
+        self.clock = clock
+        self.sleep = sleep
+        self.keys = Keys
+        self.locators = {
+            CHAT_LIST[1]: "chats", COMPOSE_BOX[1]: "compose", INVALID_PHONE_DIALOG[1]: "invalid",
+            SEND_BUTTON[1]: "send", OUTGOING_MESSAGE[1]: "outgoing", MESSAGE_TICK[1]: "tick",
+            LAST_OUTGOING_STATUS[1]: "tick", NEW_CHAT_BUTTON[1]: "new_chat", NEW_CHAT_SEARCH[1]: "search",
+            CHAT_HEADER_TITLE[1]: "header", NO_RESULTS[1]: "no_results",
+        }
+        self.drawer_results = DRAWER_RESULTS[1]
+        self.result_title = RESULT_TITLE[1]
+        self.page = "home"
+        self.page_id = 0
+        self.text = ""
+        self.outgoing = []
+        self.stuck = False
+        self.sent = 0
+        self.chat_phone = None
+        # New-chat drawer: open or not, and what is typed in its search
+        self.drawer = False
+        self.query = ""
+        self.current_window_handle = "main"
+
+    @property
+    def rows(self):
+        return search_rows(self.behavior, "".join(c for c in self.query if c.isdigit()))
+
+    def get(self, url):
+        parsed = urllib.parse.urlparse(url)
+        query = urllib.parse.parse_qs(parsed.query)
+        self.page_id += 1
+        self.outgoing = []
+        self.text = ""
+        self.drawer = False
+        self.chat_phone = None
+        if parsed.path != "/send":
+            self.page = "home"
+            return
+        self.sleep(self.behavior.page_delay())
+        phone = query.get("phone", [""])[0]
+        if self.behavior.fails():
+            self.page = "error"
+        elif self.behavior.is_invalid(phone):
+            self.page = "invalid"
+        else:
+            self.page = "chat"
+            self.chat_phone = phone
+            self.text = query.get("text", [""])[0]
+            self.stuck = self.behavior.sticks()
+
+    @staticmethod
+    def _typed(keys):
+        # Keys.* are single private-use characters; everything else is text
+        return "".join(k for k in keys if isinstance(k, str) and not (len(k) == 1 and "\ue000" <= k <= "\uf8ff"))
+
+    def _keys(self, keys, kind="compose"):
+        if kind == "search":
+            if keys == (self.keys.ESCAPE,):
+                self.drawer = False
+            elif keys == (self.keys.BACKSPACE,):
+                # Only ever sent after CONTROL+a: clears the search
+                self.query = ""
+            else:
+                self.query += self._typed(keys)
+        elif keys == (self.keys.ENTER,):
+            if self.text.strip():
+                self.outgoing.append(self.clock())
+                self.text = ""
+                self.sent += 1
+        else:
+            self.text += self._typed(keys)
+
+    def _click(self, element):
+        if element.kind == "new_chat" and self.page != "error":
+            self.drawer = True
+            self.query = ""
+        elif element.kind == "row" and self.drawer:
+            phone = "".join(c for c in self.query if c.isdigit())
+            self.drawer = False
+            self.sleep(self.behavior.app_delay())
+            self.page = "chat"
+            self.page_id += 1
+            self.outgoing = []
+            self.text = ""
+            self.chat_phone = self.behavior.opened_chat(phone)
+            self.stuck = self.behavior.sticks()
+
+    def _status(self, pressed_at):
+        elapsed = self.clock() - pressed_at
+        if self.stuck or elapsed < self.behavior.ack_latency:
+            return "msg-time"
+        if elapsed < self.behavior.ack_latency + self.behavior.delivery_latency:
+            return "msg-check"
+        return "msg-dblcheck"
+
+    def find_elements(self, by, value):
+        kind = self.locators.get(value)
+        if kind == "chats" and self.page in ("home", "chat", "invalid"):
+            return [SimElement(self, kind)]
+        if kind == "compose" and self.page == "chat":
+            return [SimElement(self, kind)]
+        if kind == "invalid" and self.page == "invalid":
+            return [SimElement(self, kind)]
+        if kind == "send" and self.page == "chat" and self.text.strip():
+            return [SimElement(self, kind)]
+        if kind == "new_chat" and self.page != "error":
+            return [SimElement(self, kind)]
+        if kind == "search" and self.drawer:
+            return [SimElement(self, kind)]
+        if kind == "no_results" and self.drawer and self.query and not self.rows:
+            return [SimElement(self, kind)]
+        if kind == "header" and self.page == "chat":
+            return [SimElement(self, kind, title=format_phone(self.chat_phone))]
+        if kind == "outgoing":
+            return [SimElement(self, kind) for _ in self.outgoing]
+        if kind == "tick" and self.outgoing:
+            return [SimElement(self, kind, self._status(self.outgoing[-1]))]
+        return []
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise LookupError(f"no such element: {value}")
+        return elements[0]
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {"metrics": []}
+
+    def quit(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local WhatsApp Web stand-in")
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server, url = serve(Behavior.from_args(args), args.port)
+    print(f"Serving on {url} (WHATSAPP_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
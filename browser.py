@@ -0,0 +1,358 @@
+# browser.py
+
+import time
+import os
+import re
+import urllib.parse
+from collections import namedtuple
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from config import (
+    NEED_CHROME_VERSION, QR_PATH, WHATSAPP_URL, CHROMEDRIVER_PATH, NAVIGATION_MODE,
+    LOAD_TIMEOUT, TAB_RECYCLE_EVERY,
+)
+from readiness import (
+    wait_for_any, count_outgoing, new_outgoing_message, StageTimer,
+    COMPOSE_BOX, INVALID_PHONE_DIALOG, SEND_BUTTON, CHAT_LIST, QR_CANVAS,
+    COMPOSE_TIMEOUT, SEND_BUTTON_TIMEOUT, TICK_TIMEOUT,
+)
+from navigation import ChatNavigator, type_message
+from diet import (
+    apply_flags, block_heavy_requests, renderer_memory_mb, MEMORY_LIMIT_MB, MEMORY_CHECK_EVERY,
+)
+from delivery import DeliveryTracker
+from attachments import send_attachment
+from retry import SENT, INVALID_NUMBER, ELEMENT_TIMEOUT, classify_exception
+
+
+# ------------------------------
+# Selenium & WhatsApp functions
+# ------------------------------
+HEADLESS_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    f"(KHTML, like Gecko) Chrome/{NEED_CHROME_VERSION}.0.0.0 Safari/537.36"
+)
+
+
+def is_chrome_version_compatible(driver):
+    try:
+        caps = driver.capabilities
+        browser_version = caps.get('browserVersion')
+        if not browser_version:
+            chrome_info = caps.get('chrome', {})
+            cd_version = chrome_info.get('chromedriverVersion', '')
+            if cd_version:
+                browser_version = cd_version.split(' ')[0]
+        if not browser_version:
+            return False, "Unknown"
+        major_version = int(browser_version.split('.')[0])
+        return major_version >= NEED_CHROME_VERSION, browser_version
+    except:
+        return False, "Version check error"
+
+
+def create_driver(user_data_dir=None, headless=False, diet=False):
+    """Start Chrome, optionally on its own profile directory. Returns ``(driver, error)``.
+
+    ``diet`` adds the lean flag set from diet.py.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--window-size=800,1000")
+    chrome_options.add_argument("--window-position=10000,0")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        # WhatsApp Web refuses headless user agents
+        chrome_options.add_argument(f"--user-agent={HEADLESS_USER_AGENT}")
+    if diet:
+        apply_flags(chrome_options)
+
+    service = Service(CHROMEDRIVER_PATH)
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception as e:
+        err_msg = str(e)
+        if "This version of ChromeDriver only supports Chrome version" in err_msg:
+            match = re.search(r"only supports Chrome version (\d+)", err_msg)
+            needed = match.group(1) if match else "148+"
+            return None, f"Chrome version {needed}+ required."
+        else:
+            return None, f"Chrome startup error: {err_msg}"
+
+    compatible, version = is_chrome_version_compatible(driver)
+    if not compatible:
+        driver.quit()
+        return None, f"Chrome version ({version}) is too old. Update to {NEED_CHROME_VERSION}+."
+    return driver, None
+
+
+def capture_qr_code(user_data_dir=None, qr_path=QR_PATH, headless=False, diet=False):
+    """Open WhatsApp Web and save the login QR to ``qr_path``. Returns ``(driver, error)``.
+
+    If the profile in ``user_data_dir`` is already linked, the chat list shows
+    up instead of the QR and no QR is saved; check with ``is_authenticated``.
+    """
+    driver, error = create_driver(user_data_dir, headless, diet)
+    if driver is None:
+        return None, error
+
+    driver.get(WHATSAPP_URL)
+    print("Loading WhatsApp Web...")
+
+    state, qr_canvas, elapsed = wait_for_any(
+        driver, {"chats": CHAT_LIST, "qr": QR_CANVAS}, LOAD_TIMEOUT, max_poll=1
+    )
+    if state == "chats":
+        print(f"Session already linked ({elapsed:.1f}s)")
+        return driver, None
+    if state == "qr":
+        try:
+            time.sleep(1.5)
+            qr_temp_path = os.path.join(os.getcwd(), qr_path)
+            qr_canvas.screenshot(qr_temp_path)
+
+            from PIL import Image as PILImage
+            if os.path.exists(qr_temp_path):
+                img = PILImage.open(qr_temp_path)
+                if img.mode in ("RGBA", "P"):
+                    img = img.convert("RGB")
+                border = 10
+                new_img = PILImage.new("RGB", (img.width + 2*border, img.height + 2*border), (255,255,255))
+                new_img.paste(img, (border, border))
+                new_img.save(qr_temp_path, quality=98)
+            return driver, None
+        except Exception as e:
+            print(f"QR capture error: {e}")
+
+    driver.quit()
+    return None, "Failed to capture QR code."
+
+
+def is_authenticated(driver):
+    try:
+        return bool(driver.find_elements(*CHAT_LIST))
+    except Exception:
+        return False
+
+
+def wait_for_chats(driver, timeout):
+    """Wait until the chat list is loaded and sending can start."""
+    state, _, _ = wait_for_any(driver, {"chats": CHAT_LIST}, timeout, max_poll=1)
+    return state is not None
+
+
+def wait_for_qr_scan(driver, timeout):
+    """Wait until the QR canvas disappears. Returns False if it is still there after ``timeout``."""
+    wait_counter = 0
+    while wait_counter < timeout:
+        try:
+            driver.find_element(By.XPATH, '//canvas')
+            time.sleep(2)
+            wait_counter += 2
+        except:
+            return True
+    return False
+
+
+def open_chat_by_url(driver, phone, message, timer):
+    """Load the send URL for ``phone``. Returns ``(message_box, failure)``."""
+    url = f"{WHATSAPP_URL}/send?phone={phone}&text={urllib.parse.quote(message)}"
+    driver.get(url)
+    timer.mark("navigate")
+
+    state, message_box, _ = wait_for_any(
+        driver,
+        {"compose": COMPOSE_BOX, "invalid": INVALID_PHONE_DIALOG},
+        COMPOSE_TIMEOUT
+    )
+    timer.mark("compose_wait")
+    if state != "compose":
+        failure = INVALID_NUMBER if state == "invalid" else ELEMENT_TIMEOUT
+        print(f"Error sending to {phone}: {failure} ({timer})")
+        return None, failure
+    return message_box, None
+
+
+PreparedMessage = namedtuple("PreparedMessage", ["phone", "box", "before", "timer"])
+
+
+def prepare_msg(driver, phone, message, navigator=None, timer=None):
+    """Open the chat for ``phone`` and type ``message`` without sending it.
+
+    Returns ``(PreparedMessage, None)`` or ``(None, failure)``. Stage times
+    go to ``timer`` (a new StageTimer if not given).
+    """
+    timer = timer if timer is not None else StageTimer()
+    try:
+        message_box = navigator.open(driver, phone) if navigator else None
+        if message_box is not None:
+            timer.mark("navigate")
+            before = count_outgoing(driver)
+            type_message(message_box, message)
+        else:
+            message_box, failure = open_chat_by_url(driver, phone, message, timer)
+            if message_box is None:
+                return None, failure
+            before = count_outgoing(driver)
+            message_box.send_keys(" ")
+
+        wait_for_any(driver, {"send": SEND_BUTTON}, SEND_BUTTON_TIMEOUT)
+        timer.mark("send_ready")
+        return PreparedMessage(phone, message_box, before, timer), None
+    except Exception as e:
+        failure = classify_exception(e)
+        print(f"Error sending to {phone}: {failure}: {e} ({timer})")
+        return None, failure
+
+
+def deliver_msg(driver, prepared):
+    """Press send on a chat readied by ``prepare_msg``. Returns SENT or the failure class."""
+    phone, timer = prepared.phone, prepared.timer
+    try:
+        prepared.box.send_keys(Keys.ENTER)
+        timer.mark("send")
+        state, _, _ = wait_for_any(driver, {"tick": new_outgoing_message(prepared.before)}, TICK_TIMEOUT)
+        timer.mark("confirm")
+        if state is None:
+            print(f"No status tick for {phone} ({timer})")
+        else:
+            print(f"Sent to {phone} ({timer})")
+        return SENT
+    except Exception as e:
+        failure = classify_exception(e)
+        print(f"Error sending to {phone}: {failure}: {e} ({timer})")
+        return failure
+
+
+class Session:
+    """One logged-in WhatsApp Web browser and its chat navigator.
+
+    The WhatsApp tab is replaced by a fresh one every ``recycle_every``
+    messages, so a long run does not keep one renderer growing for hours.
+
+    With ``diet``, images, media and fonts are blocked once logged in and the
+    renderer's memory is checked every few messages: over the limit, the tab
+    is recycled, and if that does not help the browser is restarted on the
+    same ``user_data_dir``, which keeps the WhatsApp login.
+    """
+
+    def __init__(self, driver, name="default", recycle_every=TAB_RECYCLE_EVERY,
+                 user_data_dir=None, headless=False, diet=False):
+        self.driver = driver
+        self.name = name
+        self.navigator = ChatNavigator(NAVIGATION_MODE)
+        self.recycle_every = recycle_every
+        self.user_data_dir = user_data_dir
+        self.headless = headless
+        self.diet = diet
+        self.delivered = 0
+        # Stage times of the message being sent, read by the Dispatcher's metrics
+        self.timer = None
+        self.tracker = DeliveryTracker()
+
+    def start_diet(self):
+        """Call once logged in; blocking earlier could hide parts of the login page."""
+        if self.diet:
+            block_heavy_requests(self.driver)
+
+    def send(self, phone, message, attachment=None):
+        prepared, failure = self.prepare(phone, message)
+        if prepared is None:
+            return failure
+        return self.deliver(prepared, attachment)
+
+    def prepare(self, phone, message):
+        self._maintain()
+        self.timer = StageTimer()
+        return prepare_msg(self.driver, phone, message, self.navigator, self.timer)
+
+    def deliver(self, prepared, attachment=None):
+        """Send a prepared message, then ``attachment`` (an attachments.PreparedAttachment) if given."""
+        self.delivered += 1
+        pressed_at = time.monotonic()
+        result = deliver_msg(self.driver, prepared)
+        if result == SENT and attachment is not None:
+            result = send_attachment(self.driver, attachment, prepared.timer)
+        if result == SENT:
+            self.tracker.track(prepared.phone, pressed_at)
+        return result
+
+    def confirm(self, budget):
+        """Watch the ticks of the message just delivered for up to ``budget`` seconds.
+
+        Must run before the next chat is opened. Returns a delivery.Confirmation or None.
+        """
+        return self.tracker.settle(self.driver, budget)
+
+    def _maintain(self):
+        if self.recycle_every and self.delivered >= self.recycle_every:
+            self.recycle_tab()
+            return
+        if not self.diet or not self.delivered or self.delivered % MEMORY_CHECK_EVERY:
+            return
+        used = renderer_memory_mb(self.driver)
+        if used is None or used < MEMORY_LIMIT_MB:
+            return
+        print(f"{self.name}: renderer at {used:.0f} MB, recycling the tab")
+        if self.recycle_tab():
+            used = renderer_memory_mb(self.driver)
+            if used is None or used < MEMORY_LIMIT_MB:
+                return
+        self.restart_browser()
+
+    def recycle_tab(self):
+        """Swap the WhatsApp tab for a new one. Returns False if the chat list did not come back."""
+        self.delivered = 0
+        try:
+            old = self.driver.current_window_handle
+            self.driver.switch_to.new_window("tab")
+            new = self.driver.current_window_handle
+            # Close the old tab first: WhatsApp Web allows one open instance per browser
+            self.driver.switch_to.window(old)
+            self.driver.close()
+            self.driver.switch_to.window(new)
+            # Blocking is per tab, so it has to be set again before loading
+            self.start_diet()
+            self.driver.get(WHATSAPP_URL)
+        except Exception as e:
+            print(f"Could not recycle the tab of {self.name}: {e}")
+            return False
+        self.navigator = ChatNavigator(NAVIGATION_MODE)
+        return wait_for_chats(self.driver, LOAD_TIMEOUT)
+
+    def restart_browser(self):
+        """Quit and relaunch Chrome on the same profile. Returns False if that is not possible."""
+        if not self.user_data_dir:
+            print(f"{self.name} has no profile directory, not restarting the browser")
+            return False
+        print(f"Restarting the browser of {self.name}")
+        self.quit()
+        driver, error = create_driver(self.user_data_dir, self.headless, self.diet)
+        if driver is None:
+            # Leave the dead driver in place: the next send fails as BROWSER_CRASH
+            print(f"Could not restart {self.name}: {error}")
+            return False
+        self.driver = driver
+        self.delivered = 0
+        self.navigator = ChatNavigator(NAVIGATION_MODE)
+        try:
+            self.start_diet()
+            driver.get(WHATSAPP_URL)
+        except Exception as e:
+            print(f"Could not reload WhatsApp in {self.name}: {e}")
+            return False
+        return wait_for_chats(driver, LOAD_TIMEOUT)
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except:
+            pass
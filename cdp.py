@@ -0,0 +1,405 @@
+# cdp.py
+#
+# asyncio sending engine that talks to Chrome over the DevTools protocol
+# instead of blocking WebDriver calls. One browser (one WhatsApp account) per
+# endpoint; all of them are driven concurrently from a single event loop, and
+# waits are DOM MutationObserver promises rather than polling.
+
+import json
+import asyncio
+import itertools
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+from config import WHATSAPP_URL
+from readiness import (
+    COMPOSE_BOX, INVALID_PHONE_DIALOG, CHAT_LIST, OUTGOING_MESSAGE,
+    COMPOSE_TIMEOUT, TICK_TIMEOUT,
+)
+from retry import (
+    RetryQueue, SENT, SKIPPED, INVALID_NUMBER, ELEMENT_TIMEOUT, BROWSER_CRASH, TRANSIENT, classify_exception,
+)
+from scheduler import RateScheduler, DEFAULT_PACING
+
+COMMAND_TIMEOUT = 30
+LOAD_TIMEOUT = 60
+
+# Resolves to the name of the first XPath that matches, or null on timeout
+_WAIT_JS = """
+((xpaths, timeout) => new Promise(resolve => {
+  const find = () => {
+    for (const [name, xp] of Object.entries(xpaths)) {
+      const node = document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+      if (node) return name;
+    }
+    return null;
+  };
+  const hit = find();
+  if (hit) return resolve(hit);
+  const observer = new MutationObserver(() => {
+    const h = find();
+    if (h) { observer.disconnect(); clearTimeout(timer); resolve(h); }
+  });
+  observer.observe(document, {childList: true, subtree: true, attributes: true});
+  const timer = setTimeout(() => { observer.disconnect(); resolve(null); }, timeout);
+}))(%s, %d)
+"""
+
+
+class CDPError(Exception):
+    pass
+
+
+def _xpath(locator):
+    by, value = locator
+    if by == "id":
+        return f'//*[@id="{value}"]'
+    return value
+
+
+def browser_ws_url(host="127.0.0.1", port=9222):
+    """Browser-level WebSocket URL of a Chrome started with --remote-debugging-port."""
+    with urllib.request.urlopen(f"http://{host}:{port}/json/version", timeout=5) as response:
+        return json.load(response)["webSocketDebuggerUrl"]
+
+
+# ------------------------------
+# Protocol connection
+# ------------------------------
+class CDPConnection:
+    """One WebSocket to a browser; commands are matched to replies by id."""
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self.ws = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._waiters = []
+        self._reader = None
+
+    async def connect(self):
+        # Optional dependency, only needed for this engine
+        import websockets
+        self.ws = await websockets.connect(self.ws_url, max_size=None)
+        self._reader = asyncio.create_task(self._read())
+        return self
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                msg = json.loads(raw)
+                if "id" in msg:
+                    future = self._pending.pop(msg["id"], None)
+                    if future and not future.done():
+                        if "error" in msg:
+                            future.set_exception(CDPError(msg["error"].get("message", "CDP error")))
+                        else:
+                            future.set_result(msg.get("result", {}))
+                else:
+                    for waiter in list(self._waiters):
+                        method, session_id, future = waiter
+                        if msg.get("method") == method and msg.get("sessionId") == session_id and not future.done():
+                            future.set_result(msg.get("params", {}))
+        except Exception:
+            pass
+        finally:
+            closed = CDPError("disconnected")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(closed)
+            for _, _, future in self._waiters:
+                if not future.done():
+                    future.set_exception(closed)
+
+    async def send(self, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT):
+        msg_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        message = {"id": msg_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        try:
+            await self.ws.send(json.dumps(message))
+        except Exception as e:
+            self._pending.pop(msg_id, None)
+            raise CDPError(f"disconnected: {e}")
+        return await asyncio.wait_for(future, timeout)
+
+    def expect(self, method, session_id=None):
+        """Future for the next ``method`` event; create it before triggering the event."""
+        future = asyncio.get_running_loop().create_future()
+        waiter = (method, session_id, future)
+        self._waiters.append(waiter)
+        future.add_done_callback(lambda _: self._waiters.remove(waiter))
+        return future
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self.ws:
+            await self.ws.close()
+
+
+class CDPTab:
+    """A page target attached with a flat session.
+
+    ``owned`` tabs were opened by us and are closed by ``close``; others are
+    only detached from.
+    """
+
+    def __init__(self, conn, target_id, session_id, owned=True):
+        self.conn = conn
+        self.target_id = target_id
+        self.session_id = session_id
+        self.owned = owned
+
+    @classmethod
+    async def _attach(cls, conn, target_id, owned):
+        attached = await conn.send("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+        tab = cls(conn, target_id, attached["sessionId"], owned)
+        await tab.send("Page.enable")
+        return tab
+
+    @classmethod
+    async def open(cls, conn, url="about:blank"):
+        target = await conn.send("Target.createTarget", {"url": url})
+        return await cls._attach(conn, target["targetId"], owned=True)
+
+    @classmethod
+    async def find_or_open(cls, conn, url):
+        """Attach to the browser's page already at ``url``, or open one if there is none.
+
+        WhatsApp Web runs in one tab per browser; a second one would take
+        over the session and leave the first asking to "Use here".
+        """
+        targets = (await conn.send("Target.getTargets")).get("targetInfos", [])
+        for target in targets:
+            if target.get("type") == "page" and target.get("url", "").startswith(url):
+                return await cls._attach(conn, target["targetId"], owned=False)
+        return await cls.open(conn, url)
+
+    async def send(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        return await self.conn.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def navigate(self, url, timeout=LOAD_TIMEOUT):
+        loaded = self.conn.expect("Page.loadEventFired", self.session_id)
+        try:
+            result = await self.send("Page.navigate", {"url": url})
+        except BaseException:
+            # The reader may have failed it already; retrieve that, too
+            if not loaded.cancel() and not loaded.cancelled():
+                loaded.exception()
+            raise
+        if result.get("errorText"):
+            loaded.cancel()
+            raise CDPError(result["errorText"])
+        await asyncio.wait_for(loaded, timeout)
+
+    async def evaluate(self, expression, timeout=COMMAND_TIMEOUT):
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression, "awaitPromise": True, "returnByValue": True,
+        }, timeout=timeout)
+        if "exceptionDetails" in result:
+            raise CDPError(result["exceptionDetails"].get("text", "script error"))
+        return result.get("result", {}).get("value")
+
+    async def wait_for_any(self, conditions, timeout):
+        """Name of the first locator in ``conditions`` to appear, or None after ``timeout``."""
+        xpaths = {name: _xpath(locator) for name, locator in conditions.items()}
+        expression = _WAIT_JS % (json.dumps(xpaths), int(timeout * 1000))
+        return await self.evaluate(expression, timeout=timeout + COMMAND_TIMEOUT)
+
+    async def count(self, locator):
+        return int(await self.evaluate(
+            f"document.evaluate({json.dumps('count(' + _xpath(locator) + ')')}, document, null, "
+            "XPathResult.NUMBER_TYPE, null).numberValue"
+        ))
+
+    async def press_enter(self):
+        for event_type in ("keyDown", "keyUp"):
+            await self.send("Input.dispatchKeyEvent", {
+                "type": event_type, "key": "Enter", "code": "Enter",
+                "windowsVirtualKeyCode": 13, "nativeVirtualKeyCode": 13,
+                **({"text": "\r"} if event_type == "keyDown" else {}),
+            })
+
+    async def close(self):
+        try:
+            if self.owned:
+                await self.conn.send("Target.closeTarget", {"targetId": self.target_id}, timeout=5)
+            else:
+                await self.conn.send("Target.detachFromTarget", {"sessionId": self.session_id}, timeout=5)
+        except Exception:
+            pass
+
+
+# ------------------------------
+# Sending
+# ------------------------------
+async def send_message(tab, phone, message):
+    """Send one message in ``tab``. Returns SENT or a failure class."""
+    url = f"{WHATSAPP_URL}/send?phone={phone}&text={urllib.parse.quote(message)}"
+    try:
+        await tab.navigate(url)
+        state = await tab.wait_for_any({"compose": COMPOSE_BOX, "invalid": INVALID_PHONE_DIALOG}, COMPOSE_TIMEOUT)
+        if state == "invalid":
+            return INVALID_NUMBER
+        if state != "compose":
+            return ELEMENT_TIMEOUT
+
+        before = await tab.count(OUTGOING_MESSAGE)
+        await tab.evaluate(
+            f"document.evaluate({json.dumps(_xpath(COMPOSE_BOX))}, document, null, "
+            "XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue.focus()"
+        )
+        await tab.press_enter()
+
+        tick = (
+            "xpath",
+            f'(//div[contains(@class, "message-out")])[{before + 1}]'
+            '//span[@data-icon="msg-time" or @data-icon="msg-check" or @data-icon="msg-dblcheck"]'
+        )
+        if await tab.wait_for_any({"tick": tick}, TICK_TIMEOUT) is None:
+            print(f"No status tick for {phone}")
+        return SENT
+    except asyncio.TimeoutError:
+        return ELEMENT_TIMEOUT
+    except Exception as e:
+        # Same classes as the WebDriver path: a lost connection is a crash,
+        # net:: errors are network, anything else is final
+        failure = classify_exception(e)
+        print(f"Error sending to {phone}: {failure}: {e}")
+        return failure
+
+
+class AsyncEngine:
+    """Sends contacts through several CDP endpoints concurrently.
+
+    ``endpoints`` are browser WebSocket URLs, one per logged-in Chrome; each
+    is driven through its open WhatsApp Web tab, and ``run`` raises CDPError
+    if that tab never shows the chat list. ``run`` can be cancelled at any
+    point (``stop()`` from another thread); tabs and connections are
+    released on the way out.
+
+    With a ``journal``, every attempt is recorded as soon as it returns, and
+    if ``resume`` is set, contacts the journal already has as sent are
+    skipped (passed to ``on_result`` as SKIPPED). As in sessions.Dispatcher,
+    retries still queued at the end fail with their last result, and if
+    every endpoint crashed the contacts never reached fail as BROWSER_CRASH.
+    """
+
+    def __init__(self, endpoints, base_delay, pacing=DEFAULT_PACING, on_result=None, retry_queue=None,
+                 journal=None, resume=False):
+        self.endpoints = endpoints
+        self.base_delay = base_delay
+        self.pacing = pacing
+        self.on_result = on_result
+        self.retries = retry_queue if retry_queue is not None else RetryQueue()
+        self.journal = journal
+        self.resume = resume
+        self.sent = 0
+        self.failed = 0
+        self.done = 0
+        self.skipped = 0
+        self.failures = Counter()
+        self._exhausted = False
+        self._crashed = 0
+        self._loop = None
+        self._task = None
+
+    async def run(self, contacts):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        contacts = iter(contacts)
+        connections = []
+        tabs = []
+        try:
+            for url in self.endpoints:
+                conn = await CDPConnection(url).connect()
+                connections.append(conn)
+                tab = await CDPTab.find_or_open(conn, WHATSAPP_URL)
+                tabs.append(tab)
+                if await tab.wait_for_any({"chats": CHAT_LIST}, LOAD_TIMEOUT) != "chats":
+                    raise CDPError(f"WhatsApp Web chat list did not load at {url}; is the account linked?")
+            await asyncio.gather(*(self._worker(tab, contacts) for tab in tabs))
+
+            # Whatever is still queued had no live endpoint left to retry it
+            for contact, result in self.retries.drain():
+                self._finish(contact, result)
+            if self._crashed == len(tabs) and not self._exhausted:
+                unreached = 0
+                contact = self._next_fresh(contacts)
+                while contact is not None:
+                    self._finish(contact, BROWSER_CRASH)
+                    unreached += 1
+                    contact = self._next_fresh(contacts)
+                print(f"⚠️ All endpoints crashed; {unreached} contacts were not reached")
+        finally:
+            for tab in tabs:
+                await tab.close()
+            for conn in connections:
+                await conn.close()
+            if self.journal:
+                self.journal.flush()
+        return self.sent, self.failed
+
+    def stop(self):
+        """Cancel a running ``run`` from any thread."""
+        if self._loop and self._task:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def _next(self, contacts):
+        retry = self.retries.pop_ready()
+        if retry is not None:
+            return retry
+        if self._exhausted:
+            return None
+        contact = self._next_fresh(contacts)
+        return (contact, 0) if contact is not None else None
+
+    def _next_fresh(self, contacts):
+        for contact in contacts:
+            if self.resume and self.journal and self.journal.is_sent(contact.phone, contact.message):
+                self.done += 1
+                self.skipped += 1
+                if self.on_result:
+                    self.on_result(self.done, contact, SKIPPED)
+                continue
+            return contact
+        self._exhausted = True
+        return None
+
+    def _finish(self, contact, result):
+        self.done += 1
+        if result == SENT:
+            self.sent += 1
+        else:
+            self.failed += 1
+            self.failures[result] += 1
+        if self.on_result:
+            self.on_result(self.done, contact, result)
+
+    async def _worker(self, tab, contacts):
+        scheduler = RateScheduler(self.base_delay, self.pacing)
+        while True:
+            item = self._next(contacts)
+            if item is None:
+                wait = self.retries.next_due()
+                if wait is None:
+                    return
+                await asyncio.sleep(min(wait, 1.0))
+                continue
+            contact, attempts = item
+            await asyncio.sleep(scheduler.acquire())
+            result = await send_message(tab, contact.phone, contact.message)
+            if self.journal:
+                self.journal.record(contact.phone, contact.message, result)
+            scheduler.record(result == SENT)
+            attempts += 1
+            if not (result in TRANSIENT and self.retries.push(contact, attempts, result)):
+                self._finish(contact, result)
+            if result == BROWSER_CRASH:
+                print("⚠️ A DevTools endpoint crashed, stopping it")
+                self._crashed += 1
+                return
@@ -0,0 +1,197 @@
+# cli.py
+#
+# Headless batch runner: no Kivy, no window.
+#
+#   python cli.py contacts.xlsx --delay 10 --headless --json
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from config import DEFAULT_PROFILE, DEFAULT_COUNTRY_CODE, MAX_SESSIONS
+from scheduler import PACING_PROFILES, DEFAULT_PACING
+from engine import Campaign
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send WhatsApp messages to a contacts file without the GUI.")
+    parser.add_argument("contacts", help="contacts file (.xlsx, .xls or .csv)")
+    parser.add_argument("--delay", type=int, default=10, help="base delay between messages, seconds (default: 10)")
+    parser.add_argument("--sessions", type=int, default=1, choices=range(1, MAX_SESSIONS + 1),
+                        help="parallel browser sessions / accounts (default: 1)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="browser profile name (default: %(default)s)")
+    parser.add_argument("--pacing", default=DEFAULT_PACING, choices=list(PACING_PROFILES))
+    parser.add_argument("--country-code", default=DEFAULT_COUNTRY_CODE,
+                        help="country code for numbers written without one (default: %(default)s)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="send again to contacts the journal already has as sent")
+    parser.add_argument("--headless", action="store_true", help="run Chrome without a window")
+    template = parser.add_mutually_exclusive_group()
+    template.add_argument("--template", help="message template, e.g. 'Hi {name|there}' (see template.py)")
+    template.add_argument("--template-file", help="read the message template from this UTF-8 file")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only message contacts that are new or changed since this list was last sent")
+    parser.add_argument("--list-name", metavar="NAME",
+                        help="contact list the file is a version of, for --incremental (default: file name)")
+    parser.add_argument("--attachment", metavar="PATH",
+                        help="image, video or document sent to every contact after the message; "
+                             "an 'attachment' column in the file overrides it per contact")
+    parser.add_argument("--diet", action="store_true",
+                        help="lean Chrome: block images, media and fonts after login and restart "
+                             "the tab or browser when its memory grows")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics while sending")
+    parser.add_argument("--json", action="store_true", help="emit progress as JSON lines on stdout")
+    parser.add_argument("--cdp", action="append", metavar="ENDPOINT",
+                        help="send through an already logged-in Chrome started with --remote-debugging-port "
+                             "(host:port or ws:// URL); repeat for more accounts. Needs the websockets package")
+    return parser.parse_args(argv)
+
+
+def text_printer(out):
+    def on_event(event, data):
+        if event == "qr":
+            print(f"Scan the QR code in {data['qr_path']} ({data['session']})", file=out, flush=True)
+        elif event == "error":
+            print(f"Error: {data['message'] or 'connection failed'}", file=out, flush=True)
+        elif event == "preflight":
+            print(f"{data['total']} contacts to send "
+                  f"({data['duplicate']} duplicate, {data['invalid']} invalid)", file=out, flush=True)
+        elif event == "diff":
+            print(f"Changes: {data['new']} new, {data['changed']} changed, {data['unchanged']} unchanged, "
+                  f"{data['removed']} removed", file=out, flush=True)
+        elif event == "progress" and data['result'] != "skipped":
+            total = data['total'] or "?"
+            print(f"[{data['done']}/{total}] {data['phone']}: {data['result']}", file=out, flush=True)
+        elif event == "finished":
+            print(f"Done in {data['elapsed']:.0f}s: {data['sent']} sent, {data['failed']} failed, "
+                  f"{data['skipped']} skipped", file=out, flush=True)
+            if data.get("delivery"):
+                print("Ticks: " + ", ".join(f"{status}={n}" for status, n in data["delivery"].items()),
+                      file=out, flush=True)
+            for source, (uploads, mean) in data.get("uploads", {}).items():
+                print(f"  {os.path.basename(source)}: {uploads} uploads, mean {mean:.1f}s", file=out, flush=True)
+            for stage, t in data.get("metrics", {}).get("stages", {}).items():
+                print(f"  {stage:<13} n={t['count']:<7} mean={t['mean']:.4f}s p50<={t['p50']}s p99<={t['p99']}s",
+                      file=out, flush=True)
+    return on_event
+
+
+def json_printer(out):
+    def on_event(event, data):
+        out.write(json.dumps({"event": event, **data}, ensure_ascii=False) + "\n")
+        out.flush()
+    return on_event
+
+
+def cdp_unsupported(args):
+    """Options given in ``args`` that the DevTools engine would ignore."""
+    from contacts import read_header, resolve_columns
+
+    flags = [
+        ("--sessions", args.sessions != 1), ("--profile", args.profile != DEFAULT_PROFILE),
+        ("--headless", args.headless), ("--diet", args.diet), ("--metrics-port", args.metrics_port is not None),
+        ("--attachment", args.attachment), ("--incremental", args.incremental),
+    ]
+    unsupported = [flag for flag, given in flags if given]
+    try:
+        if resolve_columns(read_header(args.contacts))['attachment']:
+            unsupported.append("an attachment column")
+    except OSError:
+        pass
+    return unsupported
+
+
+def run_cdp(args, on_event, template=None):
+    """Send with the asyncio DevTools engine. Returns the number of failures, or None if it could not start."""
+    from contacts import iter_prepared, read_header, template_columns
+    from preflight import Preflight
+    from template import Template, TemplateError
+    from journal import SendJournal
+    from cdp import AsyncEngine, CDPError, browser_ws_url
+
+    if template:
+        try:
+            template = Template(template)
+            template.validate(template_columns(read_header(args.contacts)))
+        except TemplateError as e:
+            on_event("error", {"message": str(e)})
+            return None
+
+    endpoints = []
+    for endpoint in args.cdp:
+        if not endpoint.startswith("ws"):
+            host, _, port = endpoint.rpartition(":")
+            try:
+                endpoint = browser_ws_url(host or "127.0.0.1", int(port))
+            except OSError as e:
+                on_event("error", {"message": f"No DevTools endpoint at {endpoint}: {e}"})
+                return None
+        endpoints.append(endpoint)
+
+    def on_result(done, contact, result):
+        on_event("progress", {"done": done, "total": None, "phone": contact.phone, "result": result})
+
+    journal = SendJournal()
+    engine = AsyncEngine(endpoints, args.delay, pacing=args.pacing, on_result=on_result,
+                         journal=journal, resume=args.resume)
+    start = time.monotonic()
+    contacts = iter_prepared(args.contacts, preflight=Preflight(args.country_code), template=template or None)
+    try:
+        sent, failed = asyncio.run(engine.run(contacts))
+    except KeyboardInterrupt:
+        sent, failed = engine.sent, engine.failed
+    except (CDPError, OSError) as e:
+        on_event("error", {"message": str(e)})
+        return None
+    finally:
+        journal.close()
+    if engine.skipped:
+        print(f"Skipped {engine.skipped} contacts already sent in a previous run")
+    on_event("finished", {"sent": sent, "failed": failed, "skipped": engine.skipped,
+                          "failures": dict(engine.failures), "elapsed": time.monotonic() - start})
+    return failed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = sys.stdout
+    if args.json:
+        # Keep stdout a clean JSON stream; diagnostic prints go to stderr
+        sys.stdout = sys.stderr
+    on_event = json_printer(out) if args.json else text_printer(out)
+
+    template = args.template
+    if args.template_file:
+        with open(args.template_file, encoding="utf-8") as f:
+            template = f.read()
+
+    if args.cdp:
+        unsupported = cdp_unsupported(args)
+        if unsupported:
+            on_event("error", {"message": "Not supported with --cdp: " + ", ".join(unsupported)})
+            return 1
+        failed = run_cdp(args, on_event, template)
+        return 1 if failed is None else 0 if failed == 0 else 2
+
+    campaign = Campaign(
+        args.contacts, delay=args.delay, sessions=args.sessions, profile=args.profile,
+        pacing=args.pacing, resume=args.resume, headless=args.headless,
+        country_code=args.country_code, diet=args.diet, metrics_port=args.metrics_port,
+        template=template, attachment=args.attachment, incremental=args.incremental,
+        list_name=args.list_name, on_event=on_event
+    )
+    if not campaign.connect():
+        return 1
+    try:
+        dispatcher = campaign.run()
+    finally:
+        campaign.close()
+    return 0 if dispatcher.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
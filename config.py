@@ -0,0 +1,59 @@
+# config.py
+
+import os
+import sys
+
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+# ------------------------------
+# Config
+# ------------------------------
+APP_VERSION = "v1.5.0"
+NEED_CHROME_VERSION = 142
+QR_SCAN_TIMEOUT = 60
+START_SEND_TIMEOUT = 20
+EXIT_DRIVER_TIMEOUT = 10
+QR_PATH = "qr_code.png"
+# Point at a local stand-in (e.g. "http://127.0.0.1:8000") to run without web.whatsapp.com
+WHATSAPP_URL = os.environ.get("WHATSAPP_URL", "https://web.whatsapp.com").rstrip("/")
+CHROMEDRIVER_PATH = resource_path("drivers/chromedriver.exe")
+# "in_app" opens chats inside the loaded WhatsApp Web app, "reload" loads the send URL per contact
+NAVIGATION_MODE = "in_app"
+# Open and type the next chat before waiting out the pacing delay, so page
+# load overlaps with the delay instead of adding to it
+PIPELINE = True
+# Messages per WhatsApp tab before it is replaced by a fresh one (0 = never)
+TAB_RECYCLE_EVERY = 300
+# Named Chrome user-data-dirs; a linked profile skips the QR scan on the next run.
+# Each parallel session gets its own profile (and linked account).
+PROFILES_DIR = "profiles"
+DEFAULT_PROFILE = "default"
+MAX_SESSIONS = 4
+# How long WhatsApp Web may take to show either the chat list or the QR
+LOAD_TIMEOUT = 35
+# Campaign job queue shared by the GUI and the background workers (see jobs.py)
+JOBS_PATH = "jobs.db"
+# Each job writes its metrics, QR codes and preflight report under here, in job_<id>
+JOB_OUTPUT_DIR = "job_output"
+# Append-only log of every send attempt, used to resume without duplicate sends
+JOURNAL_PATH = "send_journal.db"
+# Fingerprints of contacts already messaged from each recurring list (see store.py)
+CONTACT_STORE_PATH = "contact_store.db"
+# Country code given to numbers written without one ("0912...", "912...")
+DEFAULT_COUNTRY_CODE = "98"
+# Rows dropped by the preflight (invalid / duplicate numbers) are listed here
+PREFLIGHT_REPORT = "preflight_report.csv"
+# Campaign metrics: one JSON line per message, and a Prometheus text file
+# rewritten every METRICS_EXPORT_INTERVAL seconds
+METRICS_JSONL = "metrics.jsonl"
+METRICS_PROM = "metrics.prom"
+METRICS_EXPORT_INTERVAL = 5
+# Images re-encoded for sending are kept here, keyed by content, across runs
+ATTACHMENT_CACHE_DIR = "attachment_cache"
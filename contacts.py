@@ -0,0 +1,451 @@
+# contacts.py
+
+import os
+import re
+import csv
+import time
+from itertools import islice
+from collections import namedtuple
+from threading import Thread, Event
+
+
+# Persian / English header aliases for each field of the contacts sheet
+COLUMN_ALIASES = {
+    'name': ['نام', 'name'],
+    'family': ['نام خانوادگی', 'family'],
+    'prefix': ['پیشوند', 'prefix'],
+    'phone': ['شماره همراه', 'phone'],
+    'message': ['متن پیام', 'message'],
+    'attachment': ['پیوست', 'attachment', 'file'],
+}
+
+_FLOAT_SUFFIX = re.compile(r'\.0+$')
+# Everything but digits and a leading '+' (kept so preflight can tell international numbers)
+_PHONE_JUNK = re.compile(r'(?!^\+)\D')
+
+# attachment: path of a file to send after the message, '' for none
+Contact = namedtuple("Contact", ["row", "phone", "name", "message", "attachment"], defaults=[""])
+
+
+# ------------------------------
+# Streaming readers
+# ------------------------------
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # The stored dimension can claim the whole grid (A1:AMJ1048576 for a
+        # formatted template); read-only mode would pad every row up to it
+        sheet.reset_dimensions()
+        for row in sheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            yield row
+
+
+def _iter_xls(path, nrows=None):
+    # Legacy .xls has no streaming reader; pandas loads it in one go
+    import pandas as pd
+    df = pd.read_excel(path, header=None, dtype=object, nrows=nrows)
+    for row in df.itertuples(index=False, name=None):
+        yield row
+
+
+def _is_blank(row):
+    if row.count(None) == len(row):
+        return True
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+
+def _trimmed(rows):
+    """Cut rows to the header's width and drop the blank rows at the end.
+
+    Blank rows between data rows are kept, so row numbers still match the
+    sheet; trailing ones are only counted, and never yielded.
+    """
+    try:
+        header = next(rows, None)
+        if header is None:
+            return
+        width = max((i + 1 for i, name in enumerate(header) if not _is_blank((name,))), default=0)
+        yield tuple(header[:width])
+        blanks = 0
+        for row in rows:
+            row = tuple(row[:width])
+            if _is_blank(row):
+                blanks += 1
+                continue
+            for _ in range(blanks):
+                yield (None,) * width
+            blanks = 0
+            yield row
+    finally:
+        rows.close()
+
+
+def iter_rows(path, limit=None):
+    """Yield the sheet's rows as tuples, header first, without loading the whole file.
+
+    Rows are cut to the header's width and trailing blank rows are dropped.
+    ``limit`` only matters for .xls, which is otherwise read whole: with it,
+    just the first ``limit`` rows are parsed.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return _trimmed(_iter_csv(path))
+    if ext == ".xls":
+        return _trimmed(_iter_xls(path, limit))
+    return _trimmed(_iter_xlsx(path))
+
+
+def resolve_columns(header):
+    """Map each field to the indices of its alias columns in ``header``, in alias order."""
+    names = [str(h).strip() if h is not None else "" for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        columns[field] = [names.index(alias) for alias in aliases if alias in names]
+    return columns
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        if value.is_integer():
+            value = int(value)
+    val = str(value).strip()
+    if val.lower() in ('nan', 'none', 'null'):
+        return ''
+    return val
+
+
+def build_contact(row_number, name, family, prefix, phone_raw, body):
+    if not phone_raw:
+        return None
+    # Whole numbers read as floats ("989121234567.0") must not gain a trailing digit
+    phone = _PHONE_JUNK.sub('', _FLOAT_SUFFIX.sub('', phone_raw))
+    full_name = ' '.join([x for x in [name, family] if x]).strip() or "User"
+    msg_lines = [x for x in [prefix, full_name if full_name != "User" else "", body] if x]
+    full_message = '\n'.join(msg_lines).strip() or "(No message)"
+    return Contact(row_number, phone, full_name, full_message)
+
+
+# ------------------------------
+# Preview
+# ------------------------------
+PREVIEW_ROWS = 10
+PREVIEW_SCAN_FACTOR = 20
+
+# Rows in a worksheet; a sheet formatted down to here says nothing of its data
+EXCEL_MAX_ROWS = 1_048_576
+
+# fields: {field: header name it was found under}; estimated_rows may be None
+FilePreview = namedtuple("FilePreview", ["header", "rows", "fields", "estimated_rows"])
+
+
+def estimate_rows(path):
+    """Rough data-row count of ``path`` without reading it through, or None."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(1024 * 1024)
+        lines = head.count(b"\n")
+        if len(head) == size:
+            # The whole file: exact, counting an unterminated last line
+            lines += bool(head) and not head.endswith(b"\n")
+            return max(lines - 1, 0)
+        return int(size / len(head) * lines) - 1 if lines else None
+    if ext == ".xlsx":
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            # From the sheet's stored dimensions; None if the writer left them
+            # out or stretched them over the whole grid
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        if not max_row or max_row >= EXCEL_MAX_ROWS:
+            return None
+        return max(max_row - 1, 0)
+    return None
+
+
+def preview_file(path, rows=PREVIEW_ROWS):
+    """The header, the first ``rows`` rows as text and the recognized fields of ``path``.
+
+    Reads only the top of the file, so it is quick even for large
+    workbooks. Raises ValueError if the file is empty or has no phone column.
+    """
+    # Blank rows are skipped, but only this far, so a sheet of empty
+    # formatted rows cannot turn the preview into a full read
+    scan = rows * PREVIEW_SCAN_FACTOR
+    reader = iter_rows(path, limit=scan + 1)
+    try:
+        header = next(reader, None)
+        sample = []
+        read = 0
+        ended = False
+        for row in islice(reader, scan):
+            read += 1
+            text = tuple(_cell_text(value) for value in row)
+            if any(text):
+                sample.append(text)
+                if len(sample) == rows:
+                    break
+        else:
+            ended = read < scan
+    finally:
+        reader.close()
+    if header is None:
+        raise ValueError("The file is empty")
+    names = [str(h).strip() if h is not None else "" for h in header]
+    fields = {field: names[indices[0]] for field, indices in resolve_columns(header).items() if indices}
+    if 'phone' not in fields:
+        raise ValueError("No phone column; name one of: " + ", ".join(COLUMN_ALIASES['phone']))
+    # Sheets often carry formatted but empty columns on the right
+    width = max((i + 1 for i, name in enumerate(names) if name), default=0)
+    # When the data ended within the scan its row count is known exactly
+    estimated = read if ended else estimate_rows(path)
+    return FilePreview(names[:width], [row[:width] for row in sample], fields, estimated)
+
+
+# ------------------------------
+# Vectorized preprocessing
+# ------------------------------
+CHUNK_SIZE = 50_000
+_NULL_WORDS = ('nan', 'none', 'null')
+
+
+def _clean_column(series):
+    text = series.astype("string").str.strip()
+    text = text.fillna('')
+    return text.mask(text.str.lower().isin(_NULL_WORDS), '')
+
+
+def _field(df, aliases, clean=_clean_column):
+    """First non-empty value across the alias columns of a field, column-wise."""
+    import pandas as pd
+    result = None
+    for alias in aliases:
+        if alias not in df.columns:
+            continue
+        column = clean(df[alias])
+        result = column if result is None else result.mask(result == '', column)
+    if result is None:
+        return pd.Series('', index=df.index, dtype="string")
+    return result
+
+
+def _clean_phone(series):
+    return _clean_column(series).str.replace(_FLOAT_SUFFIX.pattern, '', regex=True)
+
+
+def _join(left, right, sep):
+    joined = left + sep + right
+    joined = joined.mask(left == '', right)
+    return joined.mask(right == '', left)
+
+
+def template_columns(header):
+    """Names a message template may use with a file whose header row is ``header``.
+
+    Those are the header names themselves, the fields whose alias columns are
+    present, and ``full_name`` if there is a name or family column.
+    """
+    names = {str(h).strip() for h in header if h is not None and str(h).strip()}
+    fields = {field for field, indices in resolve_columns(header).items() if indices}
+    if fields & {"name", "family"}:
+        fields.add("full_name")
+    return names | fields
+
+
+def read_header(path):
+    """The header row of ``path`` as a list of names (empty for an empty file)."""
+    header = next(iter_rows(path), None)
+    return [str(h).strip() if h is not None else "" for h in header] if header else []
+
+
+def prepare_frame(df, first_row=0, template=None):
+    """Turn raw sheet rows into a ready-to-send table (row, phone, name, message).
+
+    Does the same as ``build_contact`` for every row, but with pandas string
+    operations over whole columns instead of a Python loop per row. With a
+    ``template`` (template.Template), it renders the message instead of the
+    default prefix / name / body layout.
+    """
+    import pandas as pd
+    df = df.loc[:, ~df.columns.duplicated()]
+    phone_raw = _field(df, COLUMN_ALIASES['phone'], clean=_clean_phone)
+    keep = phone_raw != ''
+    df = df[keep]
+    phone_raw = phone_raw[keep]
+
+    name = _field(df, COLUMN_ALIASES['name'])
+    family = _field(df, COLUMN_ALIASES['family'])
+    prefix = _field(df, COLUMN_ALIASES['prefix'])
+    body = _field(df, COLUMN_ALIASES['message'])
+
+    full_name = _join(name, family, ' ').str.strip()
+    has_name = full_name != ''
+    if template is None:
+        message = _join(_join(prefix, full_name, '\n'), body, '\n').str.strip()
+    else:
+        fields = {'name': name, 'family': family, 'prefix': prefix, 'phone': phone_raw,
+                  'message': body, 'full_name': full_name}
+
+        def lookup(column):
+            if column in fields:
+                return fields[column]
+            if column in df.columns:
+                return _clean_column(df[column])
+            return None
+
+        message = template.render_frame(lookup, df.index).str.strip()
+
+    return pd.DataFrame({
+        'row': df.index + first_row,
+        'phone': phone_raw.str.replace(_PHONE_JUNK.pattern, '', regex=True),
+        'name': full_name.where(has_name, "User"),
+        'message': message.mask(message == '', "(No message)"),
+        'attachment': _field(df, COLUMN_ALIASES['attachment']),
+    })
+
+
+def _frame(chunk, columns):
+    import pandas as pd
+    frame = pd.DataFrame.from_records(chunk).reindex(columns=range(len(columns)))
+    frame.columns = columns
+    return frame
+
+
+def iter_frames(path, chunksize=CHUNK_SIZE):
+    """Yield ``(first_row, frame)`` chunks of the raw sheet, reading lazily."""
+    rows = iter_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(h).strip() if h is not None else "" for h in header]
+    chunk = []
+    start = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunksize:
+            yield start, _frame(chunk, columns)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, _frame(chunk, columns)
+
+
+def iter_prepared_frames(path, chunksize=CHUNK_SIZE, preflight=None, metrics=None, template=None, diff=None,
+                         progress=None):
+    """Yield prepared chunks of ``path``, passed through ``preflight`` if given.
+
+    ``progress(rows)`` is called with the number of raw rows read so far
+    after each chunk.
+
+    With a ``diff`` (store.ContactDiff), only the rows that are new or
+    changed since the list was last sent are prepared.
+
+    With ``metrics``, the per-row cost of reading (``row_parse``) and of
+    preparing and checking (``normalize``) each chunk is recorded.
+    """
+    frames = iter_frames(path, chunksize)
+    while True:
+        began = time.perf_counter()
+        item = next(frames, None)
+        if item is None:
+            return
+        start, frame = item
+        parsed = time.perf_counter()
+        rows = len(frame)
+        if diff is not None:
+            frame = diff.filter(frame)
+        prepared = prepare_frame(frame, first_row=start, template=template)
+        if preflight is not None:
+            prepared = preflight.check(prepared)
+        if metrics is not None and rows:
+            metrics.observe("row_parse", (parsed - began) / rows, rows)
+            metrics.observe("normalize", (time.perf_counter() - parsed) / rows, rows)
+            metrics.count("rows_read", rows)
+        if progress is not None:
+            progress(start + rows)
+        yield prepared
+
+
+def iter_prepared(path, chunksize=CHUNK_SIZE, preflight=None, metrics=None, template=None, diff=None):
+    """Lazily yield Contacts, preprocessing the file one chunk at a time."""
+    for prepared in iter_prepared_frames(path, chunksize, preflight, metrics, template, diff):
+        for row in prepared.itertuples(index=False, name=None):
+            yield Contact(*row)
+
+
+# Smaller chunks than for sending, so progress moves and cancel is quick
+COUNT_CHUNK_SIZE = 10_000
+
+
+class RowCounter:
+    """Runs the preflight over a contacts file in a background thread.
+
+    ``total`` (contacts that will actually be sent) stays None until the pass
+    finishes; ``preflight`` then holds the duplicate/invalid report.
+    ``on_done(total)`` is called from the counting thread (with None if the
+    file could not be read or the pass was cancelled; ``error`` and
+    ``cancelled`` tell which). With a ``diff`` (store.ContactDiff) only new
+    and changed contacts are counted, and ``diff`` holds the whole-file diff.
+
+    ``rows_read`` grows as the pass goes, for progress bars; ``cancel()``
+    stops it after the current chunk.
+    """
+
+    def __init__(self, path, on_done=None, country_code=None, diff=None):
+        from preflight import Preflight
+        self.path = path
+        self.on_done = on_done
+        self.preflight = Preflight(country_code) if country_code else Preflight()
+        self.diff = diff
+        self.total = None
+        self.error = None
+        self.rows_read = 0
+        self.cancelled = False
+        self._cancel = Event()
+        self.thread = Thread(target=self._count, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _progress(self, rows):
+        self.rows_read = rows
+
+    def _count(self):
+        try:
+            frames = iter_prepared_frames(self.path, COUNT_CHUNK_SIZE, preflight=self.preflight, diff=self.diff,
+                                          progress=self._progress)
+            total = 0
+            for frame in frames:
+                if self._cancel.is_set():
+                    frames.close()
+                    self.cancelled = True
+                    break
+                total += len(frame)
+            else:
+                self.total = total
+        except Exception as e:
+            self.error = e
+            print(f"Error reading {self.path}: {e}")
+        if self.on_done:
+            self.on_done(self.total)
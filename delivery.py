@@ -0,0 +1,86 @@
+# delivery.py
+
+import time
+from collections import namedtuple
+
+from readiness import outgoing_status, MIN_POLL, MAX_POLL, POLL_GROWTH
+
+
+# ------------------------------
+# Delivery confirmation
+# ------------------------------
+# pending:     still on the clock icon, not accepted by the server yet
+# sent:        one grey tick, accepted by the server
+# delivered:   two ticks, on the recipient's phone
+# unconfirmed: the chat was left before any status showed up
+PENDING = "pending"
+SERVER_ACK = "sent"
+DELIVERED = "delivered"
+UNCONFIRMED = "unconfirmed"
+
+# Longest the tracker may watch one message, whatever the pacing leaves it
+CONFIRM_TIMEOUT = 15
+
+Confirmation = namedtuple("Confirmation", ["phone", "status", "ack_latency", "delivery_latency"])
+
+
+class DeliveryTracker:
+    """Watches the status ticks of the last message sent in a session.
+
+    Pressing ENTER only means the message was typed. ``track`` starts
+    watching it; ``settle`` polls its ticks for as long as the caller can
+    spare (normally the idle part of the pacing interval) and stops early
+    once it is delivered. Latencies are measured from ENTER to the first
+    tick (server ack) and to the double tick (delivered).
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.phone = None
+        self.pressed_at = None
+        self.status = None
+        self.ack_latency = None
+        self.delivery_latency = None
+
+    def track(self, phone, pressed_at):
+        self.phone = phone
+        self.pressed_at = pressed_at
+        self.status = None
+        self.ack_latency = None
+        self.delivery_latency = None
+
+    def poll(self, driver):
+        """Read the ticks once. Returns True when there is nothing left to wait for."""
+        if self.phone is None:
+            return True
+        status = outgoing_status(driver)
+        if status is None:
+            return False
+        now = self.clock()
+        if status in (SERVER_ACK, DELIVERED) and self.ack_latency is None:
+            self.ack_latency = now - self.pressed_at
+        if status == DELIVERED:
+            self.delivery_latency = now - self.pressed_at
+        self.status = status
+        return status == DELIVERED
+
+    def settle(self, driver, budget):
+        """Poll until delivered or ``budget`` seconds (capped at CONFIRM_TIMEOUT) are up.
+
+        Returns a Confirmation, or None if nothing is being tracked.
+        """
+        if self.phone is None:
+            return None
+        deadline = self.clock() + min(max(budget, 0.0), CONFIRM_TIMEOUT)
+        interval = MIN_POLL
+        while not self.poll(driver):
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            self.sleep(min(interval, remaining))
+            interval = min(interval * POLL_GROWTH, MAX_POLL)
+        confirmation = Confirmation(self.phone, self.status or UNCONFIRMED,
+                                    self.ack_latency, self.delivery_latency)
+        self.phone = None
+        return confirmation
@@ -0,0 +1,74 @@
+# diet.py
+#
+# Resource diet for long campaigns: a lean Chrome flag set, request blocking
+# once logged in, and a renderer memory probe. Only DevTools commands that
+# chromedriver forwards through ``execute_cdp_cmd`` are used.
+
+
+# ------------------------------
+# Chrome flags
+# ------------------------------
+# Safe before login: the QR is drawn on a canvas, so nothing here hides it
+DIET_FLAGS = [
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-gpu",
+    "--renderer-process-limit=2",
+]
+
+# Requests nobody needs while sending text: chat media, profile pictures,
+# stickers, fonts and images. Applied after login only.
+BLOCKED_URLS = [
+    "*mmg.whatsapp.net*",
+    "*pps.whatsapp.net*",
+    "*media*.whatsapp.net*",
+    "*static.whatsapp.net/rsrc.php*.png*",
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.svg*",
+    "*.mp4*", "*.ogg*", "*.mp3*", "*.webm*",
+    "*.woff*", "*.ttf*",
+]
+
+# Renderer JS heap above which the tab (and, if that is not enough, the
+# browser) is restarted; checked every MEMORY_CHECK_EVERY messages
+MEMORY_LIMIT_MB = 600
+MEMORY_CHECK_EVERY = 25
+
+
+def apply_flags(chrome_options):
+    for flag in DIET_FLAGS:
+        chrome_options.add_argument(flag)
+
+
+def block_heavy_requests(driver):
+    """Stop the current tab from loading images, media and fonts. Returns False if Chrome refused."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        driver.execute_cdp_cmd("Performance.enable", {})
+        return True
+    except Exception as e:
+        print(f"Could not enable request blocking: {e}")
+        return False
+
+
+def renderer_memory_mb(driver):
+    """JS heap of the current tab's renderer in MB, or None if Chrome does not say."""
+    try:
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    except Exception:
+        return None
+    for metric in metrics:
+        if metric["name"] == "JSHeapTotalSize":
+            return metric["value"] / (1024 * 1024)
+    return None
@@ -0,0 +1,276 @@
+# engine.py
+#
+# Campaign engine shared by the GUI (main.py) and the CLI (cli.py).
+# Must not import Kivy or anything from the UI.
+
+import os
+import time
+
+from config import (
+    START_SEND_TIMEOUT, EXIT_DRIVER_TIMEOUT, DEFAULT_PROFILE, DEFAULT_COUNTRY_CODE,
+    PREFLIGHT_REPORT, METRICS_JSONL, METRICS_PROM,
+)
+from browser import wait_for_chats
+from contacts import iter_prepared, RowCounter, read_header, template_columns
+from sessions import SessionPool, Dispatcher
+from journal import SendJournal
+from preflight import Preflight
+from scheduler import DEFAULT_PACING
+from progress import ProgressModel
+from template import Template, TemplateError
+from metrics import CampaignMetrics, serve_prometheus
+from attachments import AttachmentCache, AttachmentError
+from store import ContactStore, ContactDiff
+from retry import SENT, SKIPPED
+
+
+class Campaign:
+    """One sending run over a contacts file.
+
+    Progress is reported through ``on_event(event, data)``:
+
+    - ``qr``        {"session", "qr_path"}  a QR code needs scanning
+    - ``error``     {"message"}             the browser could not start
+    - ``connected`` {}
+    - ``preflight`` {"total", "rows", "valid", "duplicate", "invalid"}
+    - ``diff``      {"new", "changed", "unchanged", "removed"}  with ``incremental``
+    - ``sending``   {"session", "name", "phone"}
+    - ``progress``  {"done", "total", "phone", "result"}  result "skipped": sent in an earlier run
+    - ``finished``  {"sent", "failed", "skipped", "failures", "delivery", "elapsed", "metrics", "uploads"}
+
+    Stage timings are written to METRICS_JSONL / METRICS_PROM while sending
+    (see metrics.py), and served at http://127.0.0.1:<metrics_port>/metrics
+    if a port is given; ``metrics`` in ``finished`` is their summary.
+
+    ``attachment`` is a file sent to every contact after the message; an
+    ``attachment`` column in the sheet overrides it per contact (paths
+    relative to the sheet). Each file is prepared once; ``uploads`` in
+    ``finished`` maps it to ``(uploads, mean seconds)``.
+
+    ``limit`` maps session profiles to the messages each may send in this run
+    and ``stop()`` ends it early from another thread (both used by the job
+    queue, see jobs.py); contacts not reached are sent by a later run with
+    ``resume``.
+
+    The metrics, QR codes and preflight report go to ``output_dir`` (default:
+    the working directory), so campaigns running side by side keep apart.
+
+    With ``incremental``, the file is taken as a new version of the contact
+    list ``list_name`` (default: the file name) and only contacts that are
+    new or changed since they were last sent to are messaged (see store.py).
+
+    ``on_event`` is called from worker threads. UIs that should not react to
+    every message can poll ``progress`` instead.
+    """
+
+    def __init__(self, path, delay=10, sessions=1, profile=DEFAULT_PROFILE, pacing=DEFAULT_PACING,
+                 resume=True, headless=False, keep_session=False, country_code=DEFAULT_COUNTRY_CODE,
+                 diet=False, metrics_port=None, template=None, attachment=None, limit=None,
+                 incremental=False, list_name=None, output_dir=None, on_event=None):
+        self.path = path
+        self.delay = delay
+        self.session_count = sessions
+        self.profile = profile
+        self.pacing = pacing
+        self.resume = resume
+        self.headless = headless
+        self.diet = diet
+        self.keep_session = keep_session
+        self.country_code = country_code
+        self.on_event = on_event
+        self.pool = None
+        self.dispatcher = None
+        # Polled by the GUI; see progress.py
+        self.progress = ProgressModel()
+        self.metrics = None
+        self.metrics_port = metrics_port
+        # Message template source (see template.py); None keeps the prefix / name / body layout
+        self.template_source = template
+        self.template = None
+        self.attachment = attachment
+        self.limit = limit
+        self.incremental = incremental
+        self.list_name = list_name or os.path.splitext(os.path.basename(path))[0]
+        self.store = None
+        self.output_dir = output_dir
+        self.stopped = False
+        self.attachments = AttachmentCache(base_dir=os.path.dirname(os.path.abspath(path)))
+
+    def output_path(self, name):
+        """Where this campaign writes the file ``name``."""
+        if not self.output_dir:
+            return name
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, name)
+
+    def emit(self, event, **data):
+        if self.on_event:
+            self.on_event(event, data)
+
+    def check_template(self):
+        """Compile the template and check its columns against the file. Returns False on error."""
+        if not self.template_source:
+            return True
+        try:
+            template = Template(self.template_source)
+            template.validate(template_columns(read_header(self.path)))
+        except (TemplateError, OSError) as e:
+            self.emit("error", message=str(e))
+            return False
+        self.template = template
+        return True
+
+    def check_attachment(self):
+        """Prepare the campaign-wide attachment. Returns False on error."""
+        if not self.attachment:
+            return True
+        try:
+            self.attachments.get(self.attachment)
+        except AttachmentError as e:
+            self.emit("error", message=str(e))
+            return False
+        return True
+
+    def connect(self, pool=None):
+        """Start (or reuse) the session pool. Returns True when ready to send.
+
+        The template and attachment are checked first, so a bad one fails
+        before any browser starts.
+        """
+        if not self.check_template() or not self.check_attachment():
+            if pool is not None:
+                pool.close()
+            return False
+        if pool is not None and (pool.size != self.session_count or pool.profile != self.profile):
+            pool.close()
+            pool = None
+
+        if pool is None:
+            if self.output_dir:
+                os.makedirs(self.output_dir, exist_ok=True)
+            try:
+                pool = SessionPool(self.session_count, profile=self.profile, headless=self.headless,
+                                   diet=self.diet, qr_dir=self.output_dir)
+            except ValueError as e:
+                self.emit("error", message=str(e))
+                return False
+
+            def on_qr(session, qr_path):
+                self.emit("qr", session=session.name, qr_path=qr_path)
+
+            success, error_msg = pool.start(on_qr=on_qr)
+            if not success:
+                self.emit("error", message=error_msg)
+                return False
+
+        self.pool = pool
+        self.emit("connected")
+        for session in pool.sessions:
+            if not wait_for_chats(session.driver, START_SEND_TIMEOUT):
+                print(f"Chat list of {session.name} did not load, sending anyway")
+        return True
+
+    def _on_counted(self, counter):
+        counts = counter.preflight.counts
+        if counter.total is None:
+            return
+        if counts['invalid'] or counts['duplicate']:
+            report = self.output_path(PREFLIGHT_REPORT)
+            counter.preflight.write_report(report)
+            print(f"Preflight: {counter.preflight.summary()} (see {report})")
+        self.emit("preflight", total=counter.total, rows=counts['rows'], valid=counts['valid'],
+                  duplicate=counts['duplicate'], invalid=counts['invalid'])
+        diff = counter.diff
+        if diff is not None:
+            removed = diff.removed()
+            diff.store.forget(diff.list_name, removed)
+            print(f"List {diff.list_name}: {diff.summary()}")
+            self.emit("diff", new=diff.counts['new'], changed=diff.counts['changed'],
+                      unchanged=diff.counts['unchanged'], removed=len(removed))
+
+    def run(self, counter=None):
+        """Send to every contact. ``counter`` is a RowCounter already running on ``path``, if any."""
+        start = time.monotonic()
+        self.progress.started = self.progress.clock()
+        diff = None
+        if self.incremental:
+            self.store = ContactStore()
+            diff = ContactDiff(self.store, self.list_name, self.country_code)
+        if counter is None:
+            counter_diff = ContactDiff(self.store, self.list_name, self.country_code) if diff else None
+            counter = RowCounter(self.path, country_code=self.country_code, diff=counter_diff)
+            counter.on_done = lambda total: self._on_counted(counter)
+            counter.start()
+
+        def on_sending(session, contact):
+            self.progress.sending(contact.name, contact.phone)
+            self.emit("sending", session=session.name, name=contact.name, phone=contact.phone)
+
+        def on_result(done, total, contact, result):
+            d = self.dispatcher
+            if result == SKIPPED:
+                self.progress.skipped(done, total)
+            else:
+                self.progress.finished(done, total, d.sent, d.failed)
+            if diff is not None and result == SENT:
+                diff.record_sent(contact.phone)
+            self.emit("progress", done=done, total=total, phone=contact.phone, result=result)
+
+        journal = server = None
+        try:
+            journal = SendJournal()
+            self.metrics = CampaignMetrics(self.output_path(METRICS_JSONL), self.output_path(METRICS_PROM))
+            if self.metrics_port:
+                try:
+                    server = serve_prometheus(self.metrics, self.metrics_port)
+                except OSError as e:
+                    print(f"⚠️ Could not serve metrics on port {self.metrics_port}: {e}")
+            self.dispatcher = Dispatcher(
+                self.pool.sessions, self.delay, pacing=self.pacing,
+                on_sending=on_sending, on_result=on_result,
+                journal=journal, resume=self.resume, metrics=self.metrics,
+                attachment=self.attachment, attachments=self.attachments, limit=self.limit
+            )
+            if self.stopped:
+                self.dispatcher.stop()
+            contacts = iter_prepared(self.path, preflight=Preflight(self.country_code), metrics=self.metrics,
+                                     template=self.template, diff=diff)
+            self.dispatcher.run(contacts, total=lambda: counter.total)
+        finally:
+            if journal is not None:
+                journal.close()
+            if self.metrics is not None:
+                self.metrics.close()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            if self.store is not None:
+                # The counting pass forgets removed contacts when it ends
+                counter.thread.join()
+                self.store.close()
+                self.store = None
+
+        d = self.dispatcher
+        if d.skipped:
+            print(f"Skipped {d.skipped} contacts already sent in a previous run")
+        self.emit("finished", sent=d.sent, failed=d.failed, skipped=d.skipped,
+                  failures=dict(d.failures), delivery=dict(d.delivery), elapsed=time.monotonic() - start,
+                  metrics=self.metrics.summary(), uploads=self.attachments.summary())
+        return d
+
+    def stop(self):
+        """Finish the messages in hand and send no more. Safe from any thread."""
+        self.stopped = True
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
+    def close(self):
+        """Quit the browsers unless the session should be kept. Returns the pool to keep, if any."""
+        if self.pool is None:
+            return None
+        if self.keep_session:
+            return self.pool
+        time.sleep(EXIT_DRIVER_TIMEOUT)
+        self.pool.close()
+        self.pool = None
+        return None
@@ -0,0 +1,588 @@
+# jobs.py
+#
+# Persistent campaign queue: campaigns wait in SQLite with a priority, an
+# optional start time and daily start window, and are run by worker
+# processes that outlive the GUI. Each account (browser profile) runs one
+# campaign at a time and sends at most its daily quota. A job with several
+# sessions uses the accounts of session_profile_name() ("shop", "shop-2", ...),
+# and waits while any of them is busy, including in a Chrome the GUI keeps open.
+#
+#   python jobs.py add contacts.xlsx --profile shop --priority 5 --window 22:00-06:00
+#   python jobs.py quota shop 500
+#   python jobs.py worker --processes 2
+#   python jobs.py list
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
+import subprocess
+import multiprocessing
+from collections import namedtuple, Counter
+from threading import Lock
+
+from config import JOBS_PATH, JOB_OUTPUT_DIR, DEFAULT_PROFILE
+from profiles import session_profile_name, profile_in_use
+
+
+# ------------------------------
+# Queue
+# ------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    options TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    not_before REAL,
+    start_window TEXT,
+    status TEXT NOT NULL,
+    worker INTEGER,
+    heartbeat REAL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    finished REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority);
+CREATE TABLE IF NOT EXISTS quotas (
+    profile TEXT PRIMARY KEY,
+    daily_limit INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    profile TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sent INTEGER NOT NULL,
+    PRIMARY KEY (profile, day)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+# Cancel requested while running; the worker stops the campaign
+CANCELLING = "cancelling"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Campaign() keywords a job may carry in ``options``
+JOB_OPTIONS = (
+    "delay", "sessions", "pacing", "resume", "headless", "country_code", "diet", "template", "attachment",
+    "incremental", "list_name",
+)
+
+# Seconds between a running job's progress writes, and after which a job
+# (or worker) that stopped writing is taken as dead
+HEARTBEAT_INTERVAL = 5
+STALE_AFTER = 90
+# Idle workers look for claimable jobs this often
+POLL_INTERVAL = 15
+
+Job = namedtuple("Job", [
+    "id", "path", "profile", "options", "priority", "not_before", "start_window", "status", "worker",
+    "heartbeat", "runs", "created", "finished", "done", "total", "sent", "failed", "message",
+])
+
+
+def parse_window(window):
+    """``"HH:MM-HH:MM"`` -> ``(start, end)`` datetime.time; may wrap past midnight."""
+    try:
+        start, end = window.split("-")
+        return (datetime.datetime.strptime(start.strip(), "%H:%M").time(),
+                datetime.datetime.strptime(end.strip(), "%H:%M").time())
+    except ValueError:
+        raise ValueError(f"Invalid start window {window!r}, expected HH:MM-HH:MM")
+
+
+def in_window(window, now=None):
+    if not window:
+        return True
+    start, end = parse_window(window)
+    now = (now or datetime.datetime.now()).time()
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+def job_profiles(job):
+    """The accounts ``job`` sends from, one per session."""
+    return [session_profile_name(job.profile, index) for index in range(job.options.get("sessions", 1))]
+
+
+class JobQueue:
+    """Campaign jobs, account quotas and worker heartbeats in one SQLite file.
+
+    Opened separately by the GUI, the CLI and every worker process; SQLite's
+    locking keeps them consistent, and ``claim`` takes a job inside a write
+    transaction so two workers never run the same one.
+    """
+
+    def __init__(self, path=JOBS_PATH, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _job(self, row):
+        job = Job(*row)
+        return job._replace(options=json.loads(job.options))
+
+    def add(self, path, profile=DEFAULT_PROFILE, priority=0, not_before=None, window=None, **options):
+        """Queue a campaign. Returns its id. ``options`` are Campaign keywords (see JOB_OPTIONS)."""
+        unknown = set(options) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError("Unknown job options: " + ", ".join(sorted(unknown)))
+        if window:
+            parse_window(window)
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (path, profile, options, priority, not_before, start_window, status, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), profile, json.dumps(options), priority, not_before, window, QUEUED,
+                 self.clock())
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def jobs(self, statuses=None):
+        """All jobs (or those in ``statuses``), highest priority first."""
+        query = "SELECT * FROM jobs"
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY priority DESC, id", params).fetchall()
+        return [self._job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or ask the worker running it to stop. Returns False if already over."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = CASE status WHEN ? THEN ? ELSE ? END, finished = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (RUNNING, CANCELLING, CANCELLED, self.clock(), job_id, QUEUED, RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    # ------------------------------
+    # Quotas
+    # ------------------------------
+    def set_quota(self, profile, daily_limit):
+        """Cap the messages ``profile`` sends per calendar day (None removes the cap)."""
+        with self.lock:
+            if daily_limit is None:
+                self.conn.execute("DELETE FROM quotas WHERE profile = ?", (profile,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO quotas (profile, daily_limit) VALUES (?, ?)",
+                                  (profile, daily_limit))
+
+    def _remaining(self, profile):
+        row = self.conn.execute("SELECT daily_limit FROM quotas WHERE profile = ?", (profile,)).fetchone()
+        if row is None:
+            return None
+        used = self.conn.execute("SELECT sent FROM usage WHERE profile = ? AND day = ?",
+                                 (profile, today())).fetchone()
+        return max(row[0] - (used[0] if used else 0), 0)
+
+    def remaining_quota(self, profile):
+        """Messages ``profile`` may still send today, or None without a quota."""
+        with self.lock:
+            return self._remaining(profile)
+
+    # ------------------------------
+    # Workers
+    # ------------------------------
+    def claim(self, worker):
+        """Take the best job that may start now. Returns ``(job, {account: quota left or None})`` or None.
+
+        Jobs with an account that is already sending or open in a Chrome,
+        outside their window or over the quota of all their accounts wait.
+        Jobs whose worker died are queued again first.
+        """
+        now = self.clock()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat < ?",
+                                  (QUEUED, RUNNING, now - STALE_AFTER))
+                self.conn.execute("UPDATE jobs SET status = ?, finished = ? WHERE status = ? AND heartbeat < ?",
+                                  (CANCELLED, now, CANCELLING, now - STALE_AFTER))
+                busy = {profile for row in self.conn.execute(
+                    "SELECT * FROM jobs WHERE status IN (?, ?)", (RUNNING, CANCELLING)
+                ) for profile in job_profiles(self._job(row))}
+                rows = self.conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND (not_before IS NULL OR not_before <= ?) "
+                    "ORDER BY priority DESC, id", (QUEUED, now)
+                ).fetchall()
+                for row in rows:
+                    job = self._job(row)
+                    profiles = job_profiles(job)
+                    if not in_window(job.start_window) or any(profile in busy for profile in profiles):
+                        continue
+                    if any(profile_in_use(profile) for profile in profiles):
+                        continue
+                    remaining = {profile: self._remaining(profile) for profile in profiles}
+                    if all(left == 0 for left in remaining.values()):
+                        continue
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, runs = runs + 1, message = NULL "
+                        "WHERE id = ?", (RUNNING, worker, now, job.id)
+                    )
+                    self.conn.execute("COMMIT")
+                    return job._replace(status=RUNNING, worker=worker, runs=job.runs + 1), remaining
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return None
+
+    def report(self, job_id, done, total, sent, failed, usage=None, message=None):
+        """Write a running job's progress and heartbeat, and count ``usage`` against the quotas.
+
+        ``usage`` maps accounts to the messages they sent since the last
+        report. The worker running the job is kept alive too, since it only
+        beats on its own between jobs. Returns the job's status, so the
+        worker sees cancel requests.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                self.conn.execute(
+                    "UPDATE jobs SET heartbeat = ?, done = ?, total = ?, sent = ?, failed = ?, "
+                    "message = COALESCE(?, message) WHERE id = ?",
+                    (now, done, total, sent, failed, message, job_id)
+                )
+                self.conn.execute(
+                    "UPDATE workers SET heartbeat = ? WHERE pid = (SELECT worker FROM jobs WHERE id = ?)",
+                    (now, job_id)
+                )
+                if usage:
+                    self.conn.executemany(
+                        "INSERT INTO usage (profile, day, sent) VALUES (?, ?, ?) "
+                        "ON CONFLICT (profile, day) DO UPDATE SET sent = sent + excluded.sent",
+                        [(profile, today(), n) for profile, n in usage.items()]
+                    )
+                status = self.conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def finish(self, job_id, status, message=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, finished = ?, message = COALESCE(?, message) "
+                "WHERE id = ?",
+                (status, self.clock() if status != QUEUED else None, message, job_id)
+            )
+
+    def worker_alive(self, pid):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)", (pid, self.clock()))
+
+    def worker_gone(self, pid):
+        with self.lock:
+            self.conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def has_workers(self):
+        with self.lock:
+            row = self.conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat >= ?",
+                                    (self.clock() - STALE_AFTER,)).fetchone()
+        return row[0] > 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ------------------------------
+# Running jobs
+# ------------------------------
+class JobRun:
+    """One claimed job run as a Campaign, reporting back to the queue."""
+
+    def __init__(self, queue, job, remaining):
+        self.queue = queue
+        self.job = job
+        self.remaining = remaining
+        self.campaign = None
+        self.lock = Lock()
+        self.done = 0
+        self.total = None
+        self.sent = 0
+        self.failed = 0
+        # Messages per account already counted against the quotas
+        self._reported = Counter()
+        self.message = None
+        # Why the campaign was stopped early: CANCELLED or "window"
+        self.stop_reason = None
+        self.finished = threading.Event()
+
+    def on_event(self, event, data):
+        with self.lock:
+            if event == "progress":
+                self.done, self.total = data["done"], data["total"]
+                if data["result"] == "sent":
+                    self.sent += 1
+                elif data["result"] != "skipped":
+                    self.failed += 1
+            elif event == "preflight":
+                self.total = data["total"]
+            elif event == "qr":
+                self.message = f"Account not linked: scan {data['qr_path']} ({data['session']})"
+            elif event == "error":
+                self.message = data["message"] or "connection failed"
+            elif event == "finished":
+                self.done = data["sent"] + data["failed"] + data["skipped"]
+
+    def _usage(self):
+        dispatcher = self.campaign.dispatcher if self.campaign is not None else None
+        if dispatcher is None:
+            return {}
+        sent = Counter(dispatcher.sent_per_session())
+        usage = sent - self._reported
+        self._reported = sent
+        return dict(usage)
+
+    def report(self):
+        with self.lock:
+            usage = self._usage()
+            state = (self.done, self.total, self.sent, self.failed)
+            message, self.message = self.message, None
+        return self.queue.report(self.job.id, *state, usage=usage, message=message)
+
+    def _watch(self):
+        while not self.finished.wait(HEARTBEAT_INTERVAL):
+            status = self.report()
+            reason = None
+            if status == CANCELLING:
+                reason = CANCELLED
+            elif not in_window(self.job.start_window):
+                reason = "window"
+            if reason and self.stop_reason is None:
+                print(f"Job {self.job.id}: stopping ({reason})")
+                self.stop_reason = reason
+                self.campaign.stop()
+
+    def run(self):
+        """Run the campaign to the end, a stop or the quota. Returns the job's new status."""
+        from engine import Campaign
+
+        options = dict(self.job.options)
+        options.setdefault("headless", True)
+        # A run after the first picks up where the last one stopped
+        options["resume"] = options.get("resume", True) or self.job.runs > 1
+        self.campaign = Campaign(self.job.path, profile=self.job.profile, limit=self.remaining,
+                                 output_dir=os.path.join(JOB_OUTPUT_DIR, f"job_{self.job.id}"),
+                                 on_event=self.on_event, **options)
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        dispatcher = None
+        try:
+            if self.campaign.connect():
+                dispatcher = self.campaign.run()
+        finally:
+            self.finished.set()
+            watcher.join()
+            self.campaign.close()
+            self.report()
+
+        if dispatcher is None:
+            return CANCELLED if self.stop_reason == CANCELLED else FAILED
+        if self.stop_reason == CANCELLED:
+            return CANCELLED
+        if self.stop_reason == "window" or dispatcher.limit_reached:
+            # Resumes in the next window, or tomorrow with a fresh quota
+            return QUEUED
+        return DONE
+
+
+def work(path=JOBS_PATH, once=False):
+    """Worker process loop: claim a job, run it, repeat. ``once`` exits when nothing is claimable."""
+    queue = JobQueue(path)
+    pid = os.getpid()
+    try:
+        while True:
+            queue.worker_alive(pid)
+            claimed = queue.claim(pid)
+            if claimed is None:
+                if once:
+                    return
+                time.sleep(POLL_INTERVAL)
+                continue
+            job, remaining = claimed
+            print(f"Job {job.id}: {os.path.basename(job.path)} on {job.profile} (pid {pid})")
+            run = JobRun(queue, job, remaining)
+            try:
+                status = run.run()
+                queue.finish(job.id, status)
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                queue.finish(job.id, FAILED, message=str(e))
+    finally:
+        queue.worker_gone(pid)
+        queue.close()
+
+
+def run_workers(processes, path=JOBS_PATH):
+    """Run ``processes`` worker processes until interrupted."""
+    workers = [multiprocessing.Process(target=work, args=(path,), name=f"jobs-worker-{i + 1}")
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+def ensure_workers(processes=1, path=JOBS_PATH):
+    """Start a detached worker pool unless one is already running. Returns True if one was started.
+
+    The pool is its own process group, so closing the GUI leaves it running.
+    """
+    queue = JobQueue(path)
+    try:
+        if queue.has_workers():
+            return False
+    finally:
+        queue.close()
+    if getattr(sys, "frozen", False):
+        # The packaged app dispatches "jobs ..." to main() below
+        command = [sys.executable, "jobs"]
+    else:
+        command = [sys.executable, os.path.abspath(__file__)]
+    command += ["--db", path, "worker", "--processes", str(processes)]
+    kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL, "stdin": subprocess.DEVNULL}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen(command, **kwargs)
+    return True
+
+
+# ------------------------------
+# Command line
+# ------------------------------
+def parse_args(argv=None):
+    from scheduler import PACING_PROFILES
+
+    parser = argparse.ArgumentParser(description="Campaign job queue")
+    parser.add_argument("--db", default=JOBS_PATH, help="queue file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="queue a campaign")
+    add.add_argument("contacts")
+    add.add_argument("--profile", default=DEFAULT_PROFILE, help="account (browser profile) to send from")
+    add.add_argument("--priority", type=int, default=0, help="higher runs first (default: 0)")
+    add.add_argument("--start", help="not before this local time, 'YYYY-MM-DD HH:MM'")
+    add.add_argument("--window", help="daily start window, e.g. 22:00-06:00")
+    add.add_argument("--delay", type=int, default=10)
+    add.add_argument("--sessions", type=int, default=1)
+    add.add_argument("--pacing", choices=list(PACING_PROFILES))
+    add.add_argument("--template-file", help="message template file (see template.py)")
+    add.add_argument("--attachment")
+    add.add_argument("--diet", action="store_true")
+    add.add_argument("--incremental", action="store_true", help="only new and changed contacts (see store.py)")
+    add.add_argument("--list-name")
+    add.add_argument("--show-browser", dest="headless", action="store_false")
+
+    commands.add_parser("list", help="show the queue")
+
+    cancel = commands.add_parser("cancel", help="cancel a job")
+    cancel.add_argument("job", type=int)
+
+    quota = commands.add_parser("quota", help="set an account's daily message limit")
+    quota.add_argument("profile", help='account; extra sessions of a job on "shop" send from "shop-2", ...')
+    quota.add_argument("limit", type=int, nargs="?", help="messages per day; omit to remove the limit")
+
+    worker = commands.add_parser("worker", help="run worker processes")
+    worker.add_argument("--processes", type=int, default=1)
+    worker.add_argument("--once", action="store_true", help="exit when no job can start (single process)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "worker":
+        if args.once:
+            work(args.db, once=True)
+        else:
+            run_workers(args.processes, args.db)
+        return 0
+
+    queue = JobQueue(args.db)
+    try:
+        if args.command == "add":
+            options = {"delay": args.delay, "sessions": args.sessions, "headless": args.headless}
+            if args.pacing:
+                options["pacing"] = args.pacing
+            if args.diet:
+                options["diet"] = True
+            if args.incremental:
+                options["incremental"] = True
+                if args.list_name:
+                    options["list_name"] = args.list_name
+            if args.attachment:
+                options["attachment"] = os.path.abspath(args.attachment)
+            if args.template_file:
+                with open(args.template_file, encoding="utf-8") as f:
+                    options["template"] = f.read()
+            not_before = None
+            if args.start:
+                not_before = datetime.datetime.strptime(args.start, "%Y-%m-%d %H:%M").timestamp()
+            job_id = queue.add(args.contacts, args.profile, args.priority, not_before, args.window, **options)
+            print(f"Queued job {job_id}")
+        elif args.command == "list":
+            for job in queue.jobs():
+                total = job.total if job.total is not None else "?"
+                print(f"{job.id:>4} {job.status:<10} p{job.priority:<3} {job.profile:<12} "
+                      f"{job.done}/{total} sent={job.sent} failed={job.failed} "
+                      f"{os.path.basename(job.path)}"
+                      + (f" [{job.start_window}]" if job.start_window else "")
+                      + (f" - {job.message}" if job.message else ""))
+        elif args.command == "cancel":
+            if not queue.cancel(args.job):
+                print(f"Job {args.job} is not queued or running")
+                return 1
+        elif args.command == "quota":
+            queue.set_quota(args.profile, args.limit)
+            remaining = queue.remaining_quota(args.profile)
+            print(f"{args.profile}: " + ("no limit" if remaining is None else f"{remaining} left today"))
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# journal.py
+
+import time
+import sqlite3
+import hashlib
+from threading import Lock
+
+from config import JOURNAL_PATH
+from retry import SENT, ATTACHMENT_FAILED
+
+
+# ------------------------------
+# Send journal
+# ------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone TEXT NOT NULL,
+    msg_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_key ON attempts (phone, msg_hash);
+"""
+
+# Results after which the text is out: committed at once and never sent again.
+# A failed attachment is not retried, or its text would go twice
+TEXT_SENT = (SENT, ATTACHMENT_FAILED)
+
+# Commit failed attempts at least every N records or T seconds, whichever comes first
+FLUSH_EVERY = 20
+FLUSH_INTERVAL = 2.0
+
+
+def message_hash(message):
+    return hashlib.blake2b(message.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SendJournal:
+    """Append-only, crash-safe log of send attempts.
+
+    Every attempt is appended as (phone, message hash, result, timestamp).
+    Writes go to SQLite in WAL mode. A sent message is committed at once,
+    since losing it would send it again on resume; failures are committed in
+    small batches, so a crash loses at most a few retries. A message whose
+    attachment failed counts as sent too (see TEXT_SENT). Completed
+    (phone, message) pairs are kept in memory, making ``is_sent`` an O(1)
+    lookup.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.sent = set(self.conn.execute(
+            f"SELECT phone, msg_hash FROM attempts WHERE result IN ({', '.join('?' * len(TEXT_SENT))})", TEXT_SENT
+        ))
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def is_sent(self, phone, message):
+        return (phone, message_hash(message)) in self.sent
+
+    def record(self, phone, message, result):
+        key = (phone, message_hash(message))
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO attempts (phone, msg_hash, result, ts) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], result, time.time())
+            )
+            if result in TEXT_SENT:
+                self.sent.add(key)
+            self._pending += 1
+            if (result in TEXT_SENT or self._pending >= FLUSH_EVERY
+                    or time.monotonic() - self._last_flush >= FLUSH_INTERVAL):
+                self._flush()
+
+    def _flush(self):
+        self.conn.commit()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
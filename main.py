@@ -1,16 +1,16 @@
 # main.py
 
-import time
 import os
 import sys
-import urllib.parse
-import pandas as pd
+import multiprocessing
 from threading import Thread
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    # The packaged app doubles as the job queue's worker pool: "app.exe jobs worker"
+    if sys.argv[1:2] == ["jobs"]:
+        from jobs import main as jobs_main
+        sys.exit(jobs_main(sys.argv[2:]))
 
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
@@ -18,8 +18,6 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.image import Image
-from kivy.uix.filechooser import FileChooserIconView
-from kivy.uix.popup import Popup
 from kivy.uix.progressbar import ProgressBar
 from kivy.uix.spinner import Spinner
 from kivy.clock import Clock
@@ -29,15 +27,15 @@ from kivy.metrics import dp
 from kivy.uix.widget import Widget
 from kivy.properties import BooleanProperty, ListProperty
 
-from translations import tr, get_lang, set_lang
-
-
-def resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+from translations import tr, get_lang, set_lang, display_text
+from config import (
+    resource_path, APP_VERSION, NEED_CHROME_VERSION, QR_PATH,
+    MAX_SESSIONS, DEFAULT_PROFILE,
+    PREFLIGHT_REPORT,
+)
+from contacts import RowCounter, COLUMN_ALIASES
+from scheduler import PACING_PROFILES, DEFAULT_PACING
+from progress import format_eta
 
 
 def register_persian_font():
@@ -47,112 +45,13 @@ def register_persian_font():
         pass
 
 
-# ------------------------------
-# Config
-# ------------------------------
-APP_VERSION = "v1.5.0"
-NEED_CHROME_VERSION = 142
-QR_SCAN_TIMEOUT = 60
-START_SEND_TIMEOUT = 20
-EXIT_DRIVER_TIMEOUT = 10
-QR_PATH = "qr_code.png"
-driver = None
-CHROMEDRIVER_PATH = resource_path("drivers/chromedriver.exe")
 KEEP_SESSION = False
-
-
-# ------------------------------
-# Selenium & WhatsApp functions
-# ------------------------------
-def is_chrome_version_compatible(driver):
-    try:
-        caps = driver.capabilities
-        browser_version = caps.get('browserVersion')
-        if not browser_version:
-            chrome_info = caps.get('chrome', {})
-            cd_version = chrome_info.get('chromedriverVersion', '')
-            if cd_version:
-                browser_version = cd_version.split(' ')[0]
-        if not browser_version:
-            return False, "Unknown"
-        major_version = int(browser_version.split('.')[0])
-        return major_version >= NEED_CHROME_VERSION, browser_version
-    except:
-        return False, "Version check error"
-
-
-def capture_qr_code():
-    global driver
-    chrome_options = Options()
-    chrome_options.add_argument("--window-size=800,1000")
-    chrome_options.add_argument("--window-position=10000,0")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("useAutomationExtension", False)
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-
-    service = Service(CHROMEDRIVER_PATH)
-    try:
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-    except Exception as e:
-        err_msg = str(e)
-        if "This version of ChromeDriver only supports Chrome version" in err_msg:
-            import re
-            match = re.search(r"only supports Chrome version (\d+)", err_msg)
-            needed = match.group(1) if match else "148+"
-            return False, f"Chrome version {needed}+ required."
-        else:
-            return False, f"Chrome startup error: {err_msg}"
-
-    compatible, version = is_chrome_version_compatible(driver)
-    if not compatible:
-        driver.quit()
-        return False, f"Chrome version ({version}) is too old. Update to {NEED_CHROME_VERSION}+."
-
-    driver.get("https://web.whatsapp.com")
-    print("Loading WhatsApp Web...")
-
-    for i in range(35):
-        time.sleep(1)
-        try:
-            qr_canvas = driver.find_element(
-                By.XPATH,
-                '//canvas[@aria-label="Scan this QR code to link a device!"]'
-            )
-            time.sleep(1.5)
-            qr_temp_path = os.path.join(os.getcwd(), QR_PATH)
-            qr_canvas.screenshot(qr_temp_path)
-
-            from PIL import Image as PILImage
-            if os.path.exists(qr_temp_path):
-                img = PILImage.open(qr_temp_path)
-                if img.mode in ("RGBA", "P"):
-                    img = img.convert("RGB")
-                border = 10
-                new_img = PILImage.new("RGB", (img.width + 2*border, img.height + 2*border), (255,255,255))
-                new_img.paste(img, (border, border))
-                new_img.save(qr_temp_path, quality=98)
-            return True, None
-        except:
-            continue
-
-    driver.quit()
-    return False, "Failed to capture QR code."
-
-
-def send_msg(phone, msg):
-    global driver
-    try:
-        url = f"https://web.whatsapp.com/send?phone={phone}&text={msg}"
-        driver.get(url)
-        time.sleep(7)
-        message_box = driver.find_element(By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]')
-        message_box.send_keys(" ")
-        time.sleep(0.5)
-        message_box.send_keys(Keys.ENTER)
-        return True
-    except Exception as e:
-        print(f"Error sending to {phone}: {e}")
-        return False
+pool = None
+# Progress is redrawn at most this many times per second, however fast messages go out
+UI_FPS = 10
+# Rows of a newly chosen file shown under it, and the longest cell text shown
+PREVIEW_ROWS_SHOWN = 5
+PREVIEW_CELL_CHARS = 18
 
 
 # ------------------------------
@@ -241,8 +140,10 @@ class WhatsAppKivyApp(App):
         self.title = "WhatsApp Marketing Bot"
         self.excel_path = ""
         self.wait_time = 10
-        self.df = None
-        self.current_index = 0
+        self.row_counter = None
+        self.preview = None
+        self.loading = False
+        self.load_poll = None
 
         from kivy.core.window import Window
         Window.minimum_width = 700
@@ -287,10 +188,24 @@ class WhatsAppKivyApp(App):
         self.file_button = StyledButton(text="", size_hint_y=None, height=dp(45))
         self.file_button.bind(on_press=self.open_file_chooser)
         self.file_label = StyledLabel(text="")
+        # First rows and recognized columns of the chosen file, and the
+        # progress of the counting pass; collapsed until a file is chosen
+        self.preview_label = StyledLabel(text="", font_size=dp(11), color=(0.35, 0.35, 0.35, 1),
+                                         size_hint_y=None, height=0, opacity=0)
+        self.load_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=0, opacity=0,
+                                  spacing=dp(10))
+        self.load_progress = ProgressBar(max=100)
+        self.cancel_load_button = StyledButton(text="", size_hint_x=None, width=dp(90))
+        self.cancel_load_button.bind(on_press=self.on_cancel_load)
+        self.load_row.add_widget(self.load_progress)
+        self.load_row.add_widget(self.cancel_load_button)
         file_card.add_widget(self.file_title_label)
         file_card.add_widget(self.file_button)
         file_card.add_widget(self.file_label)
-        file_card.height = dp(130)
+        file_card.add_widget(self.preview_label)
+        file_card.add_widget(self.load_row)
+        self.file_card = file_card
+        self.layout_file_card()
         root.add_widget(file_card)
 
         # === Settings Card ===
@@ -330,7 +245,57 @@ class WhatsAppKivyApp(App):
         self.lang_spinner.bind(text=self.on_lang_select)
         ctrl_row.add_widget(self.lang_spinner)
         settings_card.add_widget(ctrl_row)
-        settings_card.height = dp(140)
+
+        sessions_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(35), spacing=dp(15))
+        self.sessions_label = StyledLabel(text="", size_hint_x=0.6)
+        self.sessions_spinner = Spinner(
+            text="1",
+            values=[str(n) for n in range(1, MAX_SESSIONS + 1)],
+            size_hint_x=0.4,
+            background_color=(0.145, 0.639, 0.396, 1),
+            color=(1, 1, 1, 1),
+            font_size=dp(14)
+        )
+        sessions_row.add_widget(self.sessions_label)
+        sessions_row.add_widget(self.sessions_spinner)
+        settings_card.add_widget(sessions_row)
+
+        pacing_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(35), spacing=dp(15))
+        self.pacing_label = StyledLabel(text="", size_hint_x=0.6)
+        self.pacing_spinner = Spinner(
+            text=DEFAULT_PACING,
+            values=list(PACING_PROFILES),
+            size_hint_x=0.4,
+            background_color=(0.145, 0.639, 0.396, 1),
+            color=(1, 1, 1, 1),
+            font_size=dp(14)
+        )
+        pacing_row.add_widget(self.pacing_label)
+        pacing_row.add_widget(self.pacing_spinner)
+        settings_card.add_widget(pacing_row)
+
+        profile_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(35), spacing=dp(15))
+        self.profile_label = StyledLabel(text="", size_hint_x=0.6)
+        self.profile_input = TextInput(
+            text=DEFAULT_PROFILE,
+            multiline=False,
+            size_hint_x=0.4,
+            halign="center",
+            foreground_color=(0, 0, 0, 1),
+            background_color=(1, 1, 1, 1),
+            cursor_color=(0.145, 0.639, 0.396, 1)
+        )
+        profile_row.add_widget(self.profile_label)
+        profile_row.add_widget(self.profile_input)
+        settings_card.add_widget(profile_row)
+
+        resume_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(35), spacing=dp(10))
+        self.resume_checkbox = CustomCheckBox(active=True)
+        self.resume_label = StyledLabel(text="")
+        resume_row.add_widget(self.resume_checkbox)
+        resume_row.add_widget(self.resume_label)
+        settings_card.add_widget(resume_row)
+        settings_card.height = dp(340)
         root.add_widget(settings_card)
 
         # === Status & Progress Card ===
@@ -382,6 +347,9 @@ class WhatsAppKivyApp(App):
         self.start_button = StyledButton(text="", size_hint_y=None, height=dp(55))
         self.start_button.bind(on_press=self.on_start_button)
         root.add_widget(self.start_button)
+        self.queue_button = StyledButton(text="", size_hint_y=None, height=dp(45))
+        self.queue_button.bind(on_press=self.on_queue_button)
+        root.add_widget(self.queue_button)
 
         # Final UI refresh
         self.refresh_ui()
@@ -405,26 +373,37 @@ class WhatsAppKivyApp(App):
         self.file_button.font_name = "IRANSans" if lang == 'fa' else "Roboto"
         self.delay_input.font_name = "IRANSans" if lang == 'fa' else "Roboto"
         self.start_button.font_name = "IRANSans" if lang == 'fa' else "Roboto"
+        self.cancel_load_button.font_name = "IRANSans" if lang == 'fa' else "Roboto"
+        self.queue_button.font_name = "IRANSans" if lang == 'fa' else "Roboto"
         self.lang_spinner.font_name = "IRANSans" if lang == 'fa' else "Roboto"
 
         # Update all texts
         self.version_label.text = tr("version", version=APP_VERSION)
         self.file_title_label.text = tr("select_excel")
         self.file_button.text = tr("select_excel")
-        self.file_label.text = tr("no_file") if not self.excel_path else os.path.basename(self.excel_path)
+        self.file_label.text = tr("no_file") if not self.excel_path else display_text(os.path.basename(self.excel_path))
+        self.cancel_load_button.text = tr("cancel_btn")
+        if self.preview is not None:
+            self.preview_label.text = self.format_preview(self.preview)
         self.delay_title_label.text = tr("delay_label")
         self.keep_session_label.text = tr("keep_session")
+        self.sessions_label.text = tr("sessions_label")
+        self.pacing_label.text = tr("pacing_label")
+        self.profile_label.text = tr("profile_label")
+        self.resume_label.text = tr("resume_label")
         self.lang_spinner.text = self.lang_code_to_display[lang]
         self.start_button.text = tr("send_btn")
+        self.queue_button.text = tr("queue_btn")
         self.qr_title_label.text = tr("scan_qr")
 
-        if self.df is not None:
-            count = len(self.df)
-            self.contact_count_label.text = tr("contacts_count", count=count)
+        if self.row_counter is not None and self.row_counter.total is not None:
+            self.on_contacts_counted(self.row_counter, self.row_counter.total)
 
     def open_file_chooser(self, instance):
+        from kivy.uix.filechooser import FileChooserIconView
+        from kivy.uix.popup import Popup
         content = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
-        filechooser = FileChooserIconView(filters=["*.xlsx", "*.xls"])
+        filechooser = FileChooserIconView(filters=["*.xlsx", "*.xls", "*.csv"])
         select_btn = StyledButton(text=tr("select_excel"), size_hint=(1, 0.12))
         content.add_widget(filechooser)
         content.add_widget(select_btn)
@@ -438,22 +417,146 @@ class WhatsAppKivyApp(App):
         )
 
         def select_file(btn):
-            if filechooser.selection:
-                self.excel_path = filechooser.selection[0]
-                self.file_label.text = os.path.basename(self.excel_path)
-                try:
-                    self.df = pd.read_excel(self.excel_path)
-                    count = len(self.df)
-                    self.contact_count_label.text = tr("contacts_count", count=count)
-                    self.start_button.disabled = False
-                except:
-                    self.contact_count_label.text = tr("read_error")
             popup.dismiss()
+            if filechooser.selection:
+                self.load_file(filechooser.selection[0])
 
         select_btn.bind(on_press=select_file)
         popup.open()
 
+    def load_file(self, path):
+        """Preview ``path`` and count its contacts, both off the UI thread.
+
+        The preview reads only the top of the file, so the columns and first
+        rows show up at once; the full count runs alongside with a progress
+        bar and can be cancelled.
+        """
+        if self.row_counter is not None:
+            self.row_counter.cancel()
+        self.excel_path = path
+        self.file_label.text = display_text(os.path.basename(path))
+        self.contact_count_label.text = tr("loading_file")
+        self.start_button.disabled = True
+        self.queue_button.disabled = True
+        self.preview = None
+        self.preview_label.text = ""
+        self.load_progress.value = 0
+        self.loading = True
+        self.layout_file_card()
+
+        counter = RowCounter(path)
+        counter.on_done = lambda total: self.on_contacts_counted(counter, total)
+        self.row_counter = counter
+        Thread(target=self.read_preview, args=(counter,), daemon=True).start()
+        counter.start()
+        if self.load_poll is None:
+            self.load_poll = Clock.schedule_interval(lambda dt: self.render_load_progress(), 1 / UI_FPS)
+
+    def read_preview(self, counter):
+        from contacts import preview_file
+        try:
+            preview, error = preview_file(counter.path, PREVIEW_ROWS_SHOWN), None
+        except Exception as e:
+            preview, error = None, e
+
+        def update(dt):
+            if counter is not self.row_counter:
+                return
+            if error is not None:
+                # Not worth counting a file that cannot be sent
+                self.row_counter = None
+                counter.cancel()
+                self.stop_loading()
+                self.contact_count_label.text = tr("read_error_detail", error=error)
+                return
+            self.preview = preview
+            self.preview_label.text = self.format_preview(preview)
+            if counter.error is None and not counter.cancelled:
+                self.start_button.disabled = False
+                self.queue_button.disabled = False
+            self.layout_file_card()
+        Clock.schedule_once(update, 0)
+
+    def format_preview(self, preview):
+        found = [field for field in COLUMN_ALIASES if field in preview.fields]
+        lines = [tr("columns_found", columns=", ".join(found))]
+        for row in [preview.header] + preview.rows:
+            cells = [cell if len(cell) <= PREVIEW_CELL_CHARS else cell[:PREVIEW_CELL_CHARS - 1] + "…"
+                     for cell in row]
+            lines.append(display_text(" | ".join(cells)))
+        return "\n".join(lines)
+
+    def layout_file_card(self):
+        """Size the file card to the preview and progress rows currently shown."""
+        preview = dp(16) * (len(self.preview.rows) + 2) if self.preview is not None else 0
+        loading = dp(32) if self.loading else 0
+        self.preview_label.height = preview
+        self.preview_label.opacity = 1 if preview else 0
+        self.load_row.height = loading
+        self.load_row.opacity = 1 if loading else 0
+        self.cancel_load_button.disabled = not loading
+        # Card spacing applies between the collapsed widgets too
+        self.file_card.height = dp(130) + dp(24) + preview + loading
+
+    def render_load_progress(self):
+        counter = self.row_counter
+        if counter is None or not self.loading:
+            return
+        estimate = self.preview.estimated_rows if self.preview is not None else None
+        if estimate:
+            self.load_progress.value = min(counter.rows_read / estimate * 100, 99)
+        if self.preview is not None:
+            self.contact_count_label.text = tr("reading_rows", rows=counter.rows_read)
+
+    def stop_loading(self):
+        self.loading = False
+        if self.load_poll is not None:
+            self.load_poll.cancel()
+            self.load_poll = None
+        self.layout_file_card()
+
+    def on_cancel_load(self, instance):
+        if self.row_counter is not None and self.loading:
+            self.row_counter.cancel()
+
+    def on_contacts_counted(self, counter, total):
+        if counter is not self.row_counter:
+            return
+        counts = counter.preflight.counts
+        if total is not None and (counts['invalid'] or counts['duplicate']):
+            counter.preflight.write_report(PREFLIGHT_REPORT)
+            print(f"Preflight: {counter.preflight.summary()} (see {PREFLIGHT_REPORT})")
+
+        def update(dt):
+            if counter is not self.row_counter:
+                return
+            self.stop_loading()
+            self.load_progress.value = 100
+            if counter.cancelled:
+                self.row_counter = None
+                self.excel_path = ""
+                self.preview = None
+                self.preview_label.text = ""
+                self.layout_file_card()
+                self.file_label.text = tr("no_file")
+                self.contact_count_label.text = tr("load_cancelled")
+                self.start_button.disabled = True
+                self.queue_button.disabled = True
+            elif total is None:
+                self.contact_count_label.text = tr("read_error_detail", error=counter.error)
+                self.start_button.disabled = True
+                self.queue_button.disabled = True
+            elif counts['invalid'] or counts['duplicate']:
+                self.contact_count_label.text = tr(
+                    "preflight_summary", count=total,
+                    duplicate=counts['duplicate'], invalid=counts['invalid']
+                )
+            else:
+                self.contact_count_label.text = tr("contacts_count", count=total)
+        Clock.schedule_once(update, 0)
+
     def show_chrome_update_popup(self, version):
+        from kivy.uix.popup import Popup
         content = BoxLayout(orientation='vertical', padding=dp(25), spacing=dp(20))
         label = StyledLabel(
             text=tr("chrome_update_msg"),
@@ -490,11 +593,12 @@ class WhatsAppKivyApp(App):
         btn.bind(on_press=popup.dismiss)
         popup.open()
 
-    def on_start_button(self, instance):
+    def read_settings(self):
+        """Copy the form into attributes. Returns False if no valid file is selected."""
         global KEEP_SESSION
-        if not self.excel_path or self.df is None:
+        if not self.excel_path or self.row_counter is None or self.row_counter.error is not None:
             self.current_status.text = tr("invalid_file")
-            return
+            return False
 
         try:
             self.wait_time = int(self.delay_input.text) or 10
@@ -502,6 +606,29 @@ class WhatsAppKivyApp(App):
             self.wait_time = 10
 
         KEEP_SESSION = self.keep_session_checkbox.active
+        self.session_count = int(self.sessions_spinner.text)
+        self.profile_name = self.profile_input.text.strip() or DEFAULT_PROFILE
+        self.resume = self.resume_checkbox.active
+        self.pacing = self.pacing_spinner.text
+        return True
+
+    def on_queue_button(self, instance):
+        """Hand the campaign to the background job queue (jobs.py) instead of sending now."""
+        if not self.read_settings():
+            return
+        from jobs import JobQueue, ensure_workers
+        queue = JobQueue()
+        try:
+            job_id = queue.add(self.excel_path, self.profile_name, delay=self.wait_time,
+                               sessions=self.session_count, pacing=self.pacing, resume=self.resume)
+        finally:
+            queue.close()
+        ensure_workers()
+        self.current_status.text = tr("queued_job", job=job_id)
+
+    def on_start_button(self, instance):
+        if not self.read_settings():
+            return
 
         self.start_button.disabled = True
         self.current_status.text = tr("browser_loading")
@@ -510,101 +637,71 @@ class WhatsAppKivyApp(App):
         Thread(target=self.connect_and_send, daemon=True).start()
 
     def connect_and_send(self):
-        global driver, KEEP_SESSION
-        if driver is None:
-            success, error_msg = capture_qr_code()
-            if not success:
-                def schedule_error(dt):
-                    if "old" in error_msg.lower() or "update" in error_msg.lower() or str(NEED_CHROME_VERSION) in error_msg:
-                        self.show_chrome_update_popup("Unknown")
-                    else:
-                        msg = tr("browser_error") + f"\n{error_msg}"
-                        self.current_status.text = msg
-                    self.start_button.disabled = False
-                Clock.schedule_once(schedule_error, 0)
-                return
-
-            Clock.schedule_once(lambda dt: self.update_qr(), 0)
-            Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', tr("scan_qr")), 0)
-
-            wait_counter = 0
-            while wait_counter < QR_SCAN_TIMEOUT:
-                try:
-                    driver.find_element(By.XPATH, '//canvas')
-                    time.sleep(2)
-                    wait_counter += 2
-                except:
-                    break
-
-            if wait_counter >= QR_SCAN_TIMEOUT:
-                Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', tr("connection_failed")), 0)
-                Clock.schedule_once(lambda dt: setattr(self.start_button, 'disabled', False), 0)
-                return
-
-        Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', tr("connected")), 0)
-        time.sleep(START_SEND_TIMEOUT)
-
-        total = len(self.df)
-        possible_columns = {
-            'name': ['نام', 'name'],
-            'family': ['نام خانوادگی', 'family'],
-            'prefix': ['پیشوند', 'prefix'],
-            'phone': ['شماره همراه', 'phone'],
-            'message': ['متن پیام', 'message']
-        }
-
-        def get_value(row, keys):
-            for key in keys:
-                if key in row and not pd.isna(row[key]):
-                    val = str(row[key]).strip()
-                    if val.lower() not in ('nan', 'none', 'null', ''):
-                        return val
-            return ''
-
-        for idx in range(len(self.df)):
-            row = self.df.iloc[idx]
-            name = get_value(row, possible_columns['name'])
-            family = get_value(row, possible_columns['family'])
-            prefix = get_value(row, possible_columns['prefix'])
-            phone_raw = get_value(row, possible_columns['phone'])
-            body = get_value(row, possible_columns['message'])
-
-            if not phone_raw:
-                continue
-
-            phone = ''.join(filter(str.isdigit, phone_raw))
-            full_name = ' '.join([x for x in [name, family] if x]).strip() or "User"
-            msg_lines = [x for x in [prefix, full_name if full_name != "User" else "", body] if x]
-            full_message = '\n'.join(msg_lines).strip() or "(No message)"
-            encoded_msg = urllib.parse.quote(full_message)
-            status_text = tr("sending_to", name=full_name, phone=phone)
-
-            Clock.schedule_once(lambda dt, s=status_text: setattr(self.current_status, 'text', s), 0)
-            progress = (idx + 1) / total * 100
-            Clock.schedule_once(lambda dt, p=progress: setattr(self.progress_bar, 'value', p), 0)
-            Clock.schedule_once(lambda dt, p=int(progress): setattr(self.progress_label, 'text', f"{p}%"), 0)
-
-            success = send_msg(phone, encoded_msg)
-            if not success:
-                print(f"⚠️ Failed to send to {phone}")
-
-            if idx < total - 1:
-                time.sleep(self.wait_time)
-
-        Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', tr("all_sent")), 0)
-        time.sleep(EXIT_DRIVER_TIMEOUT)
-
-        if driver and not KEEP_SESSION:
-            try:
-                driver.quit()
-            except:
-                pass
-            driver = None
+        global pool
+        # Loads selenium and pandas; deferred until Send is pressed to keep startup fast
+        from engine import Campaign
+        campaign = Campaign(
+            self.excel_path, delay=self.wait_time, sessions=self.session_count,
+            profile=self.profile_name, pacing=self.pacing, resume=self.resume,
+            keep_session=KEEP_SESSION, on_event=self.on_campaign_event
+        )
+        if not campaign.connect(pool):
+            pool = None
+            Clock.schedule_once(lambda dt: setattr(self.start_button, 'disabled', False), 0)
+            return
 
+        self.rendered_version = -1
+        render = Clock.schedule_interval(lambda dt: self.render_progress(campaign.progress), 1 / UI_FPS)
+        try:
+            dispatcher = campaign.run(counter=self.row_counter)
+        finally:
+            render.cancel()
+            Clock.schedule_once(lambda dt: self.render_progress(campaign.progress), 0)
+            pool = campaign.close()
+
+        if dispatcher.failed:
+            details = ", ".join(f"{name}: {n}" for name, n in dispatcher.failures.most_common())
+            final_status = tr("send_summary", sent=dispatcher.sent, failed=dispatcher.failed) + f"\n{details}"
+        else:
+            final_status = tr("all_sent")
+        Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', final_status), 0)
         Clock.schedule_once(lambda dt: setattr(self.start_button, 'disabled', False), 0)
 
-    def update_qr(self):
-        qr_path = os.path.join(os.getcwd(), QR_PATH)
+    def on_campaign_event(self, event, data):
+        if event == "qr":
+            status = tr("scan_qr") if self.session_count == 1 else tr("scan_qr_session", name=data["session"])
+            Clock.schedule_once(lambda dt: self.update_qr(data["qr_path"]), 0)
+            Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', status), 0)
+        elif event == "error":
+            error_msg = data["message"]
+
+            def schedule_error(dt):
+                if error_msg is None:
+                    self.current_status.text = tr("connection_failed")
+                elif "old" in error_msg.lower() or "update" in error_msg.lower() or str(NEED_CHROME_VERSION) in error_msg:
+                    self.show_chrome_update_popup("Unknown")
+                else:
+                    self.current_status.text = tr("browser_error") + f"\n{error_msg}"
+            Clock.schedule_once(schedule_error, 0)
+        elif event == "connected":
+            Clock.schedule_once(lambda dt: setattr(self.current_status, 'text', tr("connected")), 0)
+
+    def render_progress(self, model):
+        """Draw the latest progress snapshot; runs on the UI clock, not per message."""
+        snap = model.snapshot()
+        if snap["version"] == self.rendered_version:
+            return
+        self.rendered_version = snap["version"]
+        if snap["phone"]:
+            self.current_status.text = tr("sending_to", name=snap["name"], phone=snap["phone"])
+        self.progress_bar.value = snap["percent"]
+        self.progress_label.text = tr(
+            "progress_stats", percent=int(snap["percent"]), rate=f"{snap['rate']:.1f}",
+            eta=format_eta(snap["eta"]), sent=snap["sent"], failed=snap["failed"]
+        )
+
+    def update_qr(self, qr_path=QR_PATH):
+        qr_path = os.path.join(os.getcwd(), qr_path)
         if os.path.exists(qr_path):
             self.qr_image.source = qr_path
             self.qr_image.reload()
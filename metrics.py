@@ -0,0 +1,241 @@
+# metrics.py
+#
+# Per-stage timings, result counters and throughput for a campaign, exported
+# as JSON lines (one record per message) and in the Prometheus text format
+# (a file that is rewritten periodically, and optionally an HTTP endpoint).
+
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from config import METRICS_JSONL, METRICS_PROM, METRICS_EXPORT_INTERVAL
+
+
+# ------------------------------
+# Histograms
+# ------------------------------
+# Upper bounds in seconds; wide enough for a 50 us row parse and a 30 s compose wait
+BUCKETS = (
+    0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0,
+)
+
+# Stages, in the order a contact goes through them
+STAGES = (
+    "row_parse", "normalize", "navigate", "compose_wait", "send_ready", "send", "confirm", "pacing_wait",
+    "ack_latency", "delivery_latency", "attach", "upload",
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative like Prometheus'."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value, n=1):
+        self.counts[bisect_left(self.buckets, value)] += n
+        self.count += n
+        self.sum += value * n
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+
+class CampaignMetrics:
+    """Collects timings and counters from the worker threads.
+
+    ``observe`` and ``count`` may be called from any thread. ``message``
+    records one finished send: it feeds the stage histograms, counts the
+    result and appends a JSON line. The Prometheus file is rewritten at most
+    every ``export_interval`` seconds, and once more by ``close``.
+
+    Metrics never stop a campaign: a failed write is printed and, for the
+    JSON lines, ends that log while the counters keep going.
+    """
+
+    def __init__(self, jsonl_path=METRICS_JSONL, prom_path=METRICS_PROM,
+                 export_interval=METRICS_EXPORT_INTERVAL, clock=time.monotonic):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.export_interval = export_interval
+        self.clock = clock
+        self.started = clock()
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.counters = Counter()
+        self.lock = threading.Lock()
+        self._jsonl = None
+        if jsonl_path:
+            try:
+                self._jsonl = open(jsonl_path, "a", encoding="utf-8")
+            except OSError as e:
+                print(f"⚠️ Metrics log {jsonl_path} disabled: {e}")
+        self._exported_at = self.started
+
+    def observe(self, stage, seconds, n=1):
+        """Record ``n`` samples of ``seconds`` for ``stage`` (n > 1 for per-row averages over a chunk)."""
+        with self.lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds, n)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def message(self, session, phone, result, stages, attempt=1, status=None):
+        with self.lock:
+            for stage, seconds in stages.items():
+                if stage not in self.histograms:
+                    self.histograms[stage] = Histogram()
+                self.histograms[stage].observe(seconds)
+            self.counters[f"result:{result}"] += 1
+            if status:
+                self.counters[f"status:{status}"] += 1
+            if self._jsonl:
+                record = {
+                    "ts": round(time.time(), 3), "session": session, "phone": phone,
+                    "result": result, "status": status, "attempt": attempt,
+                    "stages": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+                }
+                try:
+                    self._jsonl.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    self._drop_jsonl(e)
+        self.maybe_export()
+
+    def _drop_jsonl(self, error):
+        print(f"⚠️ Metrics log {self.jsonl_path} disabled: {error}")
+        try:
+            self._jsonl.close()
+        except OSError:
+            pass
+        self._jsonl = None
+
+    def throughput_per_minute(self, counter="result:sent"):
+        elapsed = self.clock() - self.started
+        return self.counters[counter] / elapsed * 60 if elapsed > 0 else 0.0
+
+    def summary(self):
+        """Dict of per-stage count/mean/p50/p99, counters and throughput."""
+        with self.lock:
+            stages = {
+                stage: {"count": h.count, "mean": h.mean(), "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                for stage, h in self.histograms.items() if h.count
+            }
+            counters = dict(self.counters)
+        return {
+            "stages": stages, "counters": counters,
+            "throughput_per_minute": self.throughput_per_minute(),
+            "delivered_per_minute": self.throughput_per_minute("status:delivered"),
+        }
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP wa_stage_seconds Time spent per stage of sending one message",
+            "# TYPE wa_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage, h in self.histograms.items():
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'wa_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'wa_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'wa_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'wa_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            results = {k.split(":", 1)[1]: v for k, v in self.counters.items() if k.startswith("result:")}
+            statuses = {k.split(":", 1)[1]: v for k, v in self.counters.items() if k.startswith("status:")}
+            others = {k: v for k, v in self.counters.items() if ":" not in k}
+        lines += ["# HELP wa_messages_total Finished send attempts by result", "# TYPE wa_messages_total counter"]
+        lines += [f'wa_messages_total{{result="{result}"}} {n}' for result, n in sorted(results.items())]
+        lines += ["# HELP wa_delivery_total Sent messages by the last tick status seen",
+                  "# TYPE wa_delivery_total counter"]
+        lines += [f'wa_delivery_total{{status="{status}"}} {n}' for status, n in sorted(statuses.items())]
+        for name, n in sorted(others.items()):
+            lines += [f"# TYPE wa_{name}_total counter", f"wa_{name}_total {n}"]
+        lines += [
+            "# HELP wa_throughput_per_minute Messages sent per minute since the campaign started",
+            "# TYPE wa_throughput_per_minute gauge",
+            f"wa_throughput_per_minute {self.throughput_per_minute():.3f}",
+            "# HELP wa_delivered_per_minute Messages confirmed delivered per minute",
+            "# TYPE wa_delivered_per_minute gauge",
+            f'wa_delivered_per_minute {self.throughput_per_minute("status:delivered"):.3f}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def maybe_export(self):
+        now = self.clock()
+        with self.lock:
+            if now - self._exported_at < self.export_interval:
+                return
+            self._exported_at = now
+        self.export()
+
+    def export(self):
+        with self.lock:
+            if self._jsonl:
+                try:
+                    self._jsonl.flush()
+                except OSError as e:
+                    self._drop_jsonl(e)
+        if self.prom_path:
+            # Write then rename, so a scraper never reads half a file
+            tmp = self.prom_path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus_text())
+                os.replace(tmp, self.prom_path)
+            except OSError as e:
+                print(f"⚠️ Could not export metrics to {self.prom_path}: {e}")
+
+    def close(self):
+        self.export()
+        if self._jsonl:
+            try:
+                self._jsonl.close()
+            except OSError:
+                pass
+            self._jsonl = None
+
+
+def serve_prometheus(metrics, port, host="127.0.0.1"):
+    """Serve ``metrics`` at http://host:port/metrics from a daemon thread. Returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,142 @@
+# navigation.py
+
+import re
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from readiness import wait_for_any, COMPOSE_BOX
+
+
+# ------------------------------
+# In-app chat navigation
+# ------------------------------
+NEW_CHAT_BUTTON = (
+    By.XPATH,
+    '//div[@title="New chat"] | //span[@data-icon="new-chat-outline"] | //button[@aria-label="New chat"]'
+)
+NEW_CHAT_SEARCH = (By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]')
+# Result rows of the New-chat drawer: relative to its search box, in the
+# nearest ancestor holding rows, so the main chat list never matches
+DRAWER_RESULTS = (
+    By.XPATH,
+    './ancestor::*[.//div[@role="listitem" or @role="row"]][1]//div[@role="listitem" or @role="row"]'
+)
+RESULT_TITLE = (By.XPATH, './/span[@title]')
+CHAT_HEADER_TITLE = (By.XPATH, '//div[@id="main"]//header//span[@title] | //div[@id="main"]//header//span[@dir="auto"]')
+NO_RESULTS = (By.XPATH, '//*[contains(text(), "No results") or contains(text(), "No contacts")]')
+
+NAVIGATION_TIMEOUT = 5
+# After this many in-app failures in a row, stop trying and reload per contact
+MAX_IN_APP_FAILURES = 3
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def _digits(text):
+    return _NON_DIGITS.sub('', text or '')
+
+
+def _matching_result(phone):
+    """Condition: the drawer row whose title is ``phone`` (digits compared, any formatting)."""
+    digits = _digits(phone)
+
+    def condition(driver):
+        searches = driver.find_elements(*NEW_CHAT_SEARCH)
+        if not searches:
+            return None
+        for row in searches[0].find_elements(*DRAWER_RESULTS):
+            for title in row.find_elements(*RESULT_TITLE):
+                if _digits(title.get_attribute("title")) == digits:
+                    return row
+        return None
+    return condition
+
+
+def _chat_is(driver, phone):
+    """True if the open chat's header shows ``phone``."""
+    digits = _digits(phone)
+    for title in driver.find_elements(*CHAT_HEADER_TITLE):
+        if _digits(title.get_attribute("title") or title.text) == digits:
+            return True
+    return False
+
+
+def type_message(message_box, message):
+    """Type ``message`` into the compose box, keeping line breaks."""
+    lines = message.split("\n")
+    for i, line in enumerate(lines):
+        if line:
+            message_box.send_keys(line)
+        if i < len(lines) - 1:
+            message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+
+
+def open_chat_in_app(driver, phone):
+    """Open the chat for ``phone`` inside the loaded app, without a page reload.
+
+    Goes through the "New chat" search, which also lists numbers that are
+    not saved as contacts. Only a result showing exactly ``phone`` is
+    opened, and the chat header must show it too, so a personalised message
+    never goes to whichever row happened to be on top. Contacts saved under
+    a name fail that check and are left to the URL reload. Returns the
+    compose box, or None if the chat could not be opened this way.
+    """
+    try:
+        previous = driver.find_elements(*COMPOSE_BOX)
+        previous_id = previous[0].id if previous else None
+
+        state, button, _ = wait_for_any(driver, {"button": NEW_CHAT_BUTTON}, NAVIGATION_TIMEOUT)
+        if state is None:
+            return None
+        button.click()
+
+        state, search, _ = wait_for_any(driver, {"search": NEW_CHAT_SEARCH}, NAVIGATION_TIMEOUT)
+        if state is None:
+            return None
+        search.send_keys(Keys.CONTROL, "a")
+        search.send_keys(Keys.BACKSPACE)
+        search.send_keys(phone)
+
+        state, result, _ = wait_for_any(
+            driver,
+            {"result": _matching_result(phone), "empty": NO_RESULTS},
+            NAVIGATION_TIMEOUT
+        )
+        if state != "result":
+            search.send_keys(Keys.ESCAPE)
+            return None
+        result.click()
+
+        def new_compose_box(drv):
+            boxes = drv.find_elements(*COMPOSE_BOX)
+            return boxes[0] if boxes and boxes[0].id != previous_id else None
+
+        state, message_box, _ = wait_for_any(driver, {"compose": new_compose_box}, NAVIGATION_TIMEOUT)
+        if state != "compose":
+            return None
+        if not _chat_is(driver, phone):
+            print(f"In-app navigation opened another chat than {phone}, reloading instead")
+            return None
+        return message_box
+    except Exception as e:
+        print(f"In-app navigation failed for {phone}: {e}")
+        return None
+
+
+class ChatNavigator:
+    """Opens chats in place, falling back to a full URL reload when that fails."""
+
+    def __init__(self, mode="in_app"):
+        self.mode = mode
+        self.failures = 0
+
+    def open(self, driver, phone):
+        if self.mode != "in_app" or self.failures >= MAX_IN_APP_FAILURES:
+            return None
+        message_box = open_chat_in_app(driver, phone)
+        if message_box is None:
+            self.failures += 1
+        else:
+            self.failures = 0
+        return message_box
@@ -0,0 +1,94 @@
+# preflight.py
+
+import csv
+from collections import Counter
+
+from config import DEFAULT_COUNTRY_CODE
+
+
+# ------------------------------
+# Phone validation & deduplication
+# ------------------------------
+# E.164: at most 15 digits including the country code
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+# Numbers this short are taken as national numbers without their country code
+NATIONAL_MAX_DIGITS = 10
+# Rejected rows kept in the report (the counters always cover everything)
+MAX_REPORTED = 10_000
+
+
+def normalize_phones(phones, country_code=DEFAULT_COUNTRY_CODE):
+    """Normalize a Series of phone strings (digits, optional leading '+') to E.164 digits.
+
+    "+44 20..." and "0044 20..." keep their country code, "0912..." and
+    "912..." get ``country_code``. Returns the normalized Series; rows that
+    cannot be a valid number are returned as ''.
+    """
+    plus = phones.str.startswith('+')
+    digits = phones.str.replace(r'\D', '', regex=True)
+
+    intl = digits.str.startswith('00') & ~plus
+    digits = digits.mask(intl, digits.str.slice(2))
+    international = plus | intl
+
+    trunk = ~international & digits.str.startswith('0')
+    digits = digits.mask(trunk, country_code + digits.str.slice(1))
+    national = ~international & ~trunk & (digits.str.len() <= NATIONAL_MAX_DIGITS)
+    digits = digits.mask(national, country_code + digits)
+
+    length = digits.str.len()
+    valid = (length >= MIN_DIGITS) & (length <= MAX_DIGITS) & ~digits.str.startswith('0')
+    return digits.where(valid, '')
+
+
+class Preflight:
+    """Normalizes, validates and dedupes contact chunks before anything is sent.
+
+    Keeps a hash index of every number already accepted, so duplicates are
+    dropped across chunks as well as within one. ``counts`` and ``rejected``
+    hold the report.
+    """
+
+    def __init__(self, country_code=DEFAULT_COUNTRY_CODE):
+        self.country_code = country_code
+        self.seen = set()
+        self.counts = Counter()
+        self.rejected = []
+
+    def check(self, frame):
+        """Return the rows of a prepared frame that should be sent, with normalized phones."""
+        normalized = normalize_phones(frame['phone'].astype("string"), self.country_code)
+        invalid = normalized == ''
+        duplicate = ~invalid & (normalized.duplicated() | normalized.isin(self.seen))
+
+        self.counts['rows'] += len(frame)
+        self.counts['invalid'] += int(invalid.sum())
+        self.counts['duplicate'] += int(duplicate.sum())
+        self._reject(frame[invalid], "invalid")
+        self._reject(frame[duplicate], "duplicate")
+
+        keep = ~invalid & ~duplicate
+        accepted = frame[keep].assign(phone=normalized[keep])
+        self.seen.update(accepted['phone'])
+        self.counts['valid'] += len(accepted)
+        return accepted
+
+    def _reject(self, frame, reason):
+        room = MAX_REPORTED - len(self.rejected)
+        if room <= 0 or frame.empty:
+            return
+        for row, phone in zip(frame['row'].head(room), frame['phone'].head(room)):
+            self.rejected.append((int(row), phone, reason))
+
+    def summary(self):
+        c = self.counts
+        return f"{c['valid']} valid, {c['duplicate']} duplicate, {c['invalid']} invalid of {c['rows']} rows"
+
+    def write_report(self, path):
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "phone", "reason"])
+            for row, phone, reason in self.rejected:
+                # +2: 1-based and skipping the header, matching Excel row numbers
+                writer.writerow([row + 2, phone, reason])
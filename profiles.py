@@ -0,0 +1,119 @@
+# profiles.py
+
+import os
+import re
+import json
+import time
+
+from config import PROFILES_DIR, DEFAULT_PROFILE
+
+
+# ------------------------------
+# Persistent Chrome profiles
+# ------------------------------
+PROFILE_META = "whatsapp_profile.json"
+_VALID_NAME = re.compile(r"^[\w\-. ]+$")
+
+
+def profile_path(name):
+    if not name or not _VALID_NAME.match(name):
+        raise ValueError(f"Invalid profile name: {name!r}")
+    return os.path.join(PROFILES_DIR, name)
+
+
+def session_profile_name(base, index):
+    """Profile used by the ``index``-th session of a pool based on profile ``base``."""
+    base = base or DEFAULT_PROFILE
+    return base if index == 0 else f"{base}-{index + 1}"
+
+
+def read_meta(name):
+    try:
+        with open(os.path.join(profile_path(name), PROFILE_META), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def mark_authenticated(name):
+    meta = read_meta(name)
+    meta["last_login"] = time.time()
+    meta.setdefault("created", meta["last_login"])
+    path = profile_path(name)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, PROFILE_META), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _lock_holder_alive(path):
+    # Linux / macOS: Chrome's lock is a symlink to "<hostname>-<pid>"
+    singleton = os.path.join(path, "SingletonLock")
+    if not os.path.islink(singleton):
+        return False
+    pid = os.readlink(singleton).rsplit("-", 1)[-1]
+    return pid.isdigit() and _pid_alive(int(pid))
+
+
+def profile_in_use(name):
+    """True if a running Chrome has profile ``name`` open. Changes nothing."""
+    path = profile_path(name)
+    if _lock_holder_alive(path):
+        return True
+    lockfile = os.path.join(path, "lockfile")
+    if os.path.exists(lockfile):
+        # Windows: Chrome keeps the file open without sharing while it runs
+        try:
+            with open(lockfile, "a"):
+                pass
+        except OSError:
+            return True
+    return False
+
+
+def _clear_stale_lock(path):
+    """Remove Chrome's profile lock if the Chrome that held it is gone.
+
+    Returns False if the profile is still in use by a running Chrome.
+    """
+    singleton = os.path.join(path, "SingletonLock")
+    if os.path.islink(singleton):
+        if _lock_holder_alive(path):
+            return False
+        for leftover in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+            try:
+                os.remove(os.path.join(path, leftover))
+            except OSError:
+                pass
+    lockfile = os.path.join(path, "lockfile")
+    if os.path.exists(lockfile):
+        # Windows: the file stays locked while Chrome is running
+        try:
+            os.remove(lockfile)
+        except OSError:
+            return False
+    return True
+
+
+def check_profile_health(name):
+    """Return ``(ok, problems)`` for profile ``name``; fixes what it safely can."""
+    problems = []
+    path = profile_path(name)
+    if not os.path.isdir(path):
+        # A new profile is healthy, it just has not been linked yet
+        return True, problems
+    if not os.access(path, os.W_OK):
+        problems.append("profile folder is not writable")
+    elif not _clear_stale_lock(path):
+        problems.append("profile is open in another Chrome window")
+    return not problems, problems
+
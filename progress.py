@@ -0,0 +1,89 @@
+# progress.py
+
+import time
+from collections import deque
+
+
+# ------------------------------
+# Progress model
+# ------------------------------
+# Throughput is measured over the last N finished messages
+RATE_WINDOW = 50
+
+
+class ProgressModel:
+    """Campaign progress, written by worker threads and read by the UI.
+
+    Writers only assign attributes and append to a deque, both atomic under
+    the GIL, so no lock is needed; readers take a ``snapshot()`` at their own
+    pace. ``version`` changes on every update so a reader can skip frames
+    where nothing happened.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.version = 0
+        self.done = 0
+        self.total = None
+        self.sent = 0
+        self.failed = 0
+        self.current_name = ""
+        self.current_phone = ""
+        self.started = clock()
+        self._finished_at = deque(maxlen=RATE_WINDOW)
+
+    def sending(self, name, phone):
+        self.current_name = name
+        self.current_phone = phone
+        self.version += 1
+
+    def finished(self, done, total, sent, failed):
+        self.done = done
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self._finished_at.append(self.clock())
+        self.version += 1
+
+    def skipped(self, done, total):
+        """A contact sent in an earlier run: counts as done, but not towards the rate."""
+        self.done = done
+        self.total = total
+        self.version += 1
+
+    def rate_per_minute(self):
+        times = list(self._finished_at)
+        if len(times) >= 2 and times[-1] > times[0]:
+            return (len(times) - 1) / (times[-1] - times[0]) * 60
+        elapsed = self.clock() - self.started
+        return len(times) / elapsed * 60 if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        """Return a dict with percent, rate, eta (seconds or None) and the counters."""
+        done, total = self.done, self.total
+        rate = self.rate_per_minute()
+        percent = min(done / total * 100, 100) if total else 0.0
+        eta = None
+        if total and rate > 0:
+            eta = max(total - done, 0) / rate * 60
+        return {
+            "version": self.version,
+            "done": done,
+            "total": total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "name": self.current_name,
+            "phone": self.current_phone,
+            "percent": percent,
+            "rate": rate,
+            "eta": eta,
+        }
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
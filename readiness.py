@@ -0,0 +1,129 @@
+# readiness.py
+
+import time
+from selenium.webdriver.common.by import By
+
+
+# ------------------------------
+# Page conditions
+# ------------------------------
+CHAT_LIST = (By.ID, 'pane-side')
+QR_CANVAS = (By.XPATH, '//canvas[@aria-label="Scan this QR code to link a device!"]')
+COMPOSE_BOX = (By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]')
+INVALID_PHONE_DIALOG = (
+    By.XPATH,
+    '//div[@role="dialog"]//div[contains(text(), "invalid") or contains(text(), "نامعتبر")]'
+)
+SEND_BUTTON = (By.XPATH, '//button[@aria-label="Send"] | //span[@data-icon="send"]')
+OUTGOING_MESSAGE = (By.XPATH, '//div[contains(@class, "message-out")]')
+MESSAGE_TICK = (
+    By.XPATH,
+    '(//div[contains(@class, "message-out")])[last()]'
+    '//span[@data-icon="msg-time" or @data-icon="msg-check" or @data-icon="msg-dblcheck"]'
+)
+# Status icon of an outgoing message -> delivery status (see delivery.py)
+STATUS_ICONS = {
+    "msg-time": "pending",
+    "msg-check": "sent",
+    "msg-dblcheck": "delivered",
+}
+LAST_OUTGOING_STATUS = (
+    By.XPATH,
+    '(//div[contains(@class, "message-out")])[last()]//span[@data-icon]'
+)
+
+# Per-condition timeouts (seconds)
+COMPOSE_TIMEOUT = 30
+SEND_BUTTON_TIMEOUT = 3
+TICK_TIMEOUT = 10
+
+# Adaptive polling: start fast, back off while nothing changes
+MIN_POLL = 0.05
+MAX_POLL = 0.5
+POLL_GROWTH = 1.5
+
+
+def _probe(driver, condition):
+    if callable(condition):
+        return condition(driver)
+    elements = driver.find_elements(*condition)
+    return elements[0] if elements else None
+
+
+def wait_for_any(driver, conditions, timeout, min_poll=MIN_POLL, max_poll=MAX_POLL):
+    """Poll until one of ``conditions`` matches.
+
+    ``conditions`` maps a name to a locator tuple or to a callable taking the
+    driver and returning a truthy value. Returns ``(name, value, elapsed)``,
+    or ``(None, None, elapsed)`` if nothing matched within ``timeout``.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = min_poll
+    while True:
+        for name, condition in conditions.items():
+            try:
+                value = _probe(driver, condition)
+            except Exception:
+                value = None
+            if value:
+                return name, value, time.monotonic() - start
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, None, time.monotonic() - start
+        time.sleep(min(interval, remaining))
+        interval = min(interval * POLL_GROWTH, max_poll)
+
+
+def wait_for(driver, condition, timeout, **kwargs):
+    _, value, elapsed = wait_for_any(driver, {"match": condition}, timeout, **kwargs)
+    return value, elapsed
+
+
+def count_outgoing(driver):
+    try:
+        return len(driver.find_elements(*OUTGOING_MESSAGE))
+    except Exception:
+        return 0
+
+
+def outgoing_status(driver):
+    """Delivery status of the last outgoing message in the open chat, or None."""
+    try:
+        icons = driver.find_elements(*LAST_OUTGOING_STATUS)
+        for icon in icons:
+            status = STATUS_ICONS.get(icon.get_attribute("data-icon"))
+            if status:
+                return status
+    except Exception:
+        pass
+    return None
+
+
+def new_outgoing_message(before):
+    """Condition matching once an outgoing message beyond ``before`` shows a status tick."""
+    def condition(driver):
+        if count_outgoing(driver) <= before:
+            return None
+        return _probe(driver, MESSAGE_TICK)
+    return condition
+
+
+class StageTimer:
+    """Records how long each stage of a send took."""
+
+    def __init__(self):
+        self.stages = {}
+        self._last = time.monotonic()
+
+    def mark(self, stage):
+        now = time.monotonic()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def total(self):
+        return sum(self.stages.values())
+
+    def __str__(self):
+        parts = [f"{name}={seconds:.2f}s" for name, seconds in self.stages.items()]
+        return " ".join(parts)
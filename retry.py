@@ -0,0 +1,110 @@
+# retry.py
+
+import time
+import heapq
+import random
+from itertools import count
+
+
+# ------------------------------
+# Send results
+# ------------------------------
+SENT = "sent"
+INVALID_NUMBER = "invalid_number"
+ELEMENT_TIMEOUT = "element_timeout"
+NETWORK = "network"
+BROWSER_CRASH = "browser_crash"
+# The attachment is missing, unsupported or too big; nothing was sent
+INVALID_ATTACHMENT = "invalid_attachment"
+# The text went out but its attachment did not; never retried, or the text would go twice
+ATTACHMENT_FAILED = "attachment_failed"
+# Already sent in an earlier run (see journal.py): reported as done, not attempted
+SKIPPED = "skipped"
+# An exception none of the classes above explains; final, since it may be a bug
+UNEXPECTED_ERROR = "unexpected_error"
+
+# Worth another attempt later; anything else is final
+TRANSIENT = {ELEMENT_TIMEOUT, NETWORK, BROWSER_CRASH}
+
+_CRASH_MARKERS = (
+    "invalid session id", "chrome not reachable", "disconnected", "no such window",
+    "session deleted", "target window already closed", "connection refused",
+)
+_NETWORK_MARKERS = (
+    "net::err_", "err_internet_disconnected", "err_name_not_resolved", "timed out receiving",
+    "err_connection",
+)
+
+
+def classify_exception(exc):
+    """Map an exception raised while sending to one of the failure classes.
+
+    Only WebDriver waits that ran out and elements that were not there are
+    ELEMENT_TIMEOUT; anything unrecognized is UNEXPECTED_ERROR, not retried.
+    """
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+    text = str(exc).lower()
+    if any(marker in text for marker in _CRASH_MARKERS):
+        return BROWSER_CRASH
+    if any(marker in text for marker in _NETWORK_MARKERS):
+        return NETWORK
+    if isinstance(exc, (TimeoutException, NoSuchElementException)):
+        return ELEMENT_TIMEOUT
+    return UNEXPECTED_ERROR
+
+
+# ------------------------------
+# Retry queue
+# ------------------------------
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 30.0
+BACKOFF_MAX = 600.0
+
+
+class RetryQueue:
+    """Deferred contacts waiting for another attempt, ordered by when they are due.
+
+    Attempt ``n`` is retried after ``BACKOFF_BASE * 2 ** (n - 1)`` seconds
+    (capped at ``BACKOFF_MAX``, with up to 20% jitter). Not thread-safe; the
+    dispatcher guards it with its own lock.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base=BACKOFF_BASE, cap=BACKOFF_MAX, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.clock = clock
+        self._heap = []
+        self._seq = count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, contact, attempts, result):
+        """Queue ``contact`` after its ``attempts``-th failure (``result``). Returns False if it is out of attempts."""
+        if attempts >= self.max_attempts:
+            return False
+        delay = min(self.cap, self.base * 2 ** (attempts - 1))
+        delay *= 1 + random.uniform(0, 0.2)
+        heapq.heappush(self._heap, (self.clock() + delay, next(self._seq), contact, attempts, result))
+        return True
+
+    def pop_ready(self):
+        """Return ``(contact, attempts)`` for the next due contact, or None."""
+        if self._heap and self._heap[0][0] <= self.clock():
+            _, _, contact, attempts, _ = heapq.heappop(self._heap)
+            return contact, attempts
+        return None
+
+    def drain(self):
+        """Remove everything still queued. Returns ``[(contact, last_result), ...]``."""
+        items = [(contact, result) for _, _, contact, _, result in self._heap]
+        self._heap = []
+        return items
+
+    def next_due(self):
+        """Seconds until the next contact is due (0 if one is due now), or None if empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock())
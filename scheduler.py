@@ -0,0 +1,87 @@
+# scheduler.py
+
+import time
+import random
+
+
+# ------------------------------
+# Adaptive pacing
+# ------------------------------
+# scale:   multiplier on the user's delay
+# jitter:  +/- fraction of the interval added at random
+# burst:   messages that may go out back to back after an idle period
+# speedup / backoff: interval factor applied after each success / failure
+# min_factor / max_factor: bounds for the adaptive factor
+PACING_PROFILES = {
+    "conservative": dict(scale=1.5, jitter=0.3, burst=1, speedup=0.98, backoff=2.0, min_factor=1.0, max_factor=6.0),
+    "normal": dict(scale=1.0, jitter=0.2, burst=1, speedup=0.95, backoff=1.5, min_factor=0.6, max_factor=4.0),
+    "aggressive": dict(scale=0.7, jitter=0.15, burst=2, speedup=0.9, backoff=1.3, min_factor=0.4, max_factor=3.0),
+}
+DEFAULT_PACING = "normal"
+
+
+class RateScheduler:
+    """Token bucket pacing for one WhatsApp account.
+
+    Tokens refill at one per interval, so time already spent loading and
+    sending a message counts towards the delay before the next one. The
+    interval adapts: it shrinks a little after every success and grows after
+    a failure, within the profile's bounds. Failed attempts give their token
+    back, since no message went out.
+    """
+
+    def __init__(self, base_delay, profile=DEFAULT_PACING, clock=time.monotonic, sleep=time.sleep):
+        self.base_delay = max(float(base_delay), 0.0)
+        self.profile = PACING_PROFILES[profile]
+        self.clock = clock
+        self.sleep = sleep
+        self.factor = 1.0
+        self.tokens = float(self.profile["burst"])
+        self.last_refill = clock()
+
+    def interval(self):
+        return self.base_delay * self.profile["scale"] * self.factor
+
+    def _refill(self):
+        now = self.clock()
+        interval = self.interval()
+        if interval <= 0:
+            self.tokens = float(self.profile["burst"])
+        else:
+            self.tokens = min(self.profile["burst"], self.tokens + (now - self.last_refill) / interval)
+        self.last_refill = now
+
+    def acquire(self):
+        """Take a token. Returns how long the caller must wait before sending.
+
+        For callers that cannot block (the asyncio engine); ``wait`` sleeps for them.
+        """
+        self._refill()
+        delay = 0.0
+        if self.tokens < 1:
+            delay = (1 - self.tokens) * self.interval()
+            jitter = self.profile["jitter"] * self.interval()
+            delay = max(0.0, delay + random.uniform(-jitter, jitter))
+        # May go negative: the debt is paid back by the refill during the delay
+        self.tokens -= 1
+        return delay
+
+    def time_until_ready(self):
+        """Seconds until a token is available, without taking it (jitter not included)."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) * self.interval())
+
+    def wait(self):
+        """Block until the next message may be sent. Returns the seconds slept."""
+        delay = self.acquire()
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def record(self, success):
+        p = self.profile
+        if success:
+            self.factor = max(p["min_factor"], self.factor * p["speedup"])
+        else:
+            self.factor = min(p["max_factor"], self.factor * p["backoff"])
+            self.tokens = min(p["burst"], self.tokens + 1)
@@ -0,0 +1,398 @@
+# sessions.py
+
+import os
+from collections import Counter
+from threading import Thread, Lock, Event
+
+from config import QR_PATH, QR_SCAN_TIMEOUT, DEFAULT_PROFILE, PIPELINE
+from browser import Session, capture_qr_code, wait_for_qr_scan, is_authenticated
+from retry import RetryQueue, SENT, SKIPPED, TRANSIENT, BROWSER_CRASH, INVALID_ATTACHMENT, UNEXPECTED_ERROR
+from attachments import AttachmentCache, AttachmentError
+from scheduler import RateScheduler, DEFAULT_PACING
+from profiles import (
+    profile_path, session_profile_name, check_profile_health, mark_authenticated,
+)
+
+
+# ------------------------------
+# Session pool
+# ------------------------------
+class SessionPool:
+    """N Chrome instances, each on its own persistent profile and WhatsApp account.
+
+    Session ``i`` uses profile ``session_profile_name(profile, i)``; profiles
+    that are already linked skip the QR scan. ``driver_factory(user_data_dir,
+    qr_path)`` must return ``(driver, error)``; it defaults to launching Chrome
+    and capturing the login QR, and can be swapped for a fake driver in tests.
+    QR codes are saved in ``qr_dir`` (default: the working directory).
+    """
+
+    def __init__(self, size, profile=DEFAULT_PROFILE, driver_factory=capture_qr_code, headless=False,
+                 diet=False, qr_dir=None):
+        profile_path(profile)  # raises ValueError for unusable names
+        self.size = size
+        self.profile = profile
+        self.driver_factory = driver_factory
+        self.headless = headless
+        self.diet = diet
+        self.qr_dir = qr_dir
+        self.sessions = []
+
+    def start(self, on_qr=None, qr_timeout=QR_SCAN_TIMEOUT):
+        """Launch every session, asking for a QR scan only where needed. Returns ``(ok, error)``."""
+        for index in range(self.size):
+            name = session_profile_name(self.profile, index)
+            healthy, problems = check_profile_health(name)
+            if not healthy:
+                self.close()
+                return False, f"Profile '{name}': " + ", ".join(problems)
+
+            qr_path = QR_PATH if index == 0 else f"qr_{name}.png"
+            if self.qr_dir:
+                qr_path = os.path.join(self.qr_dir, qr_path)
+            options = {}
+            if self.headless:
+                options["headless"] = True
+            if self.diet:
+                options["diet"] = True
+            driver, error = self.driver_factory(profile_path(name), qr_path, **options)
+            if driver is None:
+                self.close()
+                return False, error
+
+            session = Session(driver, name=name, user_data_dir=profile_path(name),
+                              headless=self.headless, diet=self.diet)
+            self.sessions.append(session)
+            if not is_authenticated(driver):
+                if on_qr:
+                    on_qr(session, qr_path)
+                if not wait_for_qr_scan(driver, qr_timeout):
+                    self.close()
+                    return False, None
+            mark_authenticated(name)
+            session.start_diet()
+        return True, None
+
+    def close(self):
+        for session in self.sessions:
+            session.quit()
+        self.sessions = []
+
+
+class Dispatcher:
+    """Sends contacts through a list of sessions in parallel.
+
+    Each session runs in its own thread and pulls the next contact from a
+    shared iterator, so contacts can be streamed from disk while sending. Each
+    session is paced by its own RateScheduler built from ``base_delay`` and
+    the ``pacing`` profile.
+    ``total`` may be a number or a callable returning the (possibly not yet
+    known) number of contacts. ``on_sending(session, contact)`` and
+    ``on_result(done, total, contact, result)`` are called from the worker
+    threads.
+
+    Transient failures go to a RetryQueue and are retried with backoff,
+    interleaved with new contacts; permanent ones are final at once.
+    ``failures`` counts the final failure class of every contact not sent.
+    A session whose browser crashes stops; if they all do, the contacts
+    never reached fail as BROWSER_CRASH.
+
+    With ``pipeline`` set, each worker opens the next chat and types the
+    message before waiting on its scheduler, so the page load overlaps with
+    the pacing delay rather than adding to it.
+
+    With ``metrics`` (a CampaignMetrics), the stage times and result of every
+    attempt are recorded.
+
+    After each send, the session's DeliveryTracker watches the message's
+    ticks during the idle part of the pacing interval; ``delivery`` counts
+    the status each sent message had reached.
+
+    A contact's ``attachment`` (or the campaign-wide ``attachment``) is sent
+    after its message. ``attachments`` prepares every file once and keeps
+    upload times; a file that cannot be sent fails the contact as
+    INVALID_ATTACHMENT before its chat is opened.
+
+    With a ``journal``, every attempt is recorded, and if ``resume`` is set,
+    contacts the journal already has as sent are skipped: counted as done and
+    passed to ``on_result`` with the SKIPPED result.
+
+    ``limit`` maps session names to the messages each may send (its
+    account's remaining daily quota); sessions not in it are not capped.
+    Once a session's sent plus in-flight contacts reach its limit it starts
+    no new contact, and ``limit_reached`` is set if the others leave
+    contacts unsent. ``stop()`` ends the run the same way from any thread.
+    Contacts not reached are left for a resumed run.
+    """
+
+    def __init__(self, sessions, base_delay, pacing=DEFAULT_PACING, on_sending=None,
+                 on_result=None, journal=None, resume=False, retry_queue=None, pipeline=PIPELINE,
+                 metrics=None, attachment=None, attachments=None, limit=None):
+        self.sessions = sessions
+        self.base_delay = base_delay
+        self.pacing = pacing
+        self.on_sending = on_sending
+        self.on_result = on_result
+        self.journal = journal
+        self.resume = resume
+        self.pipeline = pipeline
+        self.metrics = metrics
+        # Campaign-wide attachment path, used for contacts without their own
+        self.attachment = attachment
+        self.attachments = attachments if attachments is not None else AttachmentCache()
+        self.retries = retry_queue if retry_queue is not None else RetryQueue()
+        self.lock = Lock()
+        self.done = 0
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.failures = Counter()
+        # Final tick status of every sent message (see delivery.py)
+        self.delivery = Counter()
+        self.total = None
+        self.limit = limit or {}
+        self.limit_reached = False
+        # Sent and in-flight contacts per session name
+        self.sent_by = Counter()
+        self._active = Counter()
+        self._stopped = Event()
+        self._exhausted = False
+        self._crashed = 0
+        # (done, contact) of skipped contacts not yet passed to on_result
+        self._skips = []
+
+    def run(self, contacts, total=None):
+        self.total = total
+        self._contacts = iter(contacts)
+        threads = []
+        for session in self.sessions:
+            thread = Thread(target=self._worker, args=(session,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if self._exhausted:
+            # The sessions left under their limit got through the whole file
+            self.limit_reached = False
+
+        # Whatever is still queued had no live session left to retry it
+        for contact, result in self.retries.drain():
+            self._finish(contact, result)
+        if self._crashed == len(self.sessions) and not self._exhausted and not self._stopped.is_set():
+            unreached = 0
+            contact = self._next_fresh()
+            while contact is not None:
+                self._report_skips()
+                self._finish(contact, BROWSER_CRASH)
+                unreached += 1
+                contact = self._next_fresh()
+            self._report_skips()
+            print(f"⚠️ All sessions crashed; {unreached} contacts were not reached")
+        if self.journal:
+            self.journal.flush()
+        if self.failures:
+            print("Failures: " + ", ".join(f"{name}={n}" for name, n in self.failures.most_common()))
+        return self.sent, self.failed
+
+    def _next_fresh(self):
+        for contact in self._contacts:
+            if self.resume and self.journal and self.journal.is_sent(contact.phone, contact.message):
+                self.done += 1
+                self.skipped += 1
+                self._skips.append((self.done, contact))
+                continue
+            return contact
+        self._exhausted = True
+        return None
+
+    def _report_skips(self):
+        # Outside the lock, like every on_result call
+        with self.lock:
+            skips, self._skips = self._skips, []
+        if self.on_result:
+            total = self._total()
+            for done, contact in skips:
+                self.on_result(done, total, contact, SKIPPED)
+
+    def stop(self):
+        """Start no new contact; workers finish the message in hand and exit."""
+        self._stopped.set()
+
+    def sent_per_session(self):
+        """``{session name: messages sent}`` so far."""
+        with self.lock:
+            return dict(self.sent_by)
+
+    def _next_contact(self, session):
+        """Return ``(contact, attempts_so_far)`` for ``session``, or None when there is nothing left."""
+        item = self._take_contact(session)
+        self._report_skips()
+        return item
+
+    def _take_contact(self, session):
+        name = session.name
+        while True:
+            if self._stopped.is_set():
+                return None
+            with self.lock:
+                limit = self.limit.get(name)
+                if limit is not None and self.sent_by[name] + self._active[name] >= limit:
+                    self.limit_reached = True
+                    return None
+                retry = self.retries.pop_ready()
+                if retry is not None:
+                    self._active[name] += 1
+                    return retry
+                if not self._exhausted:
+                    contact = self._next_fresh()
+                    if contact is not None:
+                        self._active[name] += 1
+                        return contact, 0
+                wait = self.retries.next_due()
+            if wait is None:
+                return None
+            self._stopped.wait(min(wait, 1.0))
+
+    def _total(self):
+        return self.total() if callable(self.total) else self.total
+
+    def _finish(self, contact, result, session=None):
+        with self.lock:
+            self.done += 1
+            if result == SENT:
+                self.sent += 1
+                if session is not None:
+                    self.sent_by[session.name] += 1
+            else:
+                self.failed += 1
+                self.failures[result] += 1
+            done = self.done
+        if self.on_result:
+            self.on_result(done, self._total(), contact, result)
+
+    def _attachment_for(self, contact):
+        """Return ``(PreparedAttachment or None, failure or None)`` for ``contact``."""
+        path = getattr(contact, "attachment", "") or self.attachment
+        if not path:
+            return None, None
+        try:
+            return self.attachments.get(path), None
+        except AttachmentError as e:
+            print(f"⚠️ {contact.phone}: {e}")
+            return None, INVALID_ATTACHMENT
+
+    def _attempt(self, session, scheduler, contact):
+        """Send to ``contact`` once. Returns ``(result, seconds spent waiting on the scheduler)``."""
+        attachment, failure = self._attachment_for(contact)
+        if failure:
+            return failure, 0.0
+
+        if not self.pipeline:
+            waited = scheduler.wait()
+            if self.on_sending:
+                self.on_sending(session, contact)
+            result = session.send(contact.phone, contact.message, attachment)
+            scheduler.record(result == SENT)
+            self._record_upload(session, attachment, result)
+            return result, waited
+
+        # The chat loads and the message is typed while the pacing delay runs
+        # down; a chat that never opens costs no token
+        if self.on_sending:
+            self.on_sending(session, contact)
+        prepared, failure = session.prepare(contact.phone, contact.message)
+        if prepared is None:
+            return failure, 0.0
+        waited = scheduler.wait()
+        result = session.deliver(prepared, attachment)
+        scheduler.record(result == SENT)
+        self._record_upload(session, attachment, result)
+        return result, waited
+
+    def _record_upload(self, session, attachment, result):
+        timer = getattr(session, "timer", None)
+        if attachment is not None and result == SENT and timer is not None:
+            self.attachments.record_upload(attachment, timer.stages.get("attach", 0.0) + timer.stages.get("upload", 0.0))
+
+    def _confirm(self, session, scheduler, load_estimate):
+        """Watch the ticks of the message just sent, in time the scheduler would idle anyway.
+
+        In pipeline mode ``load_estimate`` seconds of that idle time are left
+        for opening the next chat.
+        """
+        budget = scheduler.time_until_ready()
+        if self.pipeline:
+            budget -= load_estimate
+        confirmation = session.confirm(budget)
+        if confirmation is not None:
+            with self.lock:
+                self.delivery[confirmation.status] += 1
+        return confirmation
+
+    def _measure(self, session, contact, result, waited, attempt, confirmation):
+        timer = getattr(session, "timer", None)
+        stages = dict(timer.stages) if timer is not None else {}
+        stages["pacing_wait"] = waited
+        status = None
+        if confirmation is not None:
+            status = confirmation.status
+            if confirmation.ack_latency is not None:
+                stages["ack_latency"] = confirmation.ack_latency
+            if confirmation.delivery_latency is not None:
+                stages["delivery_latency"] = confirmation.delivery_latency
+        self.metrics.message(session.name, contact.phone, result, stages, attempt, status)
+
+    def _worker(self, session):
+        scheduler = RateScheduler(self.base_delay, self.pacing)
+        load_estimate = 0.0
+        while True:
+            item = self._next_contact(session)
+            if item is None:
+                break
+            contact, attempts = item
+            try:
+                result, waited = self._attempt(session, scheduler, contact)
+            except Exception as e:
+                # A bug or a browser error outside the send itself; the
+                # contact must still be journaled and finished
+                print(f"⚠️ {session.name}: unexpected error sending to {contact.phone}: {e}")
+                result, waited = UNEXPECTED_ERROR, 0.0
+            attempts += 1
+            # Before the tick watch and metrics, so a crash in between cannot
+            # leave a sent message unrecorded and send it again on resume
+            if self.journal:
+                self.journal.record(contact.phone, contact.message, result)
+            timer = getattr(session, "timer", None)
+            if timer is not None and result == SENT:
+                load = sum(timer.stages.get(stage, 0.0) for stage in ("navigate", "compose_wait", "send_ready"))
+                load_estimate = load if not load_estimate else 0.8 * load_estimate + 0.2 * load
+            confirmation = None
+            if result == SENT:
+                try:
+                    confirmation = self._confirm(session, scheduler, load_estimate)
+                except Exception as e:
+                    print(f"⚠️ {session.name}: could not read the ticks for {contact.phone}: {e}")
+            if self.metrics:
+                self._measure(session, contact, result, waited, attempts, confirmation)
+
+            if result in TRANSIENT:
+                with self.lock:
+                    queued = self.retries.push(contact, attempts, result)
+                if queued:
+                    print(f"⚠️ {result} for {contact.phone} ({session.name}), retry {attempts}")
+                else:
+                    print(f"⚠️ Failed to send to {contact.phone} after {attempts} attempts ({result})")
+                    self._finish(contact, result, session)
+            else:
+                if result != SENT:
+                    print(f"⚠️ Failed to send to {contact.phone} ({result})")
+                self._finish(contact, result, session)
+            with self.lock:
+                self._active[session.name] -= 1
+
+            if result == BROWSER_CRASH:
+                # The contact is queued for another session; this browser is gone
+                print(f"⚠️ {session.name} crashed, stopping it")
+                with self.lock:
+                    self._crashed += 1
+                break
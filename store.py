@@ -0,0 +1,176 @@
+# store.py
+
+import time
+import sqlite3
+import hashlib
+from collections import Counter
+from threading import Lock
+
+from config import CONTACT_STORE_PATH, DEFAULT_COUNTRY_CODE
+
+
+# ------------------------------
+# Contact store
+# ------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    list TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (list, phone)
+);
+"""
+
+# Commit at least every N records or T seconds, whichever comes first
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 2.0
+
+
+def _column_key(name):
+    import numpy as np
+    return np.uint64(int(hashlib.blake2b(str(name).encode("utf-8"), digest_size=8).hexdigest(), 16))
+
+
+def fingerprint_rows(frame):
+    """One 64-bit content hash per row of a raw sheet frame, as an int64 Series.
+
+    Each non-empty cell is hashed together with its column name and the
+    results are summed, so reordering columns or adding an empty one leaves
+    the fingerprints unchanged.
+    """
+    import numpy as np
+    import pandas as pd
+    from contacts import _clean_column
+
+    total = np.zeros(len(frame), dtype="uint64")
+    for column in frame.columns:
+        values = _clean_column(frame[column])
+        hashed = pd.util.hash_array(values.to_numpy(dtype=object))
+        mixed = pd.util.hash_array(hashed ^ _column_key(column))
+        total += np.where((values == '').to_numpy(dtype=bool), np.uint64(0), mixed)
+    return pd.Series(total.view("int64"), index=frame.index)
+
+
+class ContactStore:
+    """Fingerprint of every contact last sent to, per contact list.
+
+    A list is one recurring sheet (e.g. the weekly customer export); each
+    phone keeps the fingerprint of the row it was last messaged from. Same
+    SQLite setup and batched commits as the send journal.
+    """
+
+    def __init__(self, path=CONTACT_STORE_PATH):
+        self.path = path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def snapshot(self, list_name):
+        """``{phone: fingerprint}`` of ``list_name``."""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT phone, fingerprint FROM contacts WHERE list = ?", (list_name,)
+            ))
+
+    def record(self, list_name, phone, fingerprint):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO contacts (list, phone, fingerprint, ts) VALUES (?, ?, ?, ?)",
+                (list_name, phone, fingerprint, time.time())
+            )
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def forget(self, list_name, phones):
+        with self.lock:
+            self.conn.executemany("DELETE FROM contacts WHERE list = ? AND phone = ?",
+                                  ((list_name, phone) for phone in phones))
+            self._flush()
+
+    def _flush(self):
+        self.conn.commit()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
+
+
+class ContactDiff:
+    """Narrows one import of a list down to its new and changed rows.
+
+    ``filter`` runs on raw sheet chunks, before prepare_frame and the
+    template, so unchanged rows cost only a phone normalization and a hash.
+    A phone's first row in the file is compared with the store: unknown
+    phones are ``new``, a different fingerprint is ``changed``; later rows
+    with the same phone are dropped as ``duplicate``. Rows without a valid
+    number pass through for the preflight to report. Once the whole file
+    is read, ``removed()`` lists the stored phones it no longer has.
+
+    Only sent contacts are stored (``record_sent``), so a contact whose send
+    failed is targeted again by the next import.
+    """
+
+    def __init__(self, store, list_name, country_code=DEFAULT_COUNTRY_CODE):
+        self.store = store
+        self.list_name = list_name
+        self.country_code = country_code
+        self.previous = store.snapshot(list_name)
+        self.seen = set()
+        self.counts = Counter()
+        self.lock = Lock()
+        # phone -> fingerprint of the rows let through, until they are sent
+        self._targeted = {}
+
+    def filter(self, frame):
+        import pandas as pd
+        from contacts import COLUMN_ALIASES, _PHONE_JUNK, _field, _clean_phone
+        from preflight import normalize_phones
+
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        raw = _field(frame, COLUMN_ALIASES['phone'], clean=_clean_phone)
+        phones = normalize_phones(raw.str.replace(_PHONE_JUNK.pattern, '', regex=True), self.country_code)
+        fingerprints = fingerprint_rows(frame)
+
+        invalid = phones == ''
+        repeat = ~invalid & (phones.duplicated() | phones.isin(self.seen))
+        first = ~invalid & ~repeat
+        # A dict lookup per row; Series.map would go through float64 and lose hash bits
+        first_phones = phones[first].tolist()
+        previous = [self.previous.get(phone) for phone in first_phones]
+        new = pd.Series([fp is None for fp in previous], index=phones.index[first.to_numpy(dtype=bool)])
+        changed = pd.Series([fp is not None and fp != current for fp, current
+                             in zip(previous, fingerprints[first].tolist())], index=new.index)
+        target = first.copy()
+        target[first] = new | changed
+
+        self.seen.update(first_phones)
+        self.counts['new'] += int(new.sum())
+        self.counts['changed'] += int(changed.sum())
+        self.counts['unchanged'] += int(first.sum()) - int(new.sum()) - int(changed.sum())
+        self.counts['duplicate'] += int(repeat.sum())
+        with self.lock:
+            self._targeted.update(zip(phones[target].tolist(), fingerprints[target].tolist()))
+        return frame[target | invalid]
+
+    def record_sent(self, phone):
+        with self.lock:
+            fingerprint = self._targeted.pop(phone, None)
+        if fingerprint is not None:
+            self.store.record(self.list_name, phone, fingerprint)
+
+    def removed(self):
+        return [phone for phone in self.previous if phone not in self.seen]
+
+    def summary(self):
+        c = self.counts
+        return (f"{c['new']} new, {c['changed']} changed, {c['unchanged']} unchanged, "
+                f"{len(self.removed())} removed")
@@ -0,0 +1,150 @@
+# template.py
+#
+# Campaign message templates, compiled once and rendered a whole chunk of
+# contacts at a time.
+#
+#   {column}              value of any column of the sheet (or a field alias:
+#                         name, family, prefix, phone, message, full_name)
+#   {column|fallback}     fallback text when the cell is empty
+#   {?column}...{/}       only when the cell is not empty
+#   {?column}...{:}...{/} with an else branch; {!column} negates
+#   {{ and }}             literal braces
+#
+#   "Dear {full_name|customer},\n{?city}See you in {city}!{:}See you soon!{/}"
+
+import re
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{([?!/:]?)([^{}]*)\}")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Template:
+    """A parsed template.
+
+    ``columns`` holds every column the template reads and ``required`` those
+    read without a fallback; ``validate`` checks them against a sheet header
+    before anything is sent. The parsed template is compiled to a single
+    Python expression; ``render_frame`` maps it over a chunk's columns and
+    ``render`` applies it to one mapping, for previews.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.columns = set()
+        self.required = set()
+        self.nodes = self._parse(source)
+        self._compile()
+
+    def _parse(self, source):
+        root = []
+        # Each open block: (nodes being filled, if-node)
+        stack = [(root, None)]
+        pos = 0
+        for match in _TOKEN.finditer(source):
+            nodes = stack[-1][0]
+            if match.start() > pos:
+                nodes.append(("text", source[pos:match.start()]))
+            pos = match.end()
+            token = match.group(0)
+            if token in ("{{", "}}"):
+                nodes.append(("text", token[0]))
+                continue
+            kind, body = match.group(1), match.group(2).strip()
+            if kind in ("?", "!"):
+                if not body:
+                    raise TemplateError(f"Condition without a column at position {match.start()}")
+                node = ("if", body, kind == "!", [], [])
+                self.columns.add(body)
+                nodes.append(node)
+                stack.append((node[3], node))
+            elif kind == ":":
+                node = stack[-1][1]
+                if node is None or stack[-1][0] is not node[3]:
+                    raise TemplateError(f"'{{:}}' outside a condition at position {match.start()}")
+                stack[-1] = (node[4], node)
+            elif kind == "/":
+                if len(stack) == 1:
+                    raise TemplateError(f"'{{/}}' without a condition at position {match.start()}")
+                stack.pop()
+            else:
+                column, sep, fallback = body.partition("|")
+                column = column.strip()
+                if not column:
+                    raise TemplateError(f"Empty placeholder at position {match.start()}")
+                self.columns.add(column)
+                if not sep:
+                    self.required.add(column)
+                nodes.append(("field", column, fallback if sep else ""))
+        if len(stack) > 1:
+            raise TemplateError(f"Condition on '{stack[-1][1][1]}' is never closed with {{/}}")
+        if pos < len(source):
+            stack[-1][0].append(("text", source[pos:]))
+        return root
+
+    def missing(self, available):
+        """Columns the template needs that are not in ``available``, sorted."""
+        return sorted(self.required - set(available))
+
+    def validate(self, available):
+        missing = self.missing(available)
+        if missing:
+            raise TemplateError("Template uses columns the file does not have: " + ", ".join(missing))
+
+    # ------------------------------
+    # Rendering
+    # ------------------------------
+    def _compile(self):
+        """Build one Python function taking the column values in ``self.order``.
+
+        Rendering is then a single call per row with no tree walking; literals
+        are embedded with ``repr`` and columns are positional arguments, so no
+        cell text ever becomes code.
+        """
+        self.order = sorted(self.columns)
+        args = {column: f"c{i}" for i, column in enumerate(self.order)}
+
+        def expression(nodes):
+            parts = []
+            for node in nodes:
+                if node[0] == "text":
+                    if parts and parts[-1][0] == "text":
+                        parts[-1] = ("text", parts[-1][1] + node[1])
+                    else:
+                        parts.append(("text", node[1]))
+                elif node[0] == "field":
+                    arg = args[node[1]]
+                    parts.append(("code", f"({arg} or {node[2]!r})" if node[2] else arg))
+                else:
+                    _, column, negate, then_nodes, else_nodes = node
+                    test = f"not {args[column]}" if negate else args[column]
+                    parts.append(("code", f"({expression(then_nodes)} if {test} else {expression(else_nodes)})"))
+            if not parts:
+                return "''"
+            return " + ".join(repr(value) if kind == "text" else value for kind, value in parts)
+
+        source = f"lambda {', '.join(args.values())}: {expression(self.nodes)}"
+        self._render = eval(source, {"__builtins__": {}})
+
+    def render_frame(self, lookup, index):
+        """Render one message per row of ``index``.
+
+        ``lookup(column)`` returns the cleaned string Series of a column
+        ('' for empty cells), or None if there is no such column.
+        """
+        import pandas as pd
+        columns = []
+        for column in self.order:
+            series = lookup(column)
+            columns.append(series.tolist() if series is not None else [""] * len(index))
+        if columns:
+            rendered = list(map(self._render, *columns))
+        else:
+            rendered = [self._render()] * len(index)
+        return pd.Series(rendered, index=index, dtype="string")
+
+    def render(self, row):
+        """Render one message from a ``{column: value}`` mapping."""
+        return self._render(*(row.get(column) or "" for column in self.order))
@@ -0,0 +1,11 @@
+# tests/conftest.py
+#
+# The app is a flat set of modules at the repo root, and the stand-ins the
+# tests drive it with live in benchmarks/.
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
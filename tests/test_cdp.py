@@ -0,0 +1,91 @@
+# tests/test_cdp.py
+
+import asyncio
+
+import websockets
+
+from cdp import AsyncEngine
+from contacts import Contact
+from fake_cdp import FakeBrowser
+from journal import SendJournal
+from retry import RetryQueue, SENT, SKIPPED, INVALID_NUMBER, BROWSER_CRASH
+
+
+class CrashingBrowser(FakeBrowser):
+    """A FakeBrowser that drops its connection on the first page load after ``crash_after`` sends."""
+
+    def __init__(self, crash_after):
+        super().__init__()
+        self.crash_after = crash_after
+
+    async def _reply(self, ws, msg):
+        if msg["method"] == "Page.navigate" and len(self.sent) >= self.crash_after:
+            await ws.close()
+            return
+        await super()._reply(ws, msg)
+
+
+def contacts(n):
+    # FakeBrowser takes numbers ending in 0 as invalid
+    return [Contact(i + 1, f"9891200{i:04d}1", f"User {i}", f"Hello {i}") for i in range(n)]
+
+
+def run_engine(browsers, items, **options):
+    results = []
+
+    async def main():
+        servers = [await websockets.serve(b.handle, "127.0.0.1", 0) for b in browsers]
+        endpoints = [f"ws://127.0.0.1:{s.sockets[0].getsockname()[1]}" for s in servers]
+        engine = AsyncEngine(endpoints, 0, on_result=lambda done, c, r: results.append((c.phone, r)),
+                             retry_queue=RetryQueue(base=0.01), **options)
+        try:
+            await engine.run(items)
+        finally:
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+        return engine
+
+    return asyncio.run(main()), results
+
+
+def test_sends_through_every_endpoint():
+    items = contacts(8) + [Contact(9, "989120000000", "Invalid", "Hello")]
+    browsers = [FakeBrowser(), FakeBrowser()]
+    engine, results = run_engine(browsers, items)
+    assert (engine.sent, engine.failed, engine.done) == (8, 1, 9)
+    assert engine.failures == {INVALID_NUMBER: 1}
+    assert sorted(phone for b in browsers for phone, _ in b.sent) == sorted(c.phone for c in items[:8])
+    assert len(results) == 9
+
+
+def test_crashed_endpoint_leaves_its_contacts_to_another():
+    items = contacts(8)
+    healthy = FakeBrowser()
+    engine, _ = run_engine([CrashingBrowser(crash_after=2), healthy], items)
+    assert (engine.sent, engine.failed) == (8, 0)
+    assert len(healthy.sent) >= 6
+
+
+def test_all_endpoints_crashed_fails_every_contact_left():
+    items = contacts(6)
+    browser = CrashingBrowser(crash_after=2)
+    engine, results = run_engine([browser], items)
+    assert (engine.sent, engine.failed, engine.done) == (2, 4, 6)
+    assert engine.failures == {BROWSER_CRASH: 4}
+    assert sorted(phone for phone, result in results if result == BROWSER_CRASH) == \
+        sorted(c.phone for c in items[2:])
+
+
+def test_resume_skips_contacts_already_sent(tmp_path):
+    items = contacts(4)
+    journal = SendJournal(str(tmp_path / "journal.db"))
+    for contact in items[:2]:
+        journal.record(contact.phone, contact.message, SENT)
+    journal.flush()
+    browser = FakeBrowser()
+    engine, results = run_engine([browser], items, journal=journal, resume=True)
+    journal.close()
+    assert (engine.sent, engine.skipped, engine.done) == (2, 2, 4)
+    assert [phone for phone, _ in browser.sent] == [c.phone for c in items[2:]]
+    assert results[:2] == [(c.phone, SKIPPED) for c in items[:2]]
@@ -0,0 +1,24 @@
+# tests/test_contacts.py
+
+import pytest
+
+from contacts import template_columns
+from template import Template, TemplateError
+
+
+def test_template_columns_only_has_fields_the_header_has():
+    assert template_columns(["phone"]) == {"phone"}
+    with pytest.raises(TemplateError, match="message, name"):
+        Template("Hi {name}, {message}").validate(template_columns(["phone"]))
+
+
+def test_template_columns_resolves_aliases():
+    columns = template_columns(["نام", "شماره همراه", "متن پیام", "city"])
+    assert {"name", "phone", "message", "full_name", "city"} <= columns
+    assert "family" not in columns
+    Template("Dear {full_name}, {message} {?city}in {city}{/}").validate(columns)
+
+
+def test_full_name_needs_name_or_family():
+    assert "full_name" in template_columns(["family", "phone"])
+    assert "full_name" not in template_columns(["prefix", "phone"])
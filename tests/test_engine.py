@@ -0,0 +1,61 @@
+# tests/test_engine.py
+
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+import engine
+import metrics as metrics_module
+from browser import Session
+from config import METRICS_JSONL
+from engine import Campaign
+from mock_whatsapp import Behavior, SimDriver
+
+
+@pytest.fixture
+def campaign(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,phone\n" + "".join(f"User {i},98912000{i:04d}\n" for i in range(5)), encoding="utf-8")
+    events = []
+    campaign = Campaign(str(path), delay=0, pacing="normal", output_dir=str(tmp_path / "out"),
+                        on_event=lambda event, data: events.append((event, data)))
+    campaign.pool = SimpleNamespace(sessions=[Session(SimDriver(Behavior()), name="sim", recycle_every=0)])
+    campaign.events = events
+    return campaign
+
+
+def finished(campaign):
+    return next(data for event, data in campaign.events if event == "finished")
+
+
+def test_busy_metrics_port_does_not_stop_the_campaign(campaign):
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        campaign.metrics_port = busy.getsockname()[1]
+        campaign.run()
+    assert finished(campaign)["sent"] == 5
+
+
+def test_unwritable_metrics_log_does_not_stop_the_campaign(campaign, tmp_path):
+    # A directory where the log file should be
+    (tmp_path / "out" / METRICS_JSONL).mkdir(parents=True)
+    campaign.run()
+    assert finished(campaign)["sent"] == 5
+
+
+def test_metrics_server_is_closed(campaign, monkeypatch):
+    servers = []
+
+    def serve(metrics, port):
+        servers.append(metrics_module.serve_prometheus(metrics, port))
+        return servers[-1]
+
+    monkeypatch.setattr(engine, "serve_prometheus", serve)
+    with socket.socket() as free:
+        free.bind(("127.0.0.1", 0))
+        campaign.metrics_port = free.getsockname()[1]
+    campaign.run()
+    assert servers[0].socket.fileno() == -1
@@ -0,0 +1,140 @@
+# tests/test_jobs.py
+
+import datetime
+
+import pytest
+
+import jobs
+from jobs import JobQueue, RUNNING, STALE_AFTER
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def in_use(monkeypatch):
+    """Profiles open in a Chrome, as profile_in_use would see them."""
+    profiles = set()
+    monkeypatch.setattr(jobs, "profile_in_use", lambda profile: profile in profiles)
+    return profiles
+
+
+@pytest.fixture
+def queue(tmp_path, in_use):
+    queue = JobQueue(str(tmp_path / "jobs.db"), clock=Clock())
+    yield queue
+    queue.close()
+
+
+def window_around(hours):
+    """A one-hour start window beginning ``hours`` from now."""
+    start = datetime.datetime.now() + datetime.timedelta(hours=hours)
+    end = start + datetime.timedelta(hours=1)
+    return f"{start:%H:%M}-{end:%H:%M}"
+
+
+def test_claims_highest_priority_first(queue):
+    low = queue.add("a.csv", profile="a")
+    high = queue.add("b.csv", profile="b", priority=5)
+    assert queue.claim(1)[0].id == high
+    assert queue.claim(2)[0].id == low
+    assert queue.claim(3) is None
+
+
+def test_busy_account_waits(queue):
+    first = queue.add("a.csv", profile="a")
+    second = queue.add("b.csv", profile="a")
+    job, _ = queue.claim(1)
+    assert job.id == first and job.status == RUNNING
+    assert queue.claim(2) is None
+    queue.finish(first, "done")
+    assert queue.claim(2)[0].id == second
+
+
+def test_any_session_account_makes_the_job_wait(queue):
+    queue.add("a.csv", profile="a", sessions=2)
+    queue.add("b.csv", profile="a-2")
+    assert [profile for profile in queue.claim(1)[1]] == ["a", "a-2"]
+    assert queue.claim(2) is None
+
+
+def test_account_open_in_chrome_waits(queue, in_use):
+    queue.add("a.csv", profile="a")
+    in_use.add("a")
+    assert queue.claim(1) is None
+    in_use.clear()
+    assert queue.claim(1) is not None
+
+
+def test_quota_left_is_passed_on(queue):
+    queue.set_quota("a", 10)
+    queue.add("a.csv", profile="a", sessions=2)
+    job, remaining = queue.claim(1)
+    assert remaining == {"a": 10, "a-2": None}
+    queue.report(job.id, 4, 10, 4, 0, usage={"a": 4})
+    assert queue.remaining_quota("a") == 6
+
+
+def test_spent_quota_waits_until_every_account_is_spent(queue):
+    queue.set_quota("a", 3)
+    job_id = queue.add("a.csv", profile="a")
+    job, _ = queue.claim(1)
+    queue.report(job.id, 3, 10, 3, 0, usage={"a": 3})
+    queue.finish(job_id, "queued")
+    assert queue.remaining_quota("a") == 0
+    assert queue.claim(1) is None
+
+    # With a second account that still has quota, the job may run
+    queue.add("b.csv", profile="a", sessions=2)
+    job, remaining = queue.claim(1)
+    assert remaining == {"a": 0, "a-2": None}
+
+
+def test_start_window(queue):
+    queue.add("later.csv", profile="a", window=window_around(3))
+    assert queue.claim(1) is None
+    open_now = queue.add("now.csv", profile="b", window=window_around(-0.5))
+    assert queue.claim(1)[0].id == open_now
+
+
+def test_invalid_window_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.add("a.csv", window="9-17")
+
+
+def test_not_before(queue):
+    queue.add("a.csv", profile="a", not_before=queue.clock() + 60)
+    assert queue.claim(1) is None
+    queue.clock.now += 61
+    assert queue.claim(1) is not None
+
+
+def test_dead_worker_job_is_queued_again(queue):
+    job_id = queue.add("a.csv", profile="a")
+    queue.claim(1)
+    queue.clock.now += STALE_AFTER - 1
+    assert queue.claim(2) is None
+    queue.clock.now += 2
+    job, _ = queue.claim(2)
+    assert (job.id, job.worker, job.runs) == (job_id, 2, 2)
+
+
+def test_report_keeps_the_job_and_its_worker_alive(queue):
+    queue.add("a.csv", profile="a")
+    queue.worker_alive(1)
+    job, _ = queue.claim(1)
+    queue.clock.now += STALE_AFTER - 1
+    queue.report(job.id, 1, 10, 1, 0)
+    queue.clock.now += STALE_AFTER - 1
+    assert queue.has_workers()
+    assert queue.claim(2) is None
+
+
+def test_unknown_option_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.add("a.csv", bogus=True)
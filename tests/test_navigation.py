@@ -0,0 +1,82 @@
+# tests/test_navigation.py
+
+import pytest
+
+import navigation
+from browser import prepare_msg, deliver_msg
+from mock_whatsapp import Behavior, SimDriver
+from navigation import ChatNavigator, open_chat_in_app, MAX_IN_APP_FAILURES
+from retry import SENT
+
+PHONE = "989121234567"
+
+
+@pytest.fixture(autouse=True)
+def short_timeout(monkeypatch):
+    monkeypatch.setattr(navigation, "NAVIGATION_TIMEOUT", 0.2)
+
+
+def test_opens_the_searched_chat():
+    driver = SimDriver(Behavior())
+    box = open_chat_in_app(driver, PHONE)
+    assert box is not None
+    assert driver.chat_phone == PHONE
+    assert not driver.drawer
+
+
+def test_number_not_on_whatsapp_closes_the_search():
+    driver = SimDriver(Behavior(invalid_rate=1.0))
+    assert open_chat_in_app(driver, PHONE) is None
+    assert not driver.drawer
+    assert driver.chat_phone is None
+
+
+def test_contact_saved_under_a_name_is_not_opened():
+    driver = SimDriver(Behavior(named_rate=1.0))
+    assert open_chat_in_app(driver, PHONE) is None
+    assert driver.page == "home"
+
+
+def test_wrong_chat_is_rejected():
+    driver = SimDriver(Behavior(misroute_rate=1.0))
+    assert open_chat_in_app(driver, PHONE) is None
+    assert driver.chat_phone != PHONE
+
+
+def test_wrong_chat_falls_back_to_reload():
+    driver = SimDriver(Behavior(misroute_rate=1.0))
+    prepared, failure = prepare_msg(driver, PHONE, "Hi", ChatNavigator("in_app"))
+    assert failure is None
+    assert driver.chat_phone == PHONE
+    assert deliver_msg(driver, prepared) == SENT
+    assert driver.sent == 1
+
+
+def test_each_chat_replaces_the_last():
+    driver = SimDriver(Behavior())
+    navigator = ChatNavigator("in_app")
+    for phone in (PHONE, "989127654321"):
+        prepared, failure = prepare_msg(driver, phone, "Hi", navigator)
+        assert failure is None
+        assert driver.chat_phone == phone
+        assert deliver_msg(driver, prepared) == SENT
+    assert driver.sent == 2
+    assert navigator.failures == 0
+
+
+def test_navigator_gives_up_after_repeated_failures():
+    driver = SimDriver(Behavior(misroute_rate=1.0))
+    navigator = ChatNavigator("in_app")
+    for _ in range(MAX_IN_APP_FAILURES):
+        assert navigator.open(driver, PHONE) is None
+    assert navigator.failures == MAX_IN_APP_FAILURES
+    driver.get("/")
+    assert navigator.open(driver, PHONE) is None
+    # Gave up without touching the page
+    assert not driver.drawer and driver.page == "home"
+
+
+def test_reload_mode_never_searches():
+    driver = SimDriver(Behavior())
+    assert ChatNavigator("reload").open(driver, PHONE) is None
+    assert not driver.drawer
@@ -0,0 +1,55 @@
+# tests/test_preflight.py
+
+import pandas as pd
+import pytest
+
+from preflight import normalize_phones, Preflight
+
+
+def normalize(phone, country_code="98"):
+    return normalize_phones(pd.Series([phone], dtype="string"), country_code)[0]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("989121234567", "989121234567"),
+    ("+98 912 123 4567", "989121234567"),
+    ("0098 912 123 4567", "989121234567"),
+    # National numbers get the default country code, without their trunk 0
+    ("09121234567", "989121234567"),
+    ("9121234567", "989121234567"),
+    ("(0912) 123-4567", "989121234567"),
+    # International numbers keep theirs
+    ("+44 20 7946 0958", "442079460958"),
+    ("0044 20 7946 0958", "442079460958"),
+    ("+1 212 555 0100", "12125550100"),
+])
+def test_normalizes(raw, expected):
+    assert normalize(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [
+    "",
+    "abc",
+    "12345",
+    # A country code cannot start with 0
+    "+0912345678",
+    "00012345678",
+    # Longer than E.164 allows
+    "+1234567890123456",
+])
+def test_rejects(raw):
+    assert normalize(raw) == ""
+
+
+def test_country_code_is_configurable():
+    assert normalize("07911123456", "44") == "447911123456"
+
+
+def test_preflight_drops_invalid_and_duplicates_across_chunks():
+    preflight = Preflight("98")
+    first = preflight.check(pd.DataFrame({"row": [1, 2, 3], "phone": ["09121234567", "+989121234567", "123"]}))
+    second = preflight.check(pd.DataFrame({"row": [4, 5], "phone": ["989121234567", "09127654321"]}))
+    assert list(first["phone"]) == ["989121234567"]
+    assert list(second["phone"]) == ["989127654321"]
+    assert preflight.counts["invalid"] == 1
+    assert preflight.counts["duplicate"] == 2
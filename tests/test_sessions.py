@@ -0,0 +1,186 @@
+# tests/test_sessions.py
+
+import urllib.parse
+from collections import Counter
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import browser
+from browser import Session
+from contacts import Contact
+from journal import SendJournal
+from mock_whatsapp import Behavior, SimDriver
+from navigation import ChatNavigator
+from retry import RetryQueue, SENT, SKIPPED, NETWORK, BROWSER_CRASH, INVALID_NUMBER
+from sessions import Dispatcher
+
+NETWORK_ERROR = "unknown error: net::ERR_CONNECTION_RESET"
+CRASH_ERROR = "chrome not reachable"
+
+
+class FlakyDriver(SimDriver):
+    """SimDriver whose chat loads raise the errors scripted per phone, in order.
+
+    ``errors`` may be shared by the drivers of several sessions, so a retry
+    on another session still sees the rest of the script. ``crash`` makes
+    every load fail as a dead browser.
+    """
+
+    def __init__(self, errors=None, crash=False, behavior=None):
+        super().__init__(behavior or Behavior())
+        self.errors = errors if errors is not None else {}
+        self.crash = crash
+        self.loads = Counter()
+
+    def get(self, url):
+        phone = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get("phone", [""])[0]
+        self.loads[phone] += 1
+        if self.crash:
+            raise WebDriverException(CRASH_ERROR)
+        script = self.errors.get(phone)
+        if script:
+            raise WebDriverException(script.pop(0))
+        super().get(url)
+
+
+def make_session(driver, name="s0"):
+    session = Session(driver, name=name, recycle_every=0)
+    # Every attempt goes through a /send load, where the errors are scripted
+    session.navigator = ChatNavigator("reload")
+    return session
+
+
+def contacts(n):
+    return [Contact(i + 1, f"98912000{i:04d}", f"User {i}", f"Hello {i}") for i in range(n)]
+
+
+def dispatch(sessions, items, **options):
+    results = []
+    options.setdefault("retry_queue", RetryQueue(base=0.01))
+    dispatcher = Dispatcher(sessions, 0, on_result=lambda done, total, c, r: results.append((c.phone, r)),
+                            **options)
+    dispatcher.run(items, total=len(items))
+    return dispatcher, results
+
+
+@pytest.fixture(autouse=True)
+def short_timeouts(monkeypatch):
+    monkeypatch.setattr(browser, "COMPOSE_TIMEOUT", 0.2)
+
+
+def test_every_contact_is_sent_once():
+    drivers = [FlakyDriver(), FlakyDriver()]
+    dispatcher, results = dispatch([make_session(d, f"s{i}") for i, d in enumerate(drivers)], contacts(6))
+    assert (dispatcher.sent, dispatcher.failed, dispatcher.done) == (6, 0, 6)
+    assert sum(d.sent for d in drivers) == 6
+    assert sorted(results) == sorted((c.phone, SENT) for c in contacts(6))
+    assert sum(dispatcher.sent_per_session().values()) == 6
+
+
+def test_transient_failure_is_retried():
+    items = contacts(3)
+    driver = FlakyDriver({items[1].phone: [NETWORK_ERROR, NETWORK_ERROR]})
+    dispatcher, results = dispatch([make_session(driver)], items)
+    assert (dispatcher.sent, dispatcher.failed) == (3, 0)
+    assert driver.loads[items[1].phone] == 3
+    # One result per contact, the final one
+    assert results.count((items[1].phone, SENT)) == 1 and len(results) == 3
+
+
+def test_retries_run_out():
+    items = contacts(3)
+    driver = FlakyDriver({items[0].phone: [NETWORK_ERROR] * 5})
+    dispatcher, results = dispatch([make_session(driver)], items, retry_queue=RetryQueue(max_attempts=3, base=0.01))
+    assert (dispatcher.sent, dispatcher.failed) == (2, 1)
+    assert dispatcher.failures == {NETWORK: 1}
+    assert driver.loads[items[0].phone] == 3
+    assert (items[0].phone, NETWORK) in results
+
+
+def test_permanent_failure_is_not_retried():
+    driver = FlakyDriver(behavior=Behavior(invalid_rate=1.0))
+    dispatcher, _ = dispatch([make_session(driver)], contacts(3))
+    assert dispatcher.failures == {INVALID_NUMBER: 3}
+    assert all(n == 1 for n in driver.loads.values())
+
+
+def test_crashed_session_leaves_its_contact_to_another():
+    healthy = FlakyDriver()
+    sessions = [make_session(FlakyDriver(crash=True), "dead"), make_session(healthy, "alive")]
+    dispatcher, _ = dispatch(sessions, contacts(5))
+    assert (dispatcher.sent, dispatcher.failed) == (5, 0)
+    assert healthy.sent == 5
+    assert dispatcher.sent_per_session() == {"alive": 5}
+
+
+def test_all_sessions_crashed_fails_every_contact_left():
+    items = contacts(5)
+    dispatcher, results = dispatch([make_session(FlakyDriver(crash=True))], items)
+    assert (dispatcher.sent, dispatcher.failed, dispatcher.done) == (0, 5, 5)
+    assert dispatcher.failures == {BROWSER_CRASH: 5}
+    assert sorted(results) == sorted((c.phone, BROWSER_CRASH) for c in items)
+
+
+def test_limit_caps_one_session():
+    drivers = [FlakyDriver(), FlakyDriver()]
+    sessions = [make_session(d, f"s{i}") for i, d in enumerate(drivers)]
+    dispatcher, _ = dispatch(sessions, contacts(6), limit={"s0": 2})
+    assert dispatcher.sent == 6
+    assert dispatcher.sent_per_session()["s0"] <= 2
+    # The other session got through the whole file
+    assert not dispatcher.limit_reached
+
+
+def test_limit_on_every_session_leaves_contacts_unsent():
+    sessions = [make_session(FlakyDriver(), f"s{i}") for i in range(2)]
+    dispatcher, results = dispatch(sessions, contacts(6), limit={"s0": 1, "s1": 2})
+    assert dispatcher.sent == 3
+    assert dispatcher.sent_per_session() == {"s0": 1, "s1": 2}
+    assert dispatcher.limit_reached
+    # Contacts not reached are left for a resumed run, not failed
+    assert dispatcher.failed == 0 and len(results) == 3
+
+
+def test_stop_finishes_the_message_in_hand():
+    driver = FlakyDriver()
+    dispatcher = Dispatcher([make_session(driver)], 0, pipeline=False,
+                            on_result=lambda *args: dispatcher.stop())
+    dispatcher.run(contacts(5), total=5)
+    assert (dispatcher.sent, dispatcher.failed, dispatcher.done) == (1, 0, 1)
+    assert driver.sent == 1
+
+
+def test_stop_before_run_sends_nothing():
+    driver = FlakyDriver()
+    dispatcher = Dispatcher([make_session(driver)], 0)
+    dispatcher.stop()
+    dispatcher.run(contacts(5), total=5)
+    assert dispatcher.done == 0 and driver.sent == 0
+
+
+def test_resume_skips_contacts_already_sent(tmp_path):
+    items = contacts(5)
+    journal = SendJournal(str(tmp_path / "journal.db"))
+    for contact in items[:3]:
+        journal.record(contact.phone, contact.message, SENT)
+    # Sent before, but with another message: not skipped
+    journal.record(items[3].phone, "Older message", SENT)
+    journal.flush()
+
+    driver = FlakyDriver()
+    dispatcher, results = dispatch([make_session(driver)], items, journal=journal, resume=True)
+    journal.close()
+    assert (dispatcher.sent, dispatcher.skipped, dispatcher.done) == (2, 3, 5)
+    assert driver.sent == 2
+    assert results == [(c.phone, SKIPPED) for c in items[:3]] + [(c.phone, SENT) for c in items[3:]]
+
+
+def test_retried_contact_is_journaled_as_sent(tmp_path):
+    items = contacts(2)
+    journal = SendJournal(str(tmp_path / "journal.db"))
+    driver = FlakyDriver({items[0].phone: [NETWORK_ERROR]})
+    dispatch([make_session(driver)], items, journal=journal)
+    journal.flush()
+    assert all(journal.is_sent(c.phone, c.message) for c in items)
+    journal.close()
@@ -0,0 +1,43 @@
+# tests/test_template.py
+
+import re
+
+import pytest
+
+from template import Template, TemplateError
+
+
+@pytest.mark.parametrize("source, error", [
+    ("Hi {}", "Empty placeholder at position 3"),
+    ("Hi { |friend}", "Empty placeholder"),
+    ("{?}yes{/}", "Condition without a column at position 0"),
+    ("{!}no{/}", "Condition without a column"),
+    ("Hi {:}", "'{:}' outside a condition at position 3"),
+    ("{?city}a{:}b{:}c{/}", "'{:}' outside a condition"),
+    ("Hi{/}", "'{/}' without a condition at position 2"),
+    ("{?city}a{/}{/}", "'{/}' without a condition"),
+    ("{?city}in {city}", "Condition on 'city' is never closed"),
+    ("{?a}{?b}x{/}", "Condition on 'a' is never closed"),
+])
+def test_syntax_errors(source, error):
+    with pytest.raises(TemplateError, match=re.escape(error)):
+        Template(source)
+
+
+def test_columns_and_required():
+    template = Template("Dear {full_name|customer}, {message}{?city} in {city}{/}")
+    assert template.columns == {"full_name", "message", "city"}
+    assert template.required == {"message", "city"}
+    assert template.missing({"message"}) == ["city"]
+
+
+def test_renders():
+    template = Template("Dear {name|customer},\n{?city}See you in {city}!{:}See you soon!{/} {{ok}}")
+    assert template.render({"name": "Ali", "city": "Tehran"}) == "Dear Ali,\nSee you in Tehran! {ok}"
+    assert template.render({"name": "", "city": ""}) == "Dear customer,\nSee you soon! {ok}"
+
+
+def test_negated_condition():
+    template = Template("{!city}No city{:}{city}{/}")
+    assert template.render({"city": ""}) == "No city"
+    assert template.render({"city": "Tabriz"}) == "Tabriz"
@@ -1,7 +1,7 @@
 # translations.py
 
-import arabic_reshaper
-from bidi.algorithm import get_display
+from functools import lru_cache
+from string import Formatter
 
 # Current active language (can be changed at runtime)
 _CURRENT_LANG = 'fa'
@@ -14,6 +14,14 @@ _TRANSLATIONS = {
         "contacts_count": "تعداد مخاطبین: {count} نفر",
         "read_error": "خطا در خواندن فایل!",
         "send_btn": "ارسال پیام ها",
+        "queue_btn": "افزودن به صف ارسال",
+        "loading_file": "در حال خواندن فایل...",
+        "reading_rows": "در حال بررسی: {rows} ردیف",
+        "cancel_btn": "لغو",
+        "load_cancelled": "خواندن فایل لغو شد.",
+        "read_error_detail": "خطا در خواندن فایل: {error}",
+        "columns_found": "ستون‌ها: {columns}",
+        "queued_job": "کار شماره {job} به صف اضافه شد و در پس‌زمینه ارسال می‌شود.",
         "browser_loading": "در حال راه‌اندازی مرورگر...",
         "scan_qr": "لطفاً QR را با گوشی خود اسکن کنید...",
         "connected": "اتصال برقرار شد. در حال آماده‌سازی...",
@@ -28,6 +36,14 @@ _TRANSLATIONS = {
         "language": "انتخاب زبان",
         "keep_session": "باز نگه داشتن نشست واتساپ پس از ارسال",
         "sending_to": "در حال ارسال به: {name} ({phone})",
+        "sessions_label": "تعداد نشست‌های همزمان (حساب‌ها):",
+        "scan_qr_session": "لطفاً QR مربوط به {name} را اسکن کنید...",
+        "profile_label": "نام پروفایل مرورگر:",
+        "preflight_summary": "تعداد مخاطبین: {count} نفر (تکراری: {duplicate}، نامعتبر: {invalid})",
+        "progress_stats": "{percent}٪ | {rate} پیام در دقیقه | زمان باقی‌مانده {eta} | موفق {sent} | ناموفق {failed}",
+        "send_summary": "ارسال شد: {sent}، ناموفق: {failed}",
+        "pacing_label": "سرعت ارسال (پروفایل زمان‌بندی):",
+        "resume_label": "ادامه از آخرین ارسال (رد کردن مخاطبینی که قبلاً پیام گرفته‌اند)",
         "WhatsApp Marketing Bot": "ربات بازاریابی واتس اپ",
     },
     "en": {
@@ -37,6 +53,14 @@ _TRANSLATIONS = {
         "contacts_count": "Contacts: {count}",
         "read_error": "Error reading file!",
         "send_btn": "Send Messages",
+        "queue_btn": "Add to Queue",
+        "loading_file": "Reading file...",
+        "reading_rows": "Checking: {rows} rows",
+        "cancel_btn": "Cancel",
+        "load_cancelled": "File reading cancelled.",
+        "read_error_detail": "Could not read the file: {error}",
+        "columns_found": "Columns: {columns}",
+        "queued_job": "Queued as job {job}; it will be sent in the background.",
         "browser_loading": "Launching browser...",
         "scan_qr": "Please scan the QR code with your phone...",
         "connected": "Connected. Preparing to send...",
@@ -51,6 +75,14 @@ _TRANSLATIONS = {
         "language": "Language",
         "keep_session": "Keep WhatsApp session open after sending",
         "sending_to": "Sending to: {name} ({phone})",
+        "sessions_label": "Parallel sessions (accounts):",
+        "scan_qr_session": "Please scan the QR code for {name}...",
+        "profile_label": "Browser profile name:",
+        "preflight_summary": "Contacts: {count} (duplicates: {duplicate}, invalid: {invalid})",
+        "progress_stats": "{percent}% | {rate} msg/min | ETA {eta} | sent {sent} | failed {failed}",
+        "send_summary": "Sent: {sent}, failed: {failed}",
+        "pacing_label": "Sending pace (pacing profile):",
+        "resume_label": "Resume (skip contacts already sent to)",
     }
 }
 
@@ -64,12 +96,82 @@ def set_lang(lang_code):
     else:
         raise ValueError("Unsupported language")
 
+# Shaped strings kept for reuse: static labels and per-contact field values
+SHAPE_CACHE_SIZE = 2048
+TEMPLATE_CACHE_SIZE = 256
+
+
+def _reshape(text):
+    # Only needed for Persian, so not imported at startup
+    import arabic_reshaper
+    return arabic_reshaper.reshape(text)
+
+
+def _display(text):
+    from bidi.algorithm import get_display
+    return get_display(text)
+
+
+@lru_cache(maxsize=SHAPE_CACHE_SIZE)
+def _shape(text):
+    """Reshape and reorder a complete Persian string."""
+    return _display(_reshape(text))
+
+
+@lru_cache(maxsize=SHAPE_CACHE_SIZE)
+def _reshape_field(value):
+    if value.isascii():
+        # Digits and Latin text have nothing to join
+        return value
+    return _reshape(value)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile(text):
+    """Split a template into pre-reshaped literal parts and field names.
+
+    Returns None if a placeholder touches a letter, since letter joining
+    across the boundary would then depend on the field value.
+    """
+    parts = []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if field is not None and (spec or conversion):
+            return None
+        if literal:
+            parts.append((True, _reshape(literal)))
+        if field is not None:
+            prev = parts[-1][1] if parts and parts[-1][0] else ""
+            if prev and prev[-1].isalpha():
+                return None
+            parts.append((False, field))
+    for i, (is_literal, value) in enumerate(parts):
+        if is_literal and i > 0 and not parts[i - 1][0] and value[0].isalpha():
+            return None
+    return parts
+
+
+def display_text(text):
+    """Shape text from the user's files (sheet cells, headers) for display, whatever the UI language."""
+    if text.isascii():
+        return text
+    return "\n".join(_shape(line) for line in text.split("\n"))
+
+
 def tr(key, **kwargs):
     lang = _CURRENT_LANG
     text = _TRANSLATIONS.get(lang, _TRANSLATIONS["fa"]).get(key, key)
-    if kwargs:
-        text = text.format(**kwargs)
-    if lang == "fa":
-        reshaped = arabic_reshaper.reshape(text)
-        return get_display(reshaped)
-    return text
\ No newline at end of file
+    if lang != "fa":
+        return text.format(**kwargs) if kwargs else text
+    if not kwargs:
+        return _shape(text)
+
+    parts = _compile(text)
+    if parts is None:
+        return _shape(text.format(**kwargs))
+    # Literals were reshaped once; only the interpolated values are reshaped
+    # here. Reordering still needs the whole line.
+    shaped = "".join(
+        value if is_literal else _reshape_field(str(kwargs[value]))
+        for is_literal, value in parts
+    )
+    return _display(shaped)